@@ -0,0 +1,105 @@
+"""数据库连接复用基准测试
+
+按 Django 处理请求的方式模拟请求：request_started → 查询 → request_finished（按 CONN_MAX_AGE 关闭连接），
+分别统计每个请求新建连接（CONN_MAX_AGE=0）与持久连接（CONN_MAX_AGE=60，开启健康检查）时的单个请求耗时。
+设置 DB_POOL_SIZE 后运行即为连接池后端的结果。
+
+用法：
+    python benchmark_connections.py --requests 500
+    python benchmark_connections.py --path /api/employees/        # 通过 WSGI 请求接口，需要已建好数据表
+    python benchmark_connections.py --sqlite /tmp/bench.sqlite3   # 没有 MySQL 时用 SQLite 文件代替
+"""
+import argparse
+import io
+import os
+import statistics
+import time
+from wsgiref.util import setup_testing_defaults
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'score_system.settings')
+
+import django
+from django.conf import settings
+
+# (说明, 连接设置)；使用连接池后端时 CONN_MAX_AGE=0 的连接在请求结束时归还连接池
+MODES = [
+    ("CONN_MAX_AGE=0", {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}),
+    ("CONN_MAX_AGE=60", {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True}),
+]
+
+
+def select_one():
+    from django.core.signals import request_finished, request_started
+    from django.db import connection
+
+    request_started.send(sender=None)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+    finally:
+        request_finished.send(sender=None)
+
+
+def wsgi_request(application, path):
+    def request():
+        environ = {'PATH_INFO': path, 'wsgi.input': io.BytesIO()}
+        setup_testing_defaults(environ)
+        statuses = []
+        response = application(environ, lambda status, headers: statuses.append(status))
+        try:
+            for _ in response:
+                pass
+        finally:
+            # 与 WSGI 服务器相同，close() 时发送 request_finished
+            response.close()
+        if not statuses[0].startswith('2'):
+            raise SystemExit(f"{path} 返回 {statuses[0]}")
+    return request
+
+
+def measure(request, count, warmup=10):
+    for _ in range(warmup):
+        request()
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        request()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "mean": statistics.fmean(timings),
+        "p50": timings[len(timings) // 2],
+        "p95": timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据库连接复用基准测试")
+    parser.add_argument('--requests', type=int, default=500, help="每种配置的请求数")
+    parser.add_argument('--path', help="请求的接口路径，不指定时只执行 SELECT 1")
+    parser.add_argument('--sqlite', help="使用 SQLite 数据库文件代替 MySQL")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        settings.DATABASES['default'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': args.sqlite,
+        }
+    django.setup()
+
+    from django.core.wsgi import get_wsgi_application
+    from django.db import connection
+
+    request = wsgi_request(get_wsgi_application(), args.path) if args.path else select_one
+    print(f"数据库: {connection.vendor} ({connection.settings_dict['ENGINE']})，每种配置 {args.requests} 个请求")
+    for label, options in MODES:
+        connection.close()
+        connection.settings_dict.update(options)
+        result = measure(request, args.requests)
+        print(f"{label:<16} 平均 {result['mean']:.3f} ms  p50 {result['p50']:.3f} ms  p95 {result['p95']:.3f} ms")
+    connection.close()
+
+
+if __name__ == '__main__':
+    main()
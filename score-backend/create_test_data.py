@@ -8,7 +8,8 @@ from datetime import datetime
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'score_system.settings')
 django.setup()
 
-from performance.models import Department, Employee, Project, EmployeeRelation, Indicator, Assessment, FinalScore
+from performance.models import Department, Employee, Project, EmployeeRelation, Indicator, Assessment
+from performance import scoring
 from django.contrib.auth.models import User
 
 # 创建超级用户
@@ -440,80 +441,13 @@ def create_final_scores(employees):
     # 获取当前月份，格式为 YYYYMM
     current_period = datetime.now().strftime("%Y%m")
     
-    for employee in employees:
-        # 跳过部门负责人
-        if employee.role == "department_leader":
-            continue
-        
-        # 获取该员工的所有评价
-        assessments = Assessment.objects.filter(
-            employee=employee,
-            period=current_period
-        )
-        
-        if assessments:
-            # 获取部门负责人评分
-            dept_leader_assessment = assessments.filter(
-                evaluator__role="department_leader"
-            ).first()
-            
-            dept_leader_score = dept_leader_assessment.total_score if dept_leader_assessment else 0
-            
-            # 获取项目负责人评分
-            project_leader_assessment = assessments.filter(
-                evaluator__role="project_leader"
-            ).first()
-            
-            project_leader_score = project_leader_assessment.total_score if project_leader_assessment else 0
-            
-            # 获取自评分
-            self_assessment = assessments.filter(
-                evaluator=employee
-            ).first()
-            
-            self_score = self_assessment.total_score if self_assessment else 0
-            
-            # 计算最终得分
-            # 部门负责人评分占50%，项目负责人评分占30%，自评分占20%
-            final_score = dept_leader_score * 0.5 + project_leader_score * 0.3 + self_score * 0.2
-            
-            # 创建最终得分
-            final_score_obj, created = FinalScore.objects.get_or_create(
-                employee=employee,
-                period=current_period,
-                defaults={
-                    "department_leader_score": dept_leader_score,
-                    "project_leader_score": project_leader_score,
-                    "self_score": self_score,
-                    "final_score": final_score,
-                    "rank": 0  # 排名将在后面更新
-                }
-            )
-            
-            print(f"创建最终得分: {employee.name}, 得分: {final_score:.2f}")
+    # 按计分规则整批计算最终得分
+    count = scoring.compute_final_scores(current_period)
+    print(f"创建最终得分: {count} 人")
     
-    # 更新排名
-    update_ranks(current_period)
-
-# 更新排名
-def update_ranks(period):
+    # 按部门排名，同时计算公司排名
     print("更新排名...")
-    
-    # 按部门分组，更新排名
-    departments = Department.objects.all()
-    
-    for dept in departments:
-        # 获取该部门所有员工的最终得分，按得分降序排序
-        final_scores = FinalScore.objects.filter(
-            employee__department=dept,
-            period=period
-        ).order_by('-final_score')
-        
-        # 更新排名
-        for i, final_score in enumerate(final_scores):
-            final_score.rank = i + 1
-            final_score.save()
-    
+    scoring.update_ranks(current_period, company_wide=True)
     print("排名更新完成")
 
 # 主函数
@@ -0,0 +1,114 @@
+"""绩效预警
+
+每次计算最终得分后对整个考核周期批量评估预警规则：
+一次查询取出本周期及之前 SCORE_ALERT_WINDOW 个月的最终得分，各规则在整列得分上向量化计算，
+预警结果按 (员工, 周期, 规则) upsert，本次不再触发的预警删除，已处理标记保持不变，可重复执行。
+"""
+import numpy as np
+from django.conf import settings
+from django.db import connection
+
+from .models import PerformanceAlert
+from .statistics import month_range, shift_period
+from .trends import load_score_matrix
+
+
+def threshold_rule(scores, history, departments, config):
+    """最终得分低于预警分数"""
+    reference = np.full(scores.shape, config['threshold'])
+    return scores < reference, reference
+
+
+def rolling_drop_rule(scores, history, departments, config):
+    """最终得分比个人前 N 个月平均分低出 drop 分，前 N 个月没有得分时不评估"""
+    counts = (~np.isnan(history)).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        reference = np.nansum(history, axis=1) / counts
+    triggered = (counts > 0) & (reference - scores >= config['drop'])
+    return triggered, reference
+
+
+def bottom_percentile_rule(scores, history, departments, config):
+    """最终得分不高于部门内 percent 分位分数，人数少于 min_group 的部门不评估"""
+    reference = np.full(scores.shape, np.nan)
+    for department in np.unique(departments):
+        members = departments == department
+        if members.sum() >= config['min_group']:
+            reference[members] = np.percentile(scores[members], config['percent'])
+    triggered = ~np.isnan(reference) & (scores <= reference)
+    return triggered, reference
+
+
+# 预警规则：(规则函数, 预警信息模板)
+ALERT_RULES = {
+    'threshold': (threshold_rule, "最终得分 {score} 低于预警分数 {reference}"),
+    'rolling_drop': (rolling_drop_rule, "最终得分 {score} 比近期平均分 {reference} 低 {difference}"),
+    'bottom_percentile': (bottom_percentile_rule, "最终得分 {score} 处于部门后 {percent:g}%（{reference} 分及以下）"),
+}
+
+
+def alert_config():
+    return {
+        'threshold': settings.SCORE_ALERT_THRESHOLD,
+        'drop': settings.SCORE_ALERT_DROP,
+        'window': settings.SCORE_ALERT_WINDOW,
+        'percent': settings.SCORE_ALERT_BOTTOM_PERCENT,
+        'min_group': settings.SCORE_ALERT_MIN_GROUP,
+    }
+
+
+def evaluate_alerts(period, config=None, batch_size=1000):
+    """评估考核周期的全部预警规则并保存预警，返回各规则的预警人数"""
+    config = {**alert_config(), **(config or {})}
+    periods = month_range(shift_period(period, -config['window']), period)
+    matrix, info = load_score_matrix(periods)
+
+    current = matrix[period].to_numpy()
+    present = ~np.isnan(current)
+    scores = current[present]
+    history = matrix[periods[:-1]].to_numpy()[present]
+    departments = info['department_id'].to_numpy()[present]
+    employee_ids = matrix.index.to_numpy()[present]
+
+    alerts = []
+    counts = {}
+    for rule, (evaluate, template) in ALERT_RULES.items():
+        triggered, reference = evaluate(scores, history, departments, config)
+        counts[rule] = int(triggered.sum())
+        for employee_id, score, value in zip(
+            employee_ids[triggered].tolist(), scores[triggered].tolist(), reference[triggered].tolist()
+        ):
+            alerts.append(PerformanceAlert(
+                employee_id=employee_id,
+                period=period,
+                rule=rule,
+                score=round(score, 2),
+                reference=round(value, 2),
+                message=template.format(
+                    score=round(score, 2), reference=round(value, 2),
+                    difference=round(value - score, 2), percent=config['percent'],
+                ),
+            ))
+
+    options = {}
+    if connection.features.supports_update_conflicts_with_target:
+        options['unique_fields'] = ['employee', 'period', 'rule']
+    PerformanceAlert.objects.bulk_create(
+        alerts,
+        batch_size=batch_size,
+        update_conflicts=True,
+        update_fields=['score', 'reference', 'message', 'updated_at'],
+        **options
+    )
+
+    # 重新计算后不再触发的预警
+    current_keys = {(alert.employee_id, alert.rule) for alert in alerts}
+    stale = [
+        alert_id for alert_id, employee_id, rule in PerformanceAlert.objects.filter(
+            period=period
+        ).order_by().values_list('id', 'employee_id', 'rule')
+        if (employee_id, rule) not in current_keys
+    ]
+    if stale:
+        PerformanceAlert.objects.filter(id__in=stale).delete()
+    return counts
@@ -0,0 +1,123 @@
+"""考核任务分配及评分提交
+
+考核周期开始时按人员关系展开 (评价人, 被考核员工) 对（见 visibility 模块），批量生成待评价的考核任务，
+重复执行只补充缺少的任务。
+月末评价人集中提交评分表：被考核员工一次查询、相关部门的考核指标一次查询，
+全部评分表按项点最小值/最大值校验通过后，按 (employee, evaluator, period) 一次批量 upsert。
+"""
+from django.db import connection
+
+from .models import Assessment, Employee, Indicator
+from .scoring import KIND_SIGNS, compute_total_score
+from .visibility import evaluation_pairs, refresh_visibility
+
+# 提交评分表后的考核状态
+SUBMITTED_STATUS = 'completed'
+
+
+def assign_assessments(period, batch_size=1000):
+    """生成考核周期的待评价考核任务，已存在的任务保持不变，同时刷新评价人可见人员索引
+
+    返回 (应有的任务数, 新增的任务数)。
+    """
+    pairs = evaluation_pairs(period)
+    existing = Assessment.objects.filter(period=period).count()
+    Assessment.objects.bulk_create(
+        [
+            Assessment(evaluator_id=evaluator_id, employee_id=employee_id, period=period)
+            for evaluator_id, employee_id in sorted(pairs)
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    refresh_visibility(period, pairs=pairs, batch_size=batch_size)
+    return len(pairs), Assessment.objects.filter(period=period).count() - existing
+
+
+def load_indicator_rules(department_names):
+    """一次查询加载多个部门的项点规则，返回 {部门名称: {项点序号: (计分符号, 最小值, 最大值)}}"""
+    rules = {name: {} for name in department_names}
+    for dept, seq, kind, min_score, max_score in Indicator.objects.filter(
+        dept__in=rules.keys()
+    ).order_by().values_list('dept', 'seq', 'kind', 'min_score', 'max_score'):
+        rules[dept][str(seq)] = (KIND_SIGNS.get(kind), min_score, max_score)
+    return rules
+
+
+def validate_scores(scores, rules):
+    """按项点规则校验评分表，返回错误信息列表"""
+    errors = []
+    for seq, score in scores.items():
+        rule = rules.get(str(seq))
+        if rule is None:
+            errors.append(f"项点 {seq} 不存在")
+            continue
+        _, min_score, max_score = rule
+        if not min_score <= score <= max_score:
+            errors.append(f"项点 {seq} 得分 {score} 超出范围 {min_score}~{max_score}")
+    return errors
+
+
+def score_signs(rules):
+    """项点规则转换为计分符号表"""
+    return {seq: sign for seq, (sign, _, _) in rules.items() if sign is not None}
+
+
+def submit_assessments(evaluator_id, period, sheets, batch_size=500):
+    """批量提交同一评价人、同一考核周期的评分表
+
+    sheets 为 [{"employee": 员工ID, "scores": {项点序号: 得分}, "comment": 评语}]。
+    有任何一张评分表校验失败时不写入数据，返回 ([], 错误信息)；
+    否则计算总分后一次 upsert，返回 (考核列表, [])。
+    """
+    employee_ids = {sheet['employee'] for sheet in sheets}
+    employees = Employee.objects.select_related('department').in_bulk(employee_ids | {evaluator_id})
+    rules = load_indicator_rules({
+        employee.department.name for employee in employees.values()
+    })
+
+    errors = []
+    if evaluator_id not in employees:
+        errors.append(f"评价人 {evaluator_id} 不存在")
+
+    assessments = []
+    seen = set()
+    for sheet in sheets:
+        employee = employees.get(sheet['employee'])
+        if employee is None:
+            errors.append(f"员工 {sheet['employee']} 不存在")
+            continue
+        if employee.id in seen:
+            errors.append(f"员工 {employee.name} 重复提交")
+            continue
+        seen.add(employee.id)
+
+        department_rules = rules[employee.department.name]
+        errors.extend(
+            f"员工 {employee.name} 的{error}"
+            for error in validate_scores(sheet['scores'], department_rules)
+        )
+        assessments.append(Assessment(
+            employee=employee,
+            evaluator_id=evaluator_id,
+            period=period,
+            status=SUBMITTED_STATUS,
+            scores=sheet['scores'],
+            total_score=compute_total_score(sheet['scores'], score_signs(department_rules)),
+            comment=sheet.get('comment'),
+        ))
+
+    if errors:
+        return [], errors
+
+    options = {}
+    if connection.features.supports_update_conflicts_with_target:
+        options['unique_fields'] = ['employee', 'evaluator', 'period']
+    Assessment.objects.bulk_create(
+        assessments,
+        batch_size=batch_size,
+        update_conflicts=True,
+        update_fields=['status', 'scores', 'total_score', 'comment', 'updated_at'],
+        **options
+    )
+    return assessments, []
@@ -0,0 +1,161 @@
+"""异步只读视图
+
+评分期间部门负责人首页同时请求人员关系、统计及待办列表。这里提供这些只读接口的异步版本，
+部署在 ASGI（uvicorn）下时等待数据库不占用工作线程；首页汇总接口并发执行各项查询，
+页面耗时取决于最慢的一项查询而不是各项之和。
+ASGI 下 StreamingHttpResponse 会把同步迭代器整体读入内存，导出及上传导入等流式接口
+通过 views.streaming_response 改用异步迭代器，WSGI 与 ASGI 部署均逐块输出。
+
+Django 的异步 ORM 在每个请求专用的线程中依次执行查询，同一请求内的多条查询并不会并发，
+因此首页汇总的各项查询通过 in_thread 在线程池中各自使用独立的数据库连接执行。
+DRF 的视图不支持 async，这里使用 Django 的 View 并直接返回 JSON。
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .models import EmployeeRelation, PerformanceAlert
+from .serializers import EmployeeRelationSerializer
+from .statistics import is_period, relation_statistics, score_statistics
+from .views import StatisticsView
+from .visibility import inbox_summary
+
+
+def in_thread(func):
+    """在线程池中使用独立的数据库连接执行同步查询，多个查询可由 asyncio.gather 并发等待
+
+    与请求处理相同，执行前后按 CONN_MAX_AGE 关闭过期的连接。
+    """
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, safe=False, json_dumps_params={'ensure_ascii': False})
+
+
+def error_response(message, status=400):
+    return json_response({"error": message}, status=status)
+
+
+class AsyncRelationListView(View):
+    """人员关系列表（异步）
+
+    可选参数：date=YYYYMM，employee=员工ID，role=人员角色，page，page_size；返回格式与页码分页一致。
+    """
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    max_page_size = 1000
+
+    async def get(self, request, *args, **kwargs):
+        params = request.GET
+        date = params.get('date')
+        employee = params.get('employee')
+        if (date and not is_period(date)) or (employee and not employee.isdigit()):
+            return error_response("参数格式错误")
+        try:
+            page = int(params.get('page', 1))
+            page_size = min(int(params.get('page_size', self.page_size)), self.max_page_size)
+        except ValueError:
+            return error_response("参数格式错误")
+        if page < 1 or page_size < 1:
+            return error_response("参数格式错误")
+
+        # 员工姓名随关系一起查询，序列化时不再访问数据库
+        queryset = EmployeeRelation.objects.select_related('employee')
+        if date:
+            queryset = queryset.filter(date=date)
+        if employee:
+            queryset = queryset.filter(employee_id=employee)
+        if params.get('role'):
+            queryset = queryset.filter(role=params['role'])
+
+        count = await queryset.acount()
+        offset = (page - 1) * page_size
+        if offset and offset >= count:
+            return error_response("无效页面。", status=404)
+        relations = [relation async for relation in queryset[offset:offset + page_size]]
+
+        url = request.build_absolute_uri()
+        previous = None
+        if page == 2:
+            previous = remove_query_param(url, 'page')
+        elif page > 2:
+            previous = replace_query_param(url, 'page', page - 1)
+        return json_response({
+            "count": count,
+            "next": replace_query_param(url, 'page', page + 1) if offset + page_size < count else None,
+            "previous": previous,
+            "results": EmployeeRelationSerializer(relations, many=True).data,
+        })
+
+
+class AsyncStatisticsView(View):
+    """统计分析（异步），参数与 StatisticsView 相同"""
+
+    async def get(self, request, *args, **kwargs):
+        options, error = StatisticsView.parse_params(request.GET)
+        if error:
+            return error_response(error)
+        return json_response(await in_thread(score_statistics)(**options))
+
+
+class AsyncEvaluatorInboxView(View):
+    """评价人待办列表（异步），参数与 EvaluatorInboxView 相同"""
+
+    async def get(self, request, *args, **kwargs):
+        period = request.GET.get('period')
+        evaluator = request.GET.get('evaluator')
+        if not is_period(period) or not evaluator or not evaluator.isdigit():
+            return error_response("缺少必要参数")
+        return json_response(await in_thread(inbox_summary)(period, int(evaluator)))
+
+
+def open_alerts(period, department=None, limit=20):
+    """未处理的绩效预警，按得分从低到高"""
+    queryset = PerformanceAlert.objects.filter(period=period, acknowledged=False)
+    if department:
+        queryset = queryset.filter(employee__department_id=department)
+    return list(queryset.order_by('score', 'id').values(
+        'id', 'employee', 'employee__name', 'rule', 'score', 'message'
+    )[:limit])
+
+
+class DashboardView(View):
+    """首页汇总（异步）
+
+    period=YYYYMM（可选 department=部门ID，evaluator=评价人ID）一次返回得分统计、人员关系统计、
+    未处理的预警及评价人待办列表，各项查询并发执行。
+    """
+    top_n = 5
+
+    async def get(self, request, *args, **kwargs):
+        params = request.GET
+        period = params.get('period')
+        department = params.get('department')
+        evaluator = params.get('evaluator')
+        if (not is_period(period) or (department and not department.isdigit())
+                or (evaluator and not evaluator.isdigit())):
+            return error_response("参数格式错误")
+        department = department and int(department)
+
+        parts = {
+            "statistics": in_thread(score_statistics)(period, top_n=self.top_n, department=department),
+            "relations": in_thread(relation_statistics)([period]),
+            "alerts": in_thread(open_alerts)(period, department=department),
+        }
+        if evaluator:
+            parts["inbox"] = in_thread(inbox_summary)(period, int(evaluator))
+
+        results = dict(zip(parts, await asyncio.gather(*parts.values())))
+        results["relations"] = results["relations"][0]
+        return json_response({"period": period, **results})
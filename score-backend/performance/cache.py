@@ -0,0 +1,165 @@
+"""读穿透缓存
+
+基于 Django 缓存框架，默认使用本地内存，配置 REDIS_URL 后使用 Redis（见 settings.CACHES）。
+每个命名空间带一个版本号，缓存值与版本号一起保存：按键失效时直接删除，
+整体失效时更换版本号，旧版本的缓存值读取时视为未命中。
+事务中失效的键（或整个命名空间）在事务提交前读到的可能是未提交的数据，加载后不写回缓存，
+事务回滚时不会留下回滚掉的数据。
+命中/未命中次数按进程统计，可通过 cache/stats/ 查看。
+"""
+import threading
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .transactions import on_commit_merge, pending_on_commit
+
+CACHE_ALIAS = 'performance'
+
+# 已创建的缓存命名空间，用于统计
+namespaces = {}
+
+
+class CachedNamespace:
+    """缓存命名空间，未命中的键通过 loader 批量加载"""
+
+    def __init__(self, name, loader, timeout=None):
+        self.name = name
+        self.loader = loader
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        namespaces[name] = self
+
+    @property
+    def cache(self):
+        return caches[CACHE_ALIAS]
+
+    def get_timeout(self):
+        if self.timeout is not None:
+            return self.timeout
+        return getattr(settings, 'PERFORMANCE_CACHE_TIMEOUT', None)
+
+    def make_key(self, key):
+        return f"{self.name}:{key}"
+
+    @property
+    def version_key(self):
+        return f"{self.name}:__version__"
+
+    def get(self, key):
+        """读取单个键"""
+        return self.get_many([key])[key]
+
+    def get_many(self, keys):
+        """批量读取，一次缓存往返；未命中的键一次性交给 loader 加载后写回缓存"""
+        keys = set(keys)
+        if not keys:
+            return {}
+
+        cached = self.cache.get_many([self.version_key] + [self.make_key(key) for key in keys])
+        version = cached.get(self.version_key)
+        if version is None:
+            version = uuid.uuid4().hex
+            self.cache.add(self.version_key, version, None)
+            version = self.cache.get(self.version_key, version)
+
+        result = {}
+        for key in keys:
+            entry = cached.get(self.make_key(key))
+            if entry is not None and entry[0] == version:
+                result[key] = entry[1]
+
+        missing = keys - result.keys()
+        with self._lock:
+            self.hits += len(result)
+            self.misses += len(missing)
+
+        if missing:
+            loaded = self.loader(missing)
+            cacheable = self.committed_keys(loaded)
+            if cacheable:
+                self.cache.set_many(
+                    {self.make_key(key): (version, loaded[key]) for key in cacheable},
+                    self.get_timeout()
+                )
+            result.update(loaded)
+        return result
+
+    @property
+    def commit_key(self):
+        return ('cache', self.name)
+
+    def committed_keys(self, keys):
+        """可以写回缓存的键：去掉当前事务中已失效、可能读到未提交数据的键"""
+        pending = pending_on_commit(self.commit_key)
+        if pending is None:
+            return list(keys)
+        if pending.items is None:
+            return []
+        return [key for key in keys if key not in pending.items['keys']]
+
+    def invalidate(self, key=None):
+        """使缓存失效，不指定键时整个命名空间失效
+
+        其他进程在事务提交前可能重新加载旧数据，事务提交后会再失效一次；
+        本事务内之后读取的失效键不写回缓存（见 committed_keys）。
+        在 deferred() 中调用时，失效操作合并到退出时统一执行。
+        """
+        deferred = getattr(self._local, 'deferred', None)
+        if deferred is not None:
+            deferred.add(key)
+            return
+        self._invalidate(key)
+        on_commit_merge(self.commit_key, self._invalidate_committed, None if key is None else {'keys': [key]})
+
+    def _invalidate_committed(self, items):
+        if items is None:
+            self._invalidate(None)
+            return
+        for key in items['keys']:
+            self._invalidate(key)
+
+    def _invalidate(self, key):
+        if key is None:
+            self.cache.set(self.version_key, uuid.uuid4().hex, None)
+        else:
+            self.cache.delete(self.make_key(key))
+
+    @contextmanager
+    def deferred(self):
+        """批量写入时合并失效操作，避免每条记录的信号都访问一次缓存"""
+        if getattr(self._local, 'deferred', None) is not None:
+            yield
+            return
+        self._local.deferred = set()
+        try:
+            yield
+        finally:
+            keys, self._local.deferred = self._local.deferred, None
+            if None in keys:
+                keys = {None}
+            for key in keys:
+                self.invalidate(key)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+def cache_stats():
+    """各缓存命名空间的命中统计"""
+    return {name: namespace.stats() for name, namespace in namespaces.items()}
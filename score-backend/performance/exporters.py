@@ -0,0 +1,191 @@
+"""考核周期数据导出
+
+考核评分表（Assessment）及最终得分（FinalScore）按周期流式导出为 CSV/XLSX/NDJSON。
+数据按主键分批读取（id > 上一批最后一条），每批 chunk_size 行，边读边输出，
+导出的行数再多内存占用也不变；MySQL 驱动不支持服务端游标，.iterator() 仍会把整个结果集读入内存，
+因此不依赖 .iterator()。
+评分表的 scores 按项点序号展开为独立的列，项点序号由一次考核指标查询得到。
+"""
+import csv
+import json
+import tempfile
+
+from .models import Assessment, Department, FinalScore, Indicator
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'ndjson': 'application/x-ndjson',
+}
+
+# 导出列：(查询字段, 表头)，NDJSON 以查询字段为键
+ASSESSMENT_COLUMNS = [
+    ('id', 'ID'),
+    ('period', '考核周期'),
+    ('employee__name', '被考核员工'),
+    ('employee__department__name', '部门'),
+    ('evaluator__name', '评价人'),
+    ('status', '状态'),
+    ('total_score', '总分'),
+    ('comment', '评语'),
+    ('updated_at', '更新时间'),
+]
+FINAL_SCORE_COLUMNS = [
+    ('id', 'ID'),
+    ('period', '考核周期'),
+    ('employee__name', '员工'),
+    ('employee__department__name', '部门'),
+    ('department_leader_score', '部门负责人评分'),
+    ('project_leader_score', '项目负责人评分'),
+    ('self_score', '自评分'),
+    ('final_score', '最终得分'),
+    ('rank', '部门排名'),
+    ('company_rank', '公司排名'),
+]
+
+# xlsx 文件分块输出的大小
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+def iter_batches(queryset, fields, chunk_size):
+    """按主键分批读取，逐行返回 fields 对应的值元组（id 需为第一个字段）"""
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).order_by('id').values_list(*fields)[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+
+def indicator_seqs(department=None):
+    """一次查询取出项点序号（不指定部门ID时取全部部门），作为评分表展开的列"""
+    queryset = Indicator.objects.all()
+    if department:
+        queryset = queryset.filter(dept__in=Department.objects.filter(id=department).values('name'))
+    return sorted(set(queryset.order_by().values_list('seq', flat=True)))
+
+
+class PeriodExport:
+    """考核周期数据导出：model 为导出的模型，columns 为固定列，rows() 逐行返回与 labels() 对应的值"""
+    model = None
+    columns = []
+
+    def __init__(self, period, department=None, chunk_size=2000):
+        self.period = period
+        self.department = department
+        self.chunk_size = chunk_size
+
+    def filename(self, fmt):
+        return f"{self.name}_{self.period}.{fmt}"
+
+    def queryset(self):
+        queryset = self.model.objects.filter(period=self.period)
+        if self.department:
+            queryset = queryset.filter(employee__department_id=self.department)
+        return queryset
+
+    def keys(self):
+        return [field for field, _ in self.columns]
+
+    def labels(self):
+        return [label for _, label in self.columns]
+
+    def rows(self):
+        fields = [field for field, _ in self.columns]
+        for row in iter_batches(self.queryset(), fields, self.chunk_size):
+            yield [export_value(value) for value in row]
+
+
+class AssessmentExport(PeriodExport):
+    model = Assessment
+    name = 'assessments'
+    columns = ASSESSMENT_COLUMNS
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.seqs = [str(seq) for seq in indicator_seqs(self.department)]
+
+    def keys(self):
+        return super().keys() + [f"score_{seq}" for seq in self.seqs]
+
+    def labels(self):
+        return super().labels() + [f"项点{seq}" for seq in self.seqs]
+
+    def rows(self):
+        fields = [field for field, _ in self.columns] + ['scores']
+        for row in iter_batches(self.queryset(), fields, self.chunk_size):
+            scores = row[-1] or {}
+            yield [export_value(value) for value in row[:-1]] + [scores.get(seq) for seq in self.seqs]
+
+
+class FinalScoreExport(PeriodExport):
+    model = FinalScore
+    name = 'final_scores'
+    columns = FINAL_SCORE_COLUMNS
+
+
+EXPORTS = {
+    'assessments': AssessmentExport,
+    'final_scores': FinalScoreExport,
+}
+
+
+def export_value(value):
+    """时间转为 ISO 格式字符串，其余值原样输出"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+class Echo:
+    """csv.writer 的写入目标，直接返回写入的内容"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(export):
+    # 带 BOM 便于 Excel 直接打开
+    writer = csv.writer(Echo())
+    yield '\ufeff' + writer.writerow(export.labels())
+    for row in export.rows():
+        yield writer.writerow(row)
+
+
+def stream_ndjson(export):
+    keys = export.keys()
+    for row in export.rows():
+        yield json.dumps(dict(zip(keys, row)), ensure_ascii=False) + '\n'
+
+
+def stream_xlsx(export):
+    from openpyxl import Workbook
+
+    # xlsx 为 zip 格式，需整个文件写完后才能输出：只写模式逐行写入临时文件，完成后分块输出
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(export.name)
+    sheet.append(export.labels())
+    for row in export.rows():
+        sheet.append(row)
+
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        while True:
+            chunk = output.read(FILE_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+STREAMS = {
+    'csv': stream_csv,
+    'xlsx': stream_xlsx,
+    'ndjson': stream_ndjson,
+}
+
+
+def stream_export(export, fmt):
+    """按格式逐块生成导出内容"""
+    return STREAMS[fmt](export)
@@ -0,0 +1,301 @@
+"""人员关系批量导入
+
+一次查询解析整批员工姓名，在内存中校验并整理每行数据后分批 bulk_create，
+逐行的错误信息仍然汇总返回。
+replace 模式先清除该日期的数据再全部写入；diff 模式与现有数据按员工比对，
+只批量写入新增、变化和删除的记录。
+上传的 CSV/XLSX/NDJSON 文件通过生成器逐行解析，按固定大小分块导入。
+"""
+import csv
+import io
+import json
+import re
+from itertools import islice
+
+from django.utils import timezone
+
+from .models import EmployeeRelation
+from .relations import notify_relations_changed, relation_snapshots, resolve_employee_names, sync_leaders
+
+IMPORT_MODES = ('replace', 'diff')
+# diff 模式比对的字段
+DIFF_FIELDS = ('leaders', 'leader_count', 'project_names', 'role', 'attributes', 'attribute_key')
+ROLES = {value for value, _ in EmployeeRelation.ROLE_CHOICES}
+LEADERS_MAX_LENGTH = EmployeeRelation._meta.get_field('leaders').max_length
+
+# 上传文件的表头，兼容外部系统导出的中文表头
+COLUMN_ALIASES = {
+    'employee_name': 'employee_name',
+    '组员姓名': 'employee_name',
+    'leader_names': 'leader_names',
+    '项目负责人': 'leader_names',
+    '项目负责人姓名': 'leader_names',
+    'project_names': 'project_names',
+    '组员项目参与情况': 'project_names',
+    'role': 'role',
+    '人员角色': 'role',
+    'attributes': 'attributes',
+    '人员属性': 'attributes',
+}
+LIST_COLUMNS = ('leader_names', 'project_names', 'attributes')
+LIST_SEPARATOR = re.compile(r'[,，、;；]')
+ROLE_LABELS = {label: value for value, label in EmployeeRelation.ROLE_CHOICES}
+ATTRIBUTE_LABELS = {label: value for value, label in EmployeeRelation.ATTRIBUTE_CHOICES}
+UPLOAD_FORMATS = ('csv', 'xlsx', 'ndjson')
+
+
+class RelationImporter:
+    """按日期导入人员关系数据"""
+
+    def __init__(self, date, mode='replace', batch_size=1000):
+        if mode not in IMPORT_MODES:
+            raise ValueError(f"不支持的导入模式: {mode}")
+        self.date = date
+        self.mode = mode
+        self.batch_size = batch_size
+        self.errors = []
+        self.error_count = 0
+        self.created_count = 0
+        self.updated_count = 0
+        self.unchanged_count = 0
+        self.deleted_count = 0
+        self._employee_ids = {}
+        self._imported = set()
+        self._existing = {}
+
+    def start(self):
+        """开始导入：replace 模式清除该日期的现有数据，diff 模式载入现有数据用于比对"""
+        relations = EmployeeRelation.objects.filter(date=self.date)
+        if self.mode == 'replace':
+            with relation_snapshots.deferred():
+                self.deleted_count = relations.delete()[1].get(EmployeeRelation._meta.label, 0)
+        else:
+            self._existing = {
+                relation.employee_id: relation
+                for relation in relations.only('id', 'employee_id', *DIFF_FIELDS)
+            }
+
+    def finish(self):
+        """结束导入：diff 模式删除本次导入中不再出现的记录，并通知该日期的人员关系已变更"""
+        with relation_snapshots.deferred():
+            if self.mode == 'diff':
+                stale = [
+                    relation.id for employee_id, relation in self._existing.items()
+                    if employee_id not in self._imported
+                ]
+                for start in range(0, len(stale), self.batch_size):
+                    self.deleted_count += EmployeeRelation.objects.filter(
+                        id__in=stale[start:start + self.batch_size]
+                    ).delete()[1].get(EmployeeRelation._meta.label, 0)
+            notify_relations_changed(self.date)
+
+    def abort(self):
+        """导入中途失败：已写入的数据保留，不删除本次未出现的记录，通知该日期的人员关系已变更"""
+        notify_relations_changed(self.date)
+
+    def add_error(self, message):
+        self.errors.append(message)
+        self.error_count += 1
+
+    def take_errors(self):
+        """取出并清空已记录的错误信息，流式导入逐块输出后不再保留"""
+        errors, self.errors = self.errors, []
+        return errors
+
+    def summary(self):
+        """导入结果汇总"""
+        return {
+            "created_count": self.created_count,
+            "updated_count": self.updated_count,
+            "unchanged_count": self.unchanged_count,
+            "deleted_count": self.deleted_count,
+        }
+
+    def resolve_employees(self, names):
+        """一次查询解析员工姓名，返回 {姓名: 员工ID}；重名时与逐条查询一样取排序后的第一个"""
+        missing = {name for name in names if name not in self._employee_ids}
+        if missing:
+            self._employee_ids.update(resolve_employee_names(missing))
+        return self._employee_ids
+
+    def build(self, rows):
+        """校验并整理一批导入数据，返回待写入的关系列表，错误记录在 self.errors"""
+        rows = list(rows)
+        # 员工姓名和项目负责人姓名一起解析，负责人关联同步时不再重复查询
+        names = []
+        for row in rows:
+            if isinstance(row, dict):
+                names.append(row.get('employee_name'))
+                if isinstance(row.get('leader_names'), list):
+                    names.extend(row['leader_names'])
+        employee_ids = self.resolve_employees(name for name in names if isinstance(name, str))
+
+        relations = []
+        for row in rows:
+            if not isinstance(row, dict):
+                self.add_error(f"数据格式错误: {row}")
+                continue
+
+            # 获取员工
+            employee_name = row.get('employee_name')
+            employee_id = employee_ids.get(employee_name) if isinstance(employee_name, str) else None
+            if not employee_id:
+                self.add_error(f"员工 {employee_name} 不存在")
+                continue
+            if employee_id in self._imported:
+                self.add_error(f"员工 {employee_name} 重复导入")
+                continue
+
+            # 获取项目负责人姓名列表
+            leader_names = row.get('leader_names') or []
+            if not isinstance(leader_names, list) or not all(isinstance(name, str) for name in leader_names):
+                self.add_error(f"员工 {employee_name} 的项目负责人格式错误")
+                continue
+            leaders_str = ','.join(leader_names)
+            if len(leaders_str) > LEADERS_MAX_LENGTH:
+                self.add_error(f"员工 {employee_name} 的项目负责人超出长度限制")
+                continue
+
+            # 确定角色
+            role = row.get('role', 'free_person')
+            if not isinstance(role, str) or role not in ROLES:
+                self.add_error(f"员工 {employee_name} 的人员角色 {role} 无效")
+                continue
+            if not leader_names and role != 'free_person':
+                role = 'free_person'
+
+            relation = EmployeeRelation(
+                date=self.date,
+                employee_id=employee_id,
+                leaders=leaders_str,
+                project_names=row.get('project_names', []),
+                role=role,
+                attributes=row.get('attributes', []),
+            )
+            relation.normalize_leaders()
+            relation.normalize_attributes()
+            relations.append(relation)
+            self._imported.add(employee_id)
+
+        return relations
+
+    def import_rows(self, rows):
+        """校验并批量写入一批导入数据，返回新增和更新的记录数"""
+        relations = self.build(rows)
+
+        created = []
+        updated = []
+        now = timezone.now()
+        for relation in relations:
+            existing = self._existing.get(relation.employee_id)
+            if existing is None:
+                created.append(relation)
+                continue
+            if all(getattr(existing, field) == getattr(relation, field) for field in DIFF_FIELDS):
+                self.unchanged_count += 1
+                continue
+            for field in DIFF_FIELDS:
+                setattr(existing, field, getattr(relation, field))
+            existing.updated_at = now
+            updated.append(existing)
+
+        EmployeeRelation.objects.bulk_create(created, batch_size=self.batch_size)
+        if updated:
+            EmployeeRelation.objects.bulk_update(
+                updated, DIFF_FIELDS + ('updated_at',), batch_size=self.batch_size
+            )
+
+        # MySQL 批量插入不返回主键，需要补查后再同步负责人关联
+        unsaved = {relation.employee_id: relation for relation in created if relation.pk is None}
+        if unsaved:
+            for employee_id, relation_id in EmployeeRelation.objects.filter(
+                date=self.date, employee_id__in=unsaved.keys()
+            ).values_list('employee_id', 'id'):
+                unsaved[employee_id].pk = relation_id
+        sync_leaders(created + updated, batch_size=self.batch_size, employee_ids=self._employee_ids)
+        self.created_count += len(created)
+        self.updated_count += len(updated)
+        return len(created) + len(updated)
+
+
+def _tabular_row(header, values):
+    """将表格中的一行转换为与JSON导入相同的格式"""
+    row = {}
+    for column, value in zip(header, values):
+        key = COLUMN_ALIASES.get(column)
+        if key is None:
+            continue
+        value = '' if value is None else str(value).strip()
+        if key in LIST_COLUMNS:
+            value = [item.strip() for item in LIST_SEPARATOR.split(value) if item.strip()]
+        row[key] = value
+
+    if row.get('role'):
+        row['role'] = ROLE_LABELS.get(row['role'], row['role'])
+    else:
+        row.pop('role', None)
+    if 'attributes' in row:
+        row['attributes'] = [ATTRIBUTE_LABELS.get(item, item) for item in row['attributes']]
+    return row
+
+
+def _iter_csv(upload):
+    reader = csv.reader(io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''))
+    header = [column.strip() for column in next(reader, [])]
+    for values in reader:
+        if any(values):
+            yield _tabular_row(header, values)
+
+
+def _iter_xlsx(upload):
+    from openpyxl import load_workbook
+
+    # 只读模式按行读取，不把整个工作簿载入内存
+    workbook = load_workbook(upload.file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(column).strip() if column is not None else '' for column in next(rows, ())]
+        for values in rows:
+            if any(value is not None for value in values):
+                yield _tabular_row(header, values)
+    finally:
+        workbook.close()
+
+
+def _iter_ndjson(upload):
+    for number, line in enumerate(upload, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield f"第 {number} 行不是合法的JSON"
+
+
+def detect_upload_format(upload, requested=None):
+    """根据请求参数或文件扩展名确定上传文件格式，无法识别时返回 None"""
+    fmt = (requested or upload.name.rsplit('.', 1)[-1]).lower()
+    if fmt == 'jsonl':
+        fmt = 'ndjson'
+    return fmt if fmt in UPLOAD_FORMATS else None
+
+
+def iter_upload_rows(upload, fmt):
+    """逐行解析上传的人员关系文件"""
+    parsers = {
+        'csv': _iter_csv,
+        'xlsx': _iter_xlsx,
+        'ndjson': _iter_ndjson,
+    }
+    return parsers[fmt](upload)
+
+
+def iter_chunks(rows, size):
+    """将行生成器按固定大小分块"""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
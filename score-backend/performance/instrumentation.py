@@ -0,0 +1,244 @@
+"""请求性能统计
+
+RequestMetricsMiddleware 按 REQUEST_METRICS_SAMPLE_RATE 抽样记录请求，记录每个请求的总耗时、SQL 条数及耗时、
+序列化耗时和响应大小，并输出到三处：
+响应头 Server-Timing（浏览器开发者工具可直接查看）、performance.requests 日志（每个请求一行 JSON），
+以及按视图汇总的进程内耗时分布（metrics/requests/ 查看）。
+未抽中的请求只多一次随机数判断。
+
+SQL 通过在每个新建的数据库连接上安装 execute_wrapper 统计；序列化耗时由视图的 SerializerTimingMixin 统计
+get_serializer() 所得序列化器的 .data 及响应渲染（JSON 编码），视图直接构造的序列化器通过 serialized() 读取 .data，
+只在请求被抽中时计时，不修改 DRF 本身。
+当前请求的统计对象保存在 contextvar 中，sync_to_async 执行的查询同样计入发起请求。
+流式响应只统计到开始输出为止。
+"""
+import json
+import logging
+import random
+import threading
+import time
+from bisect import bisect_right
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.response import Response
+
+from .statistics import bucket_labels
+
+logger = logging.getLogger('performance.requests')
+
+# 耗时分布的分段（毫秒）
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+current_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """单个请求的统计"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.query_times = []
+        self.serialize_time = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    """数据库连接的 execute_wrapper：请求被抽中时记录 SQL 耗时"""
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.query_times.append(time.perf_counter() - start)
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """connection_created 信号：在新建的数据库连接上安装 SQL 统计"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def timed_serialization():
+    """请求被抽中时将代码块的耗时计入序列化耗时"""
+    metrics = current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serialize_time += time.perf_counter() - start
+
+
+def serialized(serializer):
+    """读取序列化器的 .data，计入序列化耗时"""
+    with timed_serialization():
+        return serializer.data
+
+
+class SerializerTimingMixin:
+    """DRF 视图混入：请求被抽中时统计序列化耗时
+
+    用于输出的序列化器（未传入 data）在取得时即读取一次 .data 并计时，序列化器会缓存结果，
+    视图随后读取 .data 时不再重复序列化；返回的 Response 在 finalize_response 中渲染并计时，
+    返回普通字典的统计类视图的序列化耗时即为渲染耗时。未抽中的请求不做任何处理。
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if current_metrics.get() is not None and 'data' not in kwargs:
+            serialized(serializer)
+        return serializer
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if current_metrics.get() is not None and isinstance(response, Response) and not response.is_rendered:
+            # 提前渲染，结果与 Django 随后渲染相同
+            with timed_serialization():
+                response.render()
+        return response
+
+
+class ViewHistogram:
+    """单个视图的耗时分布及平均值"""
+    labels = bucket_labels(LATENCY_BUCKETS)
+
+    def __init__(self):
+        self.count = 0
+        self.buckets = [0] * len(self.labels)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.db_ms = 0.0
+        self.queries = 0
+        self.serialize_ms = 0.0
+        self.size = 0
+
+    def add(self, record):
+        self.count += 1
+        self.buckets[bisect_right(LATENCY_BUCKETS, record['total_ms'])] += 1
+        self.total_ms += record['total_ms']
+        self.max_ms = max(self.max_ms, record['total_ms'])
+        self.db_ms += record['db_ms']
+        self.queries += record['queries']
+        self.serialize_ms += record['serialize_ms']
+        self.size += record['size'] or 0
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2),
+            "max_ms": round(self.max_ms, 2),
+            "db_mean_ms": round(self.db_ms / self.count, 2),
+            "queries_mean": round(self.queries / self.count, 2),
+            "serialize_mean_ms": round(self.serialize_ms / self.count, 2),
+            "size_mean": round(self.size / self.count),
+            "histogram": dict(zip(self.labels, self.buckets)),
+        }
+
+
+histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def record_request(record):
+    with _histograms_lock:
+        histograms.setdefault(record['view'], ViewHistogram()).add(record)
+
+
+def request_metrics():
+    """按视图汇总的耗时统计"""
+    with _histograms_lock:
+        return {
+            "sample_rate": settings.REQUEST_METRICS_SAMPLE_RATE,
+            "buckets": list(LATENCY_BUCKETS),
+            "views": {view: histogram.summary() for view, histogram in sorted(histograms.items())},
+        }
+
+
+def reset_request_metrics():
+    with _histograms_lock:
+        histograms.clear()
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '(unresolved)'
+    return getattr(match.func, 'view_class', match.func).__name__
+
+
+def response_size(response):
+    if response.streaming:
+        length = response.get('Content-Length')
+        return int(length) if length else None
+    return len(response.content)
+
+
+class RequestMetricsMiddleware:
+    """抽样记录请求耗时、SQL 条数及耗时、序列化耗时和响应大小，应放在 MIDDLEWARE 的最前面"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    @staticmethod
+    def sampled():
+        rate = settings.REQUEST_METRICS_SAMPLE_RATE
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def finish(self, request, response, metrics):
+        total_ms = (time.perf_counter() - metrics.start) * 1000
+        db_ms = sum(metrics.query_times) * 1000
+        serialize_ms = metrics.serialize_time * 1000
+        record = {
+            "view": view_name(request),
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(total_ms, 2),
+            "db_ms": round(db_ms, 2),
+            "queries": len(metrics.query_times),
+            "serialize_ms": round(serialize_ms, 2),
+            "size": response_size(response),
+        }
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={db_ms:.2f};desc="{len(metrics.query_times)} queries"',
+            f'serialize;dur={serialize_ms:.2f}',
+            f'total;dur={total_ms:.2f}',
+        ])
+        record_request(record)
+        logger.info(json.dumps(record, ensure_ascii=False))
+        return response
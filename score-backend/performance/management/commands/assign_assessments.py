@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from performance.assessments import assign_assessments
+
+
+class Command(BaseCommand):
+    help = "按人员关系生成指定考核周期的待评价考核任务，已存在的任务保持不变"
+
+    def add_arguments(self, parser):
+        parser.add_argument('period', help="考核周期，格式：YYYYMM")
+        parser.add_argument('--batch-size', type=int, default=1000, help="批量写入的批次大小")
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        period = options['period']
+        task_count, created_count = assign_assessments(period, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{period} 考核任务分配完成: 共 {task_count} 项，新增 {created_count} 项"
+        ))
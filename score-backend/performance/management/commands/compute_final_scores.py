@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from performance.scoring import RANK_FUNCTIONS, compute_final_scores, score_period, update_ranks
+
+
+class Command(BaseCommand):
+    help = "按计分规则计算指定考核周期的最终得分并更新排名"
+
+    def add_arguments(self, parser):
+        parser.add_argument('period', help="考核周期，格式：YYYYMM")
+        parser.add_argument(
+            '--rescore', action='store_true',
+            help="先按当前考核指标重新计算该周期所有考核的总分",
+        )
+        parser.add_argument(
+            '--rank-mode', choices=sorted(RANK_FUNCTIONS), default='competition',
+            help="并列得分的排名方式：competition 并列占位，dense 并列不占位",
+        )
+        parser.add_argument('--company-rank', action='store_true', help="同时计算公司排名")
+        parser.add_argument('--batch-size', type=int, default=1000, help="批量写入的批次大小")
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        period = options['period']
+        if options['rescore']:
+            rescored = score_period(period, batch_size=options['batch_size'])
+            self.stdout.write(f"重新计算考核总分: {rescored} 条")
+
+        count = compute_final_scores(period, batch_size=options['batch_size'])
+        update_ranks(
+            period,
+            mode=options['rank_mode'],
+            company_wide=options['company_rank'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"{period} 最终得分及排名计算完成: {count} 人"))
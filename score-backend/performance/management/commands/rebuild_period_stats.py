@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from performance.models import FinalScore, PeriodDepartmentStats
+from performance.statistics import is_period, refresh_period_stats
+
+
+class Command(BaseCommand):
+    help = "由最终得分重新生成部门得分汇总表，不指定周期时重建全部周期"
+
+    def add_arguments(self, parser):
+        parser.add_argument('periods', nargs='*', help="考核周期，格式：YYYYMM")
+        parser.add_argument('--batch-size', type=int, default=1000, help="批量写入的批次大小")
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        periods = options['periods']
+        invalid = [period for period in periods if not is_period(period)]
+        if invalid:
+            raise CommandError(f"考核周期格式应为 YYYYMM: {', '.join(invalid)}")
+
+        if not periods:
+            periods = sorted(set(FinalScore.objects.values_list('period', flat=True).distinct()))
+            # 已没有最终得分的周期一并清除
+            PeriodDepartmentStats.objects.exclude(period__in=periods).delete()
+
+        count = 0
+        for period in periods:
+            count += refresh_period_stats([period], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"部门得分汇总重建完成: {len(periods)} 个周期，{count} 行"))
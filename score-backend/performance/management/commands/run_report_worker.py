@@ -0,0 +1,52 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from performance.reports import claim_next_job, fail_job, run_job
+
+logger = logging.getLogger('performance.reports')
+
+
+class Command(BaseCommand):
+    help = "后台生成绩效报告：轮询排队中的报告任务并生成报告文件"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="处理完当前排队的任务后退出")
+        parser.add_argument('--processes', type=int, default=settings.REPORT_PROCESSES, help="并行渲染的进程数")
+        parser.add_argument('--interval', type=float, default=settings.REPORT_POLL_INTERVAL, help="轮询间隔（秒）")
+
+    def handle(self, *args, **options):
+        while True:
+            # 长期运行的进程不经过请求处理，每轮按 CONN_MAX_AGE 关闭过期或已断开的连接
+            close_old_connections()
+            try:
+                job = claim_next_job()
+            except DatabaseError:
+                logger.exception("领取报告任务失败")
+                job = None
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            try:
+                run_job(job, processes=options['processes'])
+            except Exception as e:
+                # 保存报告文件或任务状态时出错（数据库、文件存储），记录失败后继续处理下一个任务
+                logger.exception("报告生成任务异常: %s", job)
+                close_old_connections()
+                try:
+                    fail_job(job, e)
+                except DatabaseError:
+                    # 无法记录时任务保持生成中，超时后重新排队
+                    logger.exception("记录报告任务失败状态失败: %s", job)
+                self.stderr.write(f"报告生成失败: {job}: {e}")
+                continue
+            if job.status == 'completed':
+                self.stdout.write(self.style.SUCCESS(f"报告生成完成: {job}"))
+            else:
+                self.stderr.write(f"报告生成失败: {job}: {job.error}")
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0003_remove_assessment_score_comments_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='finalscore',
+            name='company_rank',
+            field=models.IntegerField(default=0, verbose_name='公司排名'),
+        ),
+    ]
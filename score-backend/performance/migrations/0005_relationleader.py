@@ -0,0 +1,59 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_relation_leaders(apps, schema_editor):
+    """根据 leaders 字段中的负责人姓名生成关联记录"""
+    Employee = apps.get_model('performance', 'Employee')
+    EmployeeRelation = apps.get_model('performance', 'EmployeeRelation')
+    RelationLeader = apps.get_model('performance', 'RelationLeader')
+
+    relations = list(EmployeeRelation.objects.exclude(leaders='').values_list('id', 'leaders'))
+    names = {name for _, leaders in relations for name in leaders.split(',') if name}
+
+    # 重名时取排序后的第一个，与导入时的姓名解析一致
+    leader_ids = {}
+    for name, employee_id in Employee.objects.filter(name__in=names).order_by(
+        'department__name', 'name'
+    ).values_list('name', 'id'):
+        leader_ids.setdefault(name, employee_id)
+
+    links = {
+        (relation_id, leader_ids[name])
+        for relation_id, leaders in relations
+        for name in leaders.split(',')
+        if name in leader_ids
+    }
+    RelationLeader.objects.bulk_create(
+        [RelationLeader(relation_id=relation_id, leader_id=leader_id) for relation_id, leader_id in links],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0004_finalscore_company_rank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelationLeader',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leader', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leader_links', to='performance.employee', verbose_name='项目负责人')),
+                ('relation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leader_links', to='performance.employeerelation', verbose_name='人员关系')),
+            ],
+            options={
+                'verbose_name': '人员关系负责人',
+                'verbose_name_plural': '人员关系负责人',
+                'unique_together': {('relation', 'leader')},
+            },
+        ),
+        migrations.AddField(
+            model_name='employeerelation',
+            name='leader_employees',
+            field=models.ManyToManyField(blank=True, related_name='led_relations', through='performance.RelationLeader', to='performance.employee', verbose_name='项目负责人员工'),
+        ),
+        migrations.RunPython(populate_relation_leaders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0005_relationleader'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assessment',
+            index=models.Index(fields=['period', 'evaluator'], name='assessment_period_eval_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assessment',
+            index=models.Index(fields=['period', 'employee'], name='assessment_period_emp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeerelation',
+            index=models.Index(fields=['date', 'role'], name='relation_date_role_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='finalscore',
+            index=models.Index(fields=['period', '-final_score'], name='finalscore_period_score_idx'),
+        ),
+    ]
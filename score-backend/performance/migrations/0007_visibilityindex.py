@@ -0,0 +1,27 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0006_period_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VisibilityIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=6, verbose_name='考核周期')),
+                ('employees', models.JSONField(default=list, verbose_name='可见人员')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('evaluator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visibility_indexes', to='performance.employee', verbose_name='评价人')),
+            ],
+            options={
+                'verbose_name': '评价人可见人员索引',
+                'verbose_name_plural': '评价人可见人员索引',
+                'unique_together': {('period', 'evaluator')},
+            },
+        ),
+    ]
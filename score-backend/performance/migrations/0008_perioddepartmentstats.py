@@ -0,0 +1,32 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0007_visibilityindex'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodDepartmentStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=6, verbose_name='考核周期')),
+                ('role', models.CharField(blank=True, default='', max_length=20, verbose_name='人员角色')),
+                ('count', models.IntegerField(default=0, verbose_name='人数')),
+                ('score_sum', models.FloatField(default=0, verbose_name='得分合计')),
+                ('score_sumsq', models.FloatField(default=0, verbose_name='得分平方和')),
+                ('buckets', models.JSONField(default=list, verbose_name='分段人数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_stats', to='performance.department', verbose_name='部门')),
+            ],
+            options={
+                'verbose_name': '部门得分汇总',
+                'verbose_name_plural': '部门得分汇总',
+                'ordering': ['period', 'department', 'role'],
+                'unique_together': {('period', 'department', 'role')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0008_perioddepartmentstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerformanceAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=6, verbose_name='考核周期')),
+                ('rule', models.CharField(choices=[('threshold', '低于预警分数'), ('rolling_drop', '低于个人近期平均'), ('bottom_percentile', '部门后位')], max_length=20, verbose_name='预警规则')),
+                ('score', models.FloatField(verbose_name='最终得分')),
+                ('reference', models.FloatField(verbose_name='对比值')),
+                ('message', models.CharField(max_length=200, verbose_name='预警信息')),
+                ('acknowledged', models.BooleanField(default=False, verbose_name='已处理')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='performance.employee', verbose_name='员工')),
+            ],
+            options={
+                'verbose_name': '绩效预警',
+                'verbose_name_plural': '绩效预警',
+                'ordering': ['-period', 'employee__name', 'rule'],
+                'indexes': [models.Index(fields=['period', 'rule'], name='alert_period_rule_idx')],
+                'unique_together': {('employee', 'period', 'rule')},
+            },
+        ),
+    ]
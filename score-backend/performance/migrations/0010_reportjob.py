@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0009_performancealert'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=6, verbose_name='考核周期')),
+                ('scope', models.CharField(default='company', max_length=20, verbose_name='报告范围')),
+                ('format', models.CharField(choices=[('pdf', 'PDF'), ('docx', 'Word'), ('xlsx', 'Excel')], max_length=10, verbose_name='报告格式')),
+                ('status', models.CharField(choices=[('pending', '排队中'), ('running', '生成中'), ('completed', '已完成'), ('failed', '失败')], default='pending', max_length=20, verbose_name='状态')),
+                ('data_version', models.CharField(max_length=50, verbose_name='数据版本')),
+                ('file', models.FileField(blank=True, upload_to='reports/', verbose_name='报告文件')),
+                ('error', models.TextField(blank=True, default='', verbose_name='错误信息')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+            ],
+            options={
+                'verbose_name': '报告生成任务',
+                'verbose_name_plural': '报告生成任务',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['period', 'scope', 'format'], name='reportjob_key_idx'), models.Index(fields=['status', 'created_at'], name='reportjob_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+
+def populate_attribute_keys(apps, schema_editor):
+    """根据 attributes 生成排序去重后的属性组合"""
+    EmployeeRelation = apps.get_model('performance', 'EmployeeRelation')
+
+    relations = []
+    for relation in EmployeeRelation.objects.only('id', 'attributes').iterator(chunk_size=1000):
+        attributes = relation.attributes if isinstance(relation.attributes, list) else []
+        relation.attribute_key = ','.join(sorted({str(attribute) for attribute in attributes}))
+        if relation.attribute_key:
+            relations.append(relation)
+    EmployeeRelation.objects.bulk_update(relations, ['attribute_key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0010_reportjob'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='employeerelation',
+            name='relation_date_role_idx',
+        ),
+        migrations.AddField(
+            model_name='employeerelation',
+            name='attribute_key',
+            field=models.CharField(blank=True, default='', max_length=500, verbose_name='人员属性组合'),
+        ),
+        migrations.RunPython(populate_attribute_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='employeerelation',
+            index=models.Index(fields=['date', 'role', 'attribute_key'], name='relation_date_role_idx'),
+        ),
+    ]
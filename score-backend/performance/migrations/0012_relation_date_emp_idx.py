@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0011_employeerelation_attribute_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employeerelation',
+            index=models.Index(fields=['date', 'employee'], name='relation_date_emp_idx'),
+        ),
+    ]
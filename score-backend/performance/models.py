@@ -1,4 +1,12 @@
-from django.db import models
+from django.db import models, transaction
+
+
+def loaded_values(field_names, values, names):
+    """from_db 读出的指定字段值元组，读取时未包含其中任一字段（如 only() 查询）时返回 None"""
+    if not all(name in field_names for name in names):
+        return None
+    return tuple(values[field_names.index(name)] for name in names)
+
 
 class Department(models.Model):
     """部门模型"""
@@ -41,6 +49,16 @@ class Employee(models.Model):
     def __str__(self):
         return f"{self.name} ({self.department.name})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 记录读出时的角色及部门，保存时据此判断是否变化，不必再查询一次（见 signals）
+        instance._loaded_role = values[field_names.index('role')] if 'role' in field_names else None
+        instance._loaded_department_id = (
+            values[field_names.index('department_id')] if 'department_id' in field_names else None
+        )
+        return instance
+
 class Indicator(models.Model):
     """考核指标模型 - 根据scoreCategories.js修改"""
     KIND_CHOICES = (
@@ -109,11 +127,18 @@ class EmployeeRelation(models.Model):
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="relations", verbose_name="组员")
     # 修改为 CharField 类型，存储项目负责人姓名，用逗号分隔
     leaders = models.CharField(max_length=500, blank=True, default="", verbose_name="项目负责人")
+    # 项目负责人关联表，与 leaders 同步维护，用于按负责人查找组员
+    leader_employees = models.ManyToManyField(
+        Employee, through='RelationLeader', blank=True,
+        related_name="led_relations", verbose_name="项目负责人员工"
+    )
     leader_count = models.IntegerField(default=0, verbose_name="负责人数量")
     # 修改为直接存储项目名称列表
     project_names = models.JSONField(default=list, verbose_name="参与项目名称")
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, verbose_name="人员角色")
     attributes = models.JSONField(default=list, verbose_name="人员属性")  # 存储多个属性值的列表
+    # 排序去重后逗号分隔的人员属性，与 attributes 同步维护，统计时按该列分组
+    attribute_key = models.CharField(max_length=500, blank=True, default="", verbose_name="人员属性组合")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
 
@@ -122,11 +147,17 @@ class EmployeeRelation(models.Model):
         verbose_name_plural = "员工关系"
         ordering = ['-date', 'employee__name']
         unique_together = ('employee', 'date')
+        indexes = [
+            models.Index(fields=['date', 'role', 'attribute_key'], name='relation_date_role_idx'),
+            # 游标分页按 (date, employee, id) 排序和定位
+            models.Index(fields=['date', 'employee'], name='relation_date_emp_idx'),
+        ]
 
     def __str__(self):
         return f"{self.employee.name} - {self.date} ({self.get_role_display()})"
     
-    def save(self, *args, **kwargs):
+    def normalize_leaders(self):
+        """根据角色整理项目负责人及负责人数量"""
         # 如果角色是自由人，清空项目负责人
         if self.role == 'free_person':
             self.leaders = ""
@@ -137,8 +168,43 @@ class EmployeeRelation(models.Model):
                 self.leader_count = len(self.leaders.split(','))
             else:
                 self.leader_count = 0
-        
-        super().save(*args, **kwargs)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 记录读出时的员工、日期及角色，保存时据此判断角色是否变化（见 signals）
+        instance._loaded_values = loaded_values(field_names, values, ('employee_id', 'date', 'role'))
+        return instance
+
+    def normalize_attributes(self):
+        """根据人员属性生成属性组合"""
+        attributes = self.attributes if isinstance(self.attributes, list) else []
+        self.attribute_key = ','.join(sorted({str(attribute) for attribute in attributes}))
+
+    def save(self, *args, **kwargs):
+        self.normalize_leaders()
+        self.normalize_attributes()
+        # 关系与负责人关联表在同一事务中写入，提交后的回调（如可见人员索引刷新）能读到完整数据
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None or 'leaders' in update_fields:
+                from .relations import sync_leaders
+                sync_leaders([self])
+
+class RelationLeader(models.Model):
+    """人员关系-项目负责人关联"""
+    relation = models.ForeignKey(EmployeeRelation, on_delete=models.CASCADE, related_name="leader_links", verbose_name="人员关系")
+    leader = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="leader_links", verbose_name="项目负责人")
+
+    class Meta:
+        verbose_name = "人员关系负责人"
+        verbose_name_plural = "人员关系负责人"
+        unique_together = ('relation', 'leader')
+
+    def __str__(self):
+        return f"{self.relation_id} - {self.leader_id}"
 
 class Assessment(models.Model):
     """考核模型 - 修改为包含考核详情"""
@@ -164,37 +230,131 @@ class Assessment(models.Model):
         verbose_name_plural = "考核"
         ordering = ['-period', 'employee__name']
         unique_together = ('employee', 'evaluator', 'period')
+        indexes = [
+            models.Index(fields=['period', 'evaluator'], name='assessment_period_eval_idx'),
+            models.Index(fields=['period', 'employee'], name='assessment_period_emp_idx'),
+        ]
 
     def __str__(self):
         return f"{self.employee.name} - {self.period} ({self.evaluator.name})"
     
     def calculate_total_score(self):
         """计算总分"""
-        if not self.scores:
-            return 0
-        
-        # 获取所有指标
-        indicators = {str(ind.seq): ind for ind in Indicator.objects.filter(dept=self.employee.department.name)}
-        
-        total = 0
-        for seq, score in self.scores.items():
-            if seq in indicators:
-                # 根据指标类型计算得分
-                indicator = indicators[seq]
-                if indicator.kind == '0':  # 基础项
-                    total += float(score)
-                elif indicator.kind == '1':  # 加分项
-                    total += float(score)
-                elif indicator.kind == '2':  # 减分项
-                    total -= float(score)
-        
-        return total
+        from .scoring import score_assessment
+        return score_assessment(self)
     
     def save(self, *args, **kwargs):
         # 计算总分
         self.total_score = self.calculate_total_score()
         super().save(*args, **kwargs)
 
+class VisibilityIndex(models.Model):
+    """评价人可见人员索引 - 按考核周期预先计算，见 visibility 模块"""
+    period = models.CharField(max_length=6, verbose_name="考核周期")  # 格式：YYYYMM
+    evaluator = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="visibility_indexes", verbose_name="评价人")
+    # 可见人员，格式为 [[员工ID, 人员角色], ...]，按员工姓名排序
+    employees = models.JSONField(default=list, verbose_name="可见人员")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "评价人可见人员索引"
+        verbose_name_plural = "评价人可见人员索引"
+        unique_together = ('period', 'evaluator')
+
+    def __str__(self):
+        return f"{self.period} - {self.evaluator_id}"
+
+class PeriodDepartmentStats(models.Model):
+    """各周期部门得分汇总 - 按 (考核周期, 部门, 人员角色) 汇总最终得分，见 statistics 模块"""
+    period = models.CharField(max_length=6, verbose_name="考核周期")  # 格式：YYYYMM
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name="period_stats", verbose_name="部门")
+    # 该周期的人员关系角色，没有人员关系时为空
+    role = models.CharField(max_length=20, blank=True, default="", verbose_name="人员角色")
+    count = models.IntegerField(default=0, verbose_name="人数")
+    score_sum = models.FloatField(default=0, verbose_name="得分合计")
+    score_sumsq = models.FloatField(default=0, verbose_name="得分平方和")
+    # 按 statistics.SCORE_BUCKETS 分段的人数，格式为 [<40人数, 40-50人数, ..., 90+人数]
+    buckets = models.JSONField(default=list, verbose_name="分段人数")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "部门得分汇总"
+        verbose_name_plural = "部门得分汇总"
+        ordering = ['period', 'department', 'role']
+        unique_together = ('period', 'department', 'role')
+
+    def __str__(self):
+        return f"{self.period} - {self.department_id} ({self.role})"
+
+class PerformanceAlert(models.Model):
+    """绩效预警 - 计算最终得分后由预警规则批量生成，见 alerts 模块"""
+    RULE_CHOICES = (
+        ('threshold', '低于预警分数'),
+        ('rolling_drop', '低于个人近期平均'),
+        ('bottom_percentile', '部门后位'),
+    )
+    
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="alerts", verbose_name="员工")
+    period = models.CharField(max_length=6, verbose_name="考核周期")  # 格式：YYYYMM
+    rule = models.CharField(max_length=20, choices=RULE_CHOICES, verbose_name="预警规则")
+    score = models.FloatField(verbose_name="最终得分")
+    reference = models.FloatField(verbose_name="对比值")  # 预警分数、近期平均分或部门分位分数
+    message = models.CharField(max_length=200, verbose_name="预警信息")
+    acknowledged = models.BooleanField(default=False, verbose_name="已处理")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "绩效预警"
+        verbose_name_plural = "绩效预警"
+        ordering = ['-period', 'employee__name', 'rule']
+        unique_together = ('employee', 'period', 'rule')
+        indexes = [
+            models.Index(fields=['period', 'rule'], name='alert_period_rule_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee.name} - {self.period} ({self.get_rule_display()})"
+
+class ReportJob(models.Model):
+    """绩效报告生成任务 - 由后台进程（run_report_worker）生成，见 reports 模块"""
+    STATUS_CHOICES = (
+        ('pending', '排队中'),
+        ('running', '生成中'),
+        ('completed', '已完成'),
+        ('failed', '失败'),
+    )
+    FORMAT_CHOICES = (
+        ('pdf', 'PDF'),
+        ('docx', 'Word'),
+        ('xlsx', 'Excel'),
+    )
+    
+    period = models.CharField(max_length=6, verbose_name="考核周期")  # 格式：YYYYMM
+    # company 为全公司（各部门报告打包），否则为部门ID
+    scope = models.CharField(max_length=20, default='company', verbose_name="报告范围")
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, verbose_name="报告格式")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="状态")
+    # 提交时该周期最终得分的版本，得分重新计算后旧报告不再复用
+    data_version = models.CharField(max_length=50, verbose_name="数据版本")
+    file = models.FileField(upload_to='reports/', blank=True, verbose_name="报告文件")
+    error = models.TextField(blank=True, default="", verbose_name="错误信息")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    started_at = models.DateTimeField(blank=True, null=True, verbose_name="开始时间")
+    finished_at = models.DateTimeField(blank=True, null=True, verbose_name="完成时间")
+
+    class Meta:
+        verbose_name = "报告生成任务"
+        verbose_name_plural = "报告生成任务"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['period', 'scope', 'format'], name='reportjob_key_idx'),
+            models.Index(fields=['status', 'created_at'], name='reportjob_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.period} {self.scope}.{self.format} ({self.get_status_display()})"
+
 # 删除 AssessmentDetail 模型
 
 class FinalScore(models.Model):
@@ -206,6 +366,7 @@ class FinalScore(models.Model):
     self_score = models.FloatField(default=0, verbose_name="自评分")
     final_score = models.FloatField(default=0, verbose_name="最终得分")
     rank = models.IntegerField(default=0, verbose_name="排名")
+    company_rank = models.IntegerField(default=0, verbose_name="公司排名")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
 
@@ -214,6 +375,16 @@ class FinalScore(models.Model):
         verbose_name_plural = "最终得分"
         ordering = ['-period', '-final_score']
         unique_together = ('employee', 'period')
+        indexes = [
+            models.Index(fields=['period', '-final_score'], name='finalscore_period_score_idx'),
+        ]
 
     def __str__(self):
         return f"{self.employee.name} - {self.period} ({self.final_score})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 记录读出时的员工、周期及得分，保存时按差值增量更新部门得分汇总（见 signals）
+        instance._loaded_values = loaded_values(field_names, values, ('employee_id', 'period', 'final_score'))
+        return instance
@@ -0,0 +1,116 @@
+"""分页
+
+默认沿用页码分页；请求参数 pagination=cursor（或带 cursor 参数）时改用游标分页。
+游标分页按视图的 keyset_ordering 多字段排序，以上一页最后一行的排序字段值作为游标，
+下一页通过条件过滤直接定位，不需要 COUNT 和 OFFSET，翻到多深的页代价都相同。
+"""
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def keyset_filter(ordering, values):
+    """构造排在游标之后的过滤条件：(a > x) OR (a = x AND b > y) OR ..."""
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f"{name}__{lookup}": value})
+        equal[name] = value
+    return condition
+
+
+def ordering_value(obj, field):
+    """取对象上排序字段的值，支持 employee__name 形式的关联字段"""
+    for attr in field.lstrip('-').split('__'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+class KeysetPagination(BasePagination):
+    """多字段游标分页，只支持向后翻页"""
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 100
+    max_page_size = 1000
+    ordering = ('id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = tuple(getattr(view, 'keyset_ordering', self.ordering))
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(keyset_filter(self.ordering, cursor))
+
+        # 多取一行判断是否还有下一页
+        results = list(queryset[:page_size + 1])
+        self.next_cursor = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            self.next_cursor = [ordering_value(results[-1], field) for field in self.ordering]
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound("无效的游标")
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound("无效的游标")
+        return values
+
+    def encode_cursor(self, values):
+        return base64.urlsafe_b64encode(
+            json.dumps(values, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        ).decode('ascii')
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_cursor))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+class OptionalKeysetPagination(BasePagination):
+    """默认页码分页，pagination=cursor 或带 cursor 参数时使用游标分页"""
+    mode_query_param = 'pagination'
+
+    def get_paginator(self, request):
+        params = request.query_params
+        if params.get(self.mode_query_param) == 'cursor' or KeysetPagination.cursor_query_param in params:
+            return KeysetPagination()
+        return PageNumberPagination()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.get_paginator(request)
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
@@ -0,0 +1,175 @@
+"""人员关系项目负责人维护
+
+EmployeeRelation.leaders 以逗号分隔保存负责人姓名，RelationLeader 关联表与之同步，
+按负责人查找组员时走关联表索引。
+人员角色变更及项目负责人降级后的级联更新均在内存中计算后批量写回。
+按月份的人员关系快照缓存在 relation_snapshots 中。
+"""
+from django.db.models import F
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .cache import CachedNamespace
+from .models import Employee, EmployeeRelation, RelationLeader
+
+# 角色等级: project_leader > project_member > free_person，角色只能由高向低变更
+ROLE_LEVELS = {
+    'project_leader': 3,
+    'project_member': 2,
+    'free_person': 1,
+}
+
+
+SNAPSHOT_FIELDS = (
+    'id', 'employee_id', 'leaders', 'leader_count', 'project_names', 'role', 'attributes',
+)
+
+
+def load_relation_snapshots(dates):
+    """加载多个月份的人员关系快照，返回 {日期: [关系字典]}"""
+    snapshots = {date: [] for date in dates}
+    for relation in EmployeeRelation.objects.filter(date__in=dates).values(
+        'date', *SNAPSHOT_FIELDS, employee_name=F('employee__name'), employee_role=F('employee__role')
+    ).order_by('employee_name', 'id'):
+        snapshots[relation.pop('date')].append(relation)
+    return snapshots
+
+
+# 按月份缓存的人员关系快照，关系或员工变更、导入后失效
+relation_snapshots = CachedNamespace('relations', load_relation_snapshots)
+
+# 某月份的人员关系被批量写入（导入、批量变更角色、级联移除负责人）后发送，参数 date、employee_ids
+# （变更的员工ID，None 表示整个月份）；批量写入不触发逐条的 post_save 信号
+relations_changed = Signal()
+
+
+def notify_relations_changed(date, employee_ids=None):
+    """批量写入人员关系后使关系快照失效并发送 relations_changed 信号"""
+    relation_snapshots.invalidate(date)
+    relations_changed.send(sender=EmployeeRelation, date=date, employee_ids=employee_ids)
+
+
+def split_leaders(leaders):
+    """拆分逗号分隔的项目负责人姓名"""
+    return [name for name in leaders.split(',') if name] if leaders else []
+
+
+def resolve_employee_names(names):
+    """一次查询解析员工姓名，返回 {姓名: 员工ID}；重名时与逐条查询一样取排序后的第一个"""
+    resolved = {}
+    names = set(names)
+    if names:
+        for name, employee_id in Employee.objects.filter(name__in=names).values_list('name', 'id'):
+            resolved.setdefault(name, employee_id)
+    return resolved
+
+
+def sync_leaders(relations, batch_size=1000, employee_ids=None):
+    """按 leaders 字段批量同步人员关系的项目负责人关联表
+
+    每批关系读取一次姓名和现有关联，只删除和新增有差异的关联记录。
+    employee_ids 为已解析的 {姓名: 员工ID}，传入时只补查其中没有的姓名。
+    """
+    leader_ids = {} if employee_ids is None else employee_ids
+    relations = [relation for relation in relations if relation.pk]
+    for start in range(0, len(relations), batch_size):
+        batch = relations[start:start + batch_size]
+        leader_ids.update(resolve_employee_names(
+            name for relation in batch for name in split_leaders(relation.leaders)
+            if name not in leader_ids
+        ))
+
+        wanted = set()
+        for relation in batch:
+            for name in split_leaders(relation.leaders):
+                if name in leader_ids:
+                    wanted.add((relation.pk, leader_ids[name]))
+
+        stale = []
+        existing = set()
+        for link_id, relation_id, leader_id in RelationLeader.objects.filter(
+            relation_id__in=[relation.pk for relation in batch]
+        ).values_list('id', 'relation_id', 'leader_id'):
+            if (relation_id, leader_id) in wanted:
+                existing.add((relation_id, leader_id))
+            else:
+                stale.append(link_id)
+
+        if stale:
+            RelationLeader.objects.filter(id__in=stale).delete()
+        RelationLeader.objects.bulk_create(
+            [RelationLeader(relation_id=relation_id, leader_id=leader_id)
+             for relation_id, leader_id in wanted - existing],
+            batch_size=batch_size,
+        )
+
+
+def remove_leaders(date, leader_ids, batch_size=1000):
+    """项目负责人降级后，从该日期其他人员关系中批量移除这些负责人
+
+    移除后没有项目负责人的组员改为自由人。返回受影响的关系数。
+    """
+    leader_ids = set(leader_ids)
+    leader_names = dict(Employee.objects.filter(id__in=leader_ids).order_by().values_list('id', 'name'))
+    links = RelationLeader.objects.filter(
+        relation__date=date, leader_id__in=leader_ids
+    ).exclude(leader_id=F('relation__employee_id'))
+    relations = list(EmployeeRelation.objects.filter(
+        id__in=links.values('relation_id')
+    ).order_by().only('id', 'employee_id', 'leaders', 'leader_count', 'role'))
+    if not relations:
+        return 0
+
+    now = timezone.now()
+    for relation in relations:
+        # 同一批降级的负责人不从自己的关系中移除
+        removed = {name for leader_id, name in leader_names.items() if leader_id != relation.employee_id}
+        relation.leaders = ','.join(name for name in split_leaders(relation.leaders) if name not in removed)
+        # 如果移除后没有项目负责人，则将角色设置为自由人
+        if not relation.leaders and relation.role != 'free_person':
+            relation.role = 'free_person'
+        relation.normalize_leaders()
+        relation.updated_at = now
+
+    EmployeeRelation.objects.bulk_update(
+        relations, ['leaders', 'leader_count', 'role', 'updated_at'], batch_size=batch_size
+    )
+    RelationLeader.objects.filter(id__in=list(links.values_list('id', flat=True))).delete()
+    notify_relations_changed(date, [relation.employee_id for relation in relations])
+    return len(relations)
+
+
+def change_roles(changes, batch_size=1000):
+    """批量变更人员角色，changes 为 [(人员关系, 新角色)]
+
+    变更后的关系一次 bulk_update 写回，原项目负责人按日期合并后级联移除。
+    返回 (变更的关系数, 级联更新的关系数)。
+    """
+    now = timezone.now()
+    changed = []
+    demoted = {}
+    for relation, role in changes:
+        if relation.role == role:
+            continue
+        if relation.role == 'project_leader':
+            demoted.setdefault(relation.date, set()).add(relation.employee_id)
+        relation.role = role
+        relation.normalize_leaders()
+        relation.updated_at = now
+        changed.append(relation)
+
+    if changed:
+        EmployeeRelation.objects.bulk_update(
+            changed, ['role', 'leaders', 'leader_count', 'updated_at'], batch_size=batch_size
+        )
+        sync_leaders([relation for relation in changed if relation.role == 'free_person'], batch_size=batch_size)
+        changed_by_date = {}
+        for relation in changed:
+            changed_by_date.setdefault(relation.date, []).append(relation.employee_id)
+        for date, employee_ids in changed_by_date.items():
+            notify_relations_changed(date, employee_ids)
+
+    cascaded = 0
+    for date, leader_ids in demoted.items():
+        cascaded += remove_leaders(date, leader_ids, batch_size=batch_size)
+    return len(changed), cascaded
@@ -0,0 +1,129 @@
+"""绩效报告渲染
+
+每个部门的报告由独立的进程渲染，这里只接收整理好的普通数据（dict/list），不访问数据库，
+便于在进程池中并行执行。reportlab、python-docx 仅在渲染对应格式时导入。
+"""
+import io
+
+from openpyxl import Workbook
+
+REPORT_FORMATS = {
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+SUMMARY_COLUMNS = [
+    ('name', '部门'), ('count', '人数'), ('mean', '平均分'), ('stddev', '标准差'),
+    ('min', '最低分'), ('max', '最高分'),
+]
+ROW_COLUMNS = [
+    ('rank', '排名'), ('employee_name', '姓名'), ('department_leader_score', '部门负责人评分'),
+    ('project_leader_score', '项目负责人评分'), ('self_score', '自评分'), ('final_score', '最终得分'),
+]
+
+
+def section_tables(section):
+    """报告内容整理为若干 (标题, 表头, 数据行)"""
+    summary = section['summary']
+    tables = [(
+        "得分概况",
+        [label for _, label in SUMMARY_COLUMNS],
+        [[summary.get(key) for key, _ in SUMMARY_COLUMNS]],
+    ), (
+        "得分分布",
+        list(summary['histogram']),
+        [list(summary['histogram'].values())],
+    )]
+    if section['departments']:
+        tables.append((
+            "各部门统计",
+            [label for _, label in SUMMARY_COLUMNS],
+            [[department.get(key) for key, _ in SUMMARY_COLUMNS] for department in section['departments']],
+        ))
+    if section['rows']:
+        tables.append((
+            "人员得分",
+            [label for _, label in ROW_COLUMNS],
+            [[row.get(key) for key, _ in ROW_COLUMNS] for row in section['rows']],
+        ))
+    return tables
+
+
+def render_xlsx(section):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "绩效报告"
+    sheet.append([section['title']])
+    for title, header, rows in section_tables(section):
+        sheet.append([])
+        sheet.append([title])
+        sheet.append(header)
+        for row in rows:
+            sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def render_pdf(section):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    # 内置的中文字体，无需额外字体文件
+    pdfmetrics.registerFont(UnicodeCIDFont('STSong-Light'))
+    styles = getSampleStyleSheet()
+    for style in styles.byName.values():
+        style.fontName = 'STSong-Light'
+
+    story = [Paragraph(section['title'], styles['Title'])]
+    for title, header, rows in section_tables(section):
+        story.append(Paragraph(title, styles['Heading2']))
+        table = Table([header] + [['' if value is None else value for value in row] for row in rows], repeatRows=1)
+        table.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'STSong-Light'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ]))
+        story += [table, Spacer(1, 12)]
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4).build(story)
+    return buffer.getvalue()
+
+
+def render_docx(section):
+    from docx import Document
+
+    document = Document()
+    document.add_heading(section['title'], level=1)
+    for title, header, rows in section_tables(section):
+        document.add_heading(title, level=2)
+        table = document.add_table(rows=1, cols=len(header))
+        table.style = 'Table Grid'
+        for cell, value in zip(table.rows[0].cells, header):
+            cell.text = str(value)
+        for row in rows:
+            for cell, value in zip(table.add_row().cells, row):
+                cell.text = '' if value is None else str(value)
+
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+RENDERERS = {
+    'pdf': render_pdf,
+    'docx': render_docx,
+    'xlsx': render_xlsx,
+}
+
+
+def render_section(fmt, section):
+    """渲染一份报告，返回文件内容"""
+    return RENDERERS[fmt](section)
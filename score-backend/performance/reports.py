@@ -0,0 +1,192 @@
+"""绩效报告生成任务
+
+报告在请求线程外生成：接口只登记 ReportJob，由后台进程（manage.py run_report_worker）领取执行。
+每份报告一次查询取出该周期的最终得分，按部门整理后由进程池并行渲染各部门报告，
+全公司报告将汇总及各部门报告打包为 zip。
+相同 (周期, 范围, 格式) 且最终得分未变化时直接复用已生成的报告。
+后台进程异常退出时其生成中的任务超过 REPORT_JOB_TIMEOUT 后重新排队，由其他进程重新领取。
+"""
+import io
+import logging
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Department, FinalScore, ReportJob
+from .renderers import render_section
+from .statistics import SCORE_BUCKETS, bucket_labels
+
+logger = logging.getLogger(__name__)
+
+COMPANY_SCOPE = 'company'
+
+
+def data_version(period):
+    """该周期最终得分的版本：记录数及最后更新时间，重新计算得分、更新排名或删除得分后版本变化"""
+    result = FinalScore.objects.filter(period=period).aggregate(count=Count('id'), updated=Max('updated_at'))
+    updated = result['updated'].isoformat() if result['updated'] else ''
+    return f"{result['count']}:{updated}"
+
+
+def submit_report(period, scope, fmt):
+    """登记报告生成任务，返回 (任务, 是否复用已有任务)
+
+    相同 (周期, 范围, 格式) 且数据版本一致的已完成、排队中或生成中的任务直接返回。
+    """
+    version = data_version(period)
+    job = ReportJob.objects.filter(
+        period=period, scope=scope, format=fmt, data_version=version,
+        status__in=['pending', 'running', 'completed'],
+    ).order_by('-created_at').first()
+    if job is not None:
+        return job, True
+    return ReportJob.objects.create(period=period, scope=scope, format=fmt, data_version=version), False
+
+
+def requeue_stale_jobs(timeout=None):
+    """生成中超过 timeout 秒（默认 REPORT_JOB_TIMEOUT）的任务视为后台进程已退出，重新排队
+
+    返回重新排队的任务数。
+    """
+    timeout = settings.REPORT_JOB_TIMEOUT if timeout is None else timeout
+    return ReportJob.objects.filter(
+        status='running', started_at__lt=timezone.now() - timedelta(seconds=timeout)
+    ).update(status='pending', started_at=None)
+
+
+def claim_next_job():
+    """领取最早的排队任务，多个后台进程同时运行时通过行锁避免重复领取
+
+    领取前先将超时的生成中任务重新排队。
+    """
+    requeue_stale_jobs()
+    with transaction.atomic():
+        job = ReportJob.objects.select_for_update(skip_locked=True).filter(
+            status='pending'
+        ).order_by('created_at').first()
+        if job is None:
+            return None
+        job.status = 'running'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+    return job
+
+
+def summarize(scores):
+    """一组最终得分的人数、均值、标准差、最值及分布"""
+    scores = np.asarray(scores, dtype=float)
+    labels = bucket_labels(SCORE_BUCKETS)
+    counts = np.bincount(np.digitize(scores, SCORE_BUCKETS), minlength=len(labels))
+    summary = {"count": int(scores.size), "mean": None, "stddev": None, "min": None, "max": None}
+    if scores.size:
+        summary.update(
+            mean=round(float(scores.mean()), 2), stddev=round(float(scores.std()), 2),
+            min=round(float(scores.min()), 2), max=round(float(scores.max()), 2),
+        )
+    summary["histogram"] = dict(zip(labels, counts.tolist()))
+    return summary
+
+
+def collect_report_data(period, department=None):
+    """一次查询取出报告所需的最终得分，按部门整理为渲染用的普通数据
+
+    返回 (全公司汇总, [各部门报告内容])。
+    """
+    queryset = FinalScore.objects.filter(period=period)
+    if department:
+        queryset = queryset.filter(employee__department_id=department)
+    rows = queryset.order_by('employee__department__name', 'rank', 'employee__name').values(
+        'employee__department_id', 'employee__department__name', 'employee__name', 'rank',
+        'department_leader_score', 'project_leader_score', 'self_score', 'final_score',
+    )
+
+    departments = {}
+    for row in rows:
+        section = departments.setdefault(row['employee__department_id'], {
+            "title": f"{period} {row['employee__department__name']} 绩效报告",
+            "name": row['employee__department__name'],
+            "departments": [],
+            "rows": [],
+        })
+        section["rows"].append({
+            "rank": row['rank'],
+            "employee_name": row['employee__name'],
+            "department_leader_score": round(row['department_leader_score'], 2),
+            "project_leader_score": round(row['project_leader_score'], 2),
+            "self_score": round(row['self_score'], 2),
+            "final_score": round(row['final_score'], 2),
+        })
+
+    sections = list(departments.values())
+    for section in sections:
+        section["summary"] = summarize([row["final_score"] for row in section["rows"]])
+
+    overview = {
+        "title": f"{period} 全公司绩效报告",
+        "name": "全公司",
+        "summary": summarize([row["final_score"] for section in sections for row in section["rows"]]),
+        "departments": [{"name": section["name"], **section["summary"]} for section in sections],
+        "rows": [],
+    }
+    return overview, sections
+
+
+def render_sections(fmt, sections, processes=1):
+    """渲染多份报告，processes 大于 1 时由进程池并行渲染"""
+    if processes <= 1 or len(sections) <= 1:
+        return [render_section(fmt, section) for section in sections]
+    with ProcessPoolExecutor(max_workers=min(processes, len(sections))) as executor:
+        return list(executor.map(render_section, [fmt] * len(sections), sections))
+
+
+def build_report(job, processes=1):
+    """生成报告文件内容，返回 (文件名, 内容)"""
+    if job.scope == COMPANY_SCOPE:
+        overview, sections = collect_report_data(job.period)
+        contents = render_sections(job.format, [overview] + sections, processes)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for section, content in zip([overview] + sections, contents):
+                archive.writestr(f"{job.period}_{section['name']}.{job.format}", content)
+        return f"{job.period}_{COMPANY_SCOPE}_{job.format}.zip", buffer.getvalue()
+
+    overview, sections = collect_report_data(job.period, department=int(job.scope))
+    if sections:
+        section = sections[0]
+    else:
+        name = Department.objects.filter(id=job.scope).values_list('name', flat=True).first() or job.scope
+        section = {**overview, "title": f"{job.period} {name} 绩效报告", "name": name, "departments": []}
+    return f"{job.period}_{section['name']}.{job.format}", render_section(job.format, section)
+
+
+def fail_job(job, error):
+    """记录任务失败及错误信息"""
+    job.status = 'failed'
+    job.error = str(error)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+
+
+def run_job(job, processes=1):
+    """执行报告生成任务，生成失败时记录错误信息；保存报告文件或任务状态失败时抛出异常"""
+    try:
+        name, content = build_report(job, processes)
+    except Exception as e:
+        logger.exception("报告生成失败: %s", job)
+        fail_job(job, e)
+        return job
+
+    job.file.save(name, ContentFile(content), save=False)
+    job.status = 'completed'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['file', 'status', 'finished_at'])
+    logger.info("报告生成完成: %s", job)
+    return job
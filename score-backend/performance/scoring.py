@@ -0,0 +1,318 @@
+"""考核计分引擎
+
+按部门缓存考核指标（见 cache 模块），供单条考核保存和整批考核重新计分共用，
+指标或部门发生变更时由 signals 使缓存失效；
+按README计分规则整批计算某个考核周期的最终得分及排名。
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, CharField, Count, F, Sum, Value, When, Window
+from django.db.models.functions import DenseRank, Rank
+from django.utils import timezone
+
+from .cache import CachedNamespace
+from .models import Department, Employee, Indicator, Assessment, FinalScore
+from .alerts import evaluate_alerts
+from .relations import relation_snapshots
+from .statistics import refresh_period_stats
+
+# 项点类别对应的计分符号：基础项、加分项计正分，减分项计负分
+KIND_SIGNS = {
+    '0': 1,
+    '1': 1,
+    '2': -1,
+}
+
+
+def load_indicator_signs(department_ids):
+    """加载多个部门的项点计分符号表，返回 {部门ID: {项点序号: 计分符号}}"""
+    # Indicator 以部门名称关联，先取部门名称再一次性取出所有指标
+    names = dict(Department.objects.filter(id__in=department_ids).values_list('id', 'name'))
+    by_name = {name: {} for name in names.values()}
+    for dept, seq, kind in Indicator.objects.filter(
+        dept__in=by_name.keys()
+    ).values_list('dept', 'seq', 'kind'):
+        if kind in KIND_SIGNS:
+            by_name[dept][str(seq)] = KIND_SIGNS[kind]
+
+    return {
+        department_id: by_name.get(names.get(department_id), {})
+        for department_id in department_ids
+    }
+
+
+# 部门考核指标缓存，按部门ID保存 {项点序号: 计分符号}
+indicator_cache = CachedNamespace('indicators', load_indicator_signs)
+
+
+def compute_total_score(scores, signs):
+    """根据项点计分符号表计算总分，未配置的项点不计分"""
+    if not scores:
+        return 0
+
+    total = 0
+    for seq, score in scores.items():
+        sign = signs.get(seq)
+        if sign is not None:
+            total += sign * float(score)
+    return total
+
+
+def score_assessment(assessment):
+    """计算单条考核的总分"""
+    if not assessment.scores:
+        return 0
+    return compute_total_score(assessment.scores, indicator_cache.get(assessment.employee.department_id))
+
+
+def score_assessments(assessments, batch_size=500):
+    """批量重新计算考核总分，仅将发生变化的记录通过一次 bulk_update 写回
+
+    返回更新的记录数。
+    """
+    assessments = list(assessments)
+    if not assessments:
+        return 0
+
+    # 已加载员工的考核直接取部门ID，其余的一次性补查
+    department_of = {}
+    unresolved = set()
+    for assessment in assessments:
+        if Assessment.employee.is_cached(assessment):
+            department_of[assessment.employee_id] = assessment.employee.department_id
+        else:
+            unresolved.add(assessment.employee_id)
+    unresolved.difference_update(department_of)
+    if unresolved:
+        department_of.update(
+            Employee.objects.filter(id__in=unresolved).values_list('id', 'department_id')
+        )
+
+    signs_by_department = indicator_cache.get_many(department_of.values())
+
+    changed = []
+    for assessment in assessments:
+        signs = signs_by_department.get(department_of.get(assessment.employee_id), {})
+        total_score = compute_total_score(assessment.scores, signs)
+        if total_score != assessment.total_score:
+            assessment.total_score = total_score
+            changed.append(assessment)
+
+    if changed:
+        Assessment.objects.bulk_update(changed, ['total_score'], batch_size=batch_size)
+    return len(changed)
+
+
+def score_period(period, batch_size=500):
+    """重新计算某个考核周期内全部考核的总分"""
+    assessments = Assessment.objects.filter(period=period).select_related(
+        'employee'
+    ).only('id', 'scores', 'total_score', 'employee__id', 'employee__department_id')
+    return score_assessments(assessments, batch_size=batch_size)
+
+
+# 最终得分权重，键为评价来源：dept 部门负责人、project 项目负责人、self 自评
+# 项目负责人：∑部门负责人打分/X*60% + 项目负责人打分*40%
+# 项目组员：∑项目负责人打分/Y*40% + 部门负责人打分*40% + 自评分*20%
+# 自由人（无项目负责人）：∑部门负责人打分/X*80% + 自评分*20%
+FINAL_SCORE_WEIGHTS = {
+    'project_leader': {'dept': 0.6, 'project': 0.4, 'self': 0},
+    'project_member': {'dept': 0.4, 'project': 0.4, 'self': 0.2},
+    'free_person': {'dept': 0.8, 'project': 0, 'self': 0.2},
+}
+
+
+def _assessment_totals(period):
+    """按被考核员工和评价来源汇总某周期已完成考核的总分
+
+    返回 ({员工ID: {来源: (总分, 份数)}}, {员工ID: 部门ID})。
+    assign_assessments 生成的待评价任务总分为 0，不计入份数。
+    """
+    source = Case(
+        When(evaluator_id=F('employee_id'), then=Value('self')),
+        When(evaluator__role='department_leader', then=Value('dept')),
+        default=Value('project'),
+        output_field=CharField(),
+    )
+    rows = Assessment.objects.filter(period=period, status='completed').exclude(
+        employee__role='department_leader'
+    ).annotate(source=source).values('employee_id', 'employee__department_id', 'source').annotate(
+        total=Sum('total_score'), count=Count('id')
+    ).order_by()
+
+    totals = {}
+    departments = {}
+    for row in rows:
+        totals.setdefault(row['employee_id'], {})[row['source']] = (row['total'] or 0, row['count'])
+        departments[row['employee_id']] = row['employee__department_id']
+    return totals, departments
+
+
+def department_leader_counts():
+    """各部门的部门负责人人数，返回 {部门ID: 人数}"""
+    return dict(
+        Employee.objects.filter(role='department_leader').values('department_id').annotate(
+            count=Count('id')
+        ).values_list('department_id', 'count').order_by()
+    )
+
+
+def build_final_score(employee_id, period, role, leader_count, totals, department_leader_count=None):
+    """按README计分规则计算单个员工的最终得分（不访问数据库）"""
+    dept_total, dept_count = totals.get('dept', (0, 0))
+    project_total, project_count = totals.get('project', (0, 0))
+    self_total, self_count = totals.get('self', (0, 0))
+
+    if role == 'project_leader':
+        # 项目负责人对自己的打分计入项目负责人打分
+        project_total += self_total
+        project_count += self_count
+    elif role != 'project_member' or not (leader_count or project_count):
+        role = 'free_person'
+
+    x = department_leader_count or dept_count
+    y = leader_count or project_count
+    dept_score = dept_total / x if x else 0
+    project_score = project_total / y if y else 0
+    self_score = self_total / self_count if self_count else 0
+
+    weights = FINAL_SCORE_WEIGHTS[role]
+    final_score = (
+        dept_score * weights['dept']
+        + project_score * weights['project']
+        + self_score * weights['self']
+    )
+    return FinalScore(
+        employee_id=employee_id,
+        period=period,
+        department_leader_score=dept_score,
+        project_leader_score=project_score,
+        self_score=self_score,
+        final_score=round(final_score, 2),
+    )
+
+
+def compute_final_scores(period, batch_size=1000):
+    """计算某个考核周期全部员工的最终得分并批量写入
+
+    查询数与人数无关：读取人员关系快照（缓存）、一次分组汇总考核总分、批量 upsert 最终得分，
+    并删除本次未计算到的员工（考核及人员关系已删除）的最终得分，
+    最后重新汇总该周期的部门得分汇总表并评估绩效预警。
+    部门负责人打分人数 X 未配置时取员工所在部门的部门负责人人数。
+    返回写入的记录数。
+    """
+    relations = {
+        relation['employee_id']: (relation['role'], relation['leader_count'])
+        for relation in relation_snapshots.get(period)
+        if relation['employee_role'] != 'department_leader'
+    }
+    totals, departments = _assessment_totals(period)
+    configured_count = getattr(settings, 'SCORE_DEPARTMENT_LEADER_COUNT', None)
+    leader_counts = {} if configured_count else department_leader_counts()
+
+    final_scores = []
+    for employee_id in relations.keys() | totals.keys():
+        role, leader_count = relations.get(employee_id, ('free_person', 0))
+        final_scores.append(build_final_score(
+            employee_id, period, role, leader_count, totals.get(employee_id, {}),
+            configured_count or leader_counts.get(departments.get(employee_id)),
+        ))
+
+    options = {}
+    if connection.features.supports_update_conflicts_with_target:
+        options['unique_fields'] = ['employee', 'period']
+    with transaction.atomic():
+        FinalScore.objects.filter(period=period).exclude(
+            employee_id__in=[final_score.employee_id for final_score in final_scores]
+        ).delete()
+        FinalScore.objects.bulk_create(
+            final_scores,
+            batch_size=batch_size,
+            update_conflicts=True,
+            update_fields=[
+                'department_leader_score', 'project_leader_score',
+                'self_score', 'final_score', 'updated_at',
+            ],
+            **options
+        )
+    refresh_period_stats([period])
+    evaluate_alerts(period, batch_size=batch_size)
+    return len(final_scores)
+
+
+# 排名方式：competition 并列占位（1,1,3），dense 并列不占位（1,1,2）
+RANK_FUNCTIONS = {
+    'competition': Rank,
+    'dense': DenseRank,
+}
+
+
+def _rank_in_memory(rows, partition, mode):
+    """不支持窗口函数的数据库上按分组在内存中排名，返回 {记录ID: 名次}"""
+    groups = {}
+    for row in rows:
+        groups.setdefault(row[partition], []).append(row)
+
+    ranks = {}
+    for group in groups.values():
+        group.sort(key=lambda row: row['final_score'], reverse=True)
+        rank = 0
+        previous = None
+        for position, row in enumerate(group, start=1):
+            if row['final_score'] != previous:
+                rank = position if mode == 'competition' else rank + 1
+                previous = row['final_score']
+            ranks[row['id']] = rank
+    return ranks
+
+
+def update_ranks(period, mode='competition', company_wide=False, batch_size=1000):
+    """按最终得分更新某个考核周期的部门排名，可同时更新公司排名
+
+    排名通过一次窗口函数查询得到，仅将名次变化的记录通过 bulk_update 写回。
+    bulk_update 不会自动更新 updated_at，这里一并写入，报告的数据版本随排名变化。
+    返回更新的记录数。
+    """
+    if mode not in RANK_FUNCTIONS:
+        raise ValueError(f"不支持的排名方式: {mode}")
+
+    queryset = FinalScore.objects.filter(period=period)
+    fields = ['rank', 'company_rank'] if company_wide else ['rank']
+
+    if connection.features.supports_over_clause:
+        rank_function = RANK_FUNCTIONS[mode]
+        annotations = {
+            'department_rank': Window(
+                rank_function(),
+                partition_by=[F('employee__department_id')],
+                order_by=F('final_score').desc(),
+            ),
+        }
+        if company_wide:
+            annotations['overall_rank'] = Window(rank_function(), order_by=F('final_score').desc())
+        rows = list(queryset.annotate(**annotations).values('id', 'rank', 'company_rank', *annotations))
+    else:
+        rows = list(queryset.values(
+            'id', 'rank', 'company_rank', 'final_score', 'period',
+            department_id=F('employee__department_id'),
+        ))
+        department_ranks = _rank_in_memory(rows, 'department_id', mode)
+        overall_ranks = _rank_in_memory(rows, 'period', mode) if company_wide else {}
+        for row in rows:
+            row['department_rank'] = department_ranks[row['id']]
+            row['overall_rank'] = overall_ranks.get(row['id'])
+
+    changed = []
+    now = timezone.now()
+    for row in rows:
+        final_score = FinalScore(
+            id=row['id'], rank=row['department_rank'], company_rank=row['company_rank'], updated_at=now,
+        )
+        if company_wide:
+            final_score.company_rank = row['overall_rank']
+        if final_score.rank != row['rank'] or final_score.company_rank != row['company_rank']:
+            changed.append(final_score)
+
+    if changed:
+        FinalScore.objects.bulk_update(changed, fields + ['updated_at'], batch_size=batch_size)
+    return len(changed)
@@ -1,5 +1,10 @@
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Department, Employee, Project, EmployeeRelation
+from .models import Department, Employee, Project, EmployeeRelation, Assessment, PerformanceAlert, ReportJob
+from .relations import ROLE_LEVELS
+from .statistics import is_period
+from .assessments import load_indicator_rules, validate_scores
+from .reports import COMPANY_SCOPE
 
 class DepartmentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -38,14 +43,96 @@ class EmployeeRelationUpdateSerializer(serializers.ModelSerializer):
         instance = self.instance
         if instance:
             current_role = instance.role
-            # 角色等级: project_leader > project_member > free_person
-            role_levels = {
-                'project_leader': 3,
-                'project_member': 2,
-                'free_person': 1
-            }
-            
-            if role_levels.get(value, 0) > role_levels.get(current_role, 0):
+            if ROLE_LEVELS.get(value, 0) > ROLE_LEVELS.get(current_role, 0):
                 raise serializers.ValidationError("角色只能由高向低变更")
         
-        return value
\ No newline at end of file
+        return value
+
+class RelationRoleChangeSerializer(serializers.Serializer):
+    """批量变更人员角色的单条数据"""
+    id = serializers.IntegerField()
+    role = serializers.ChoiceField(choices=EmployeeRelation.ROLE_CHOICES)
+
+class AssessmentSerializer(serializers.ModelSerializer):
+    employee_name = serializers.CharField(source='employee.name', read_only=True)
+    evaluator_name = serializers.CharField(source='evaluator.name', read_only=True)
+    scores = serializers.DictField(child=serializers.FloatField(), required=False)
+    
+    class Meta:
+        model = Assessment
+        fields = ['id', 'employee', 'employee_name', 'evaluator', 'evaluator_name',
+                  'period', 'status', 'scores', 'total_score', 'comment',
+                  'created_at', 'updated_at']
+        read_only_fields = ['total_score']
+    
+    def validate_period(self, value):
+        if not is_period(value):
+            raise serializers.ValidationError("考核周期格式应为 YYYYMM")
+        return value
+    
+    def validate(self, attrs):
+        # 按被考核员工所在部门的项点最小值/最大值校验得分
+        employee = attrs.get('employee') or self.instance.employee
+        scores = attrs.get('scores')
+        if scores:
+            rules = load_indicator_rules([employee.department.name])[employee.department.name]
+            errors = validate_scores(scores, rules)
+            if errors:
+                raise serializers.ValidationError({"scores": errors})
+        return attrs
+
+class AssessmentSheetSerializer(serializers.Serializer):
+    """批量提交评分表的单张数据"""
+    employee = serializers.IntegerField()
+    scores = serializers.DictField(child=serializers.FloatField())
+    comment = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+class AssessmentBatchSerializer(serializers.Serializer):
+    """批量提交评分表：同一评价人、同一考核周期"""
+    evaluator = serializers.IntegerField()
+    period = serializers.CharField()
+    assessments = AssessmentSheetSerializer(many=True, allow_empty=False)
+    
+    def validate_period(self, value):
+        if not is_period(value):
+            raise serializers.ValidationError("考核周期格式应为 YYYYMM")
+        return value
+
+class PerformanceAlertSerializer(serializers.ModelSerializer):
+    employee_name = serializers.CharField(source='employee.name', read_only=True)
+    department_name = serializers.CharField(source='employee.department.name', read_only=True)
+    rule_display = serializers.CharField(source='get_rule_display', read_only=True)
+    
+    class Meta:
+        model = PerformanceAlert
+        fields = ['id', 'employee', 'employee_name', 'department_name', 'period', 'rule',
+                  'rule_display', 'score', 'reference', 'message', 'acknowledged',
+                  'created_at', 'updated_at']
+        read_only_fields = ['employee', 'period', 'rule', 'score', 'reference', 'message']
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    """报告生成任务：scope 为 company（全公司）或部门ID"""
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    download_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ReportJob
+        fields = ['id', 'period', 'scope', 'format', 'status', 'status_display', 'error',
+                  'download_url', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = ['status', 'error', 'created_at', 'started_at', 'finished_at']
+        extra_kwargs = {'scope': {'required': False}}
+    
+    def get_download_url(self, obj):
+        if obj.status != 'completed':
+            return None
+        return reverse('report-download', args=[obj.id])
+    
+    def validate_period(self, value):
+        if not is_period(value):
+            raise serializers.ValidationError("考核周期格式应为 YYYYMM")
+        return value
+    
+    def validate_scope(self, value):
+        if value != COMPANY_SCOPE and not (value.isdigit() and Department.objects.filter(id=value).exists()):
+            raise serializers.ValidationError("报告范围应为 company 或部门ID")
+        return value
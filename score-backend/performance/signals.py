@@ -0,0 +1,139 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Department, Employee, EmployeeRelation, FinalScore, Indicator, VisibilityIndex
+from .relations import relation_snapshots, relations_changed
+from .scoring import indicator_cache
+from .statistics import apply_period_stats_changes, schedule_period_stats_refresh, stats_key
+from .visibility import schedule_visibility_refresh
+
+
+@receiver([post_save, post_delete], sender=Indicator)
+@receiver([post_save, post_delete], sender=Department)
+def invalidate_indicator_cache(sender, **kwargs):
+    """指标或部门名称变更后使部门指标缓存失效"""
+    indicator_cache.invalidate()
+
+
+@receiver([post_save, post_delete], sender=EmployeeRelation)
+def invalidate_relation_snapshot(sender, instance, **kwargs):
+    """人员关系变更后使该月份的关系快照失效"""
+    relation_snapshots.invalidate(instance.date)
+
+
+@receiver([post_save, post_delete], sender=Employee)
+def invalidate_relation_snapshots(sender, **kwargs):
+    """员工姓名、角色可能出现在任意月份的关系快照中"""
+    relation_snapshots.invalidate()
+
+
+@receiver([post_save, post_delete], sender=EmployeeRelation)
+def refresh_relation_visibility(sender, instance, **kwargs):
+    """人员关系变更后刷新该月份可见人员索引中涉及该员工的部分"""
+    schedule_visibility_refresh(instance.date, employee_ids=[instance.employee_id])
+
+
+@receiver(relations_changed)
+def refresh_bulk_visibility(sender, date, employee_ids=None, **kwargs):
+    """人员关系批量写入后刷新该月份的可见人员索引，未指定员工时整体刷新"""
+    schedule_visibility_refresh(date, employee_ids=employee_ids)
+
+
+@receiver(pre_save, sender=Employee)
+def remember_employee_role(sender, instance, **kwargs):
+    """保存前的角色及部门取读出时记录的值（见 Employee.from_db），只有读取时未包含这些字段才查询数据库"""
+    instance._previous_role = getattr(instance, '_loaded_role', None)
+    instance._previous_department_id = getattr(instance, '_loaded_department_id', None)
+    if (instance._previous_role is None or instance._previous_department_id is None) \
+            and instance.pk and not instance._state.adding:
+        instance._previous_role, instance._previous_department_id = Employee.objects.filter(
+            pk=instance.pk
+        ).values_list('role', 'department_id').first() or (None, None)
+
+
+@receiver(post_save, sender=Employee)
+def refresh_leader_visibility(sender, instance, **kwargs):
+    """部门负责人可见所有人员且本身不参与考核，员工成为或不再是部门负责人时刷新各月份索引中涉及该员工的部分"""
+    previous_role = getattr(instance, '_previous_role', None)
+    instance._loaded_role = instance.role
+    if previous_role == instance.role or 'department_leader' not in (previous_role, instance.role):
+        return
+    for period in VisibilityIndex.objects.values_list('period', flat=True).distinct():
+        schedule_visibility_refresh(period, employee_ids=[instance.pk], evaluator_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Employee)
+def refresh_department_stats(sender, instance, created, **kwargs):
+    """员工调整部门后，其最终得分所在的部门汇总行随之变化，重新汇总该员工有最终得分的周期"""
+    previous = getattr(instance, '_previous_department_id', None)
+    instance._loaded_department_id = instance.department_id
+    if created or previous == instance.department_id:
+        return
+    for period in FinalScore.objects.filter(employee_id=instance.pk).values_list('period', flat=True):
+        schedule_period_stats_refresh(period)
+
+
+def final_score_changes(employee_id, period, score, sign, key=None):
+    key = key or stats_key(employee_id, period)
+    return [] if key is None else [(period, *key, score, sign)]
+
+
+@receiver(post_save, sender=FinalScore)
+def update_final_score_stats(sender, instance, created, **kwargs):
+    """最终得分写入后按新旧得分的差值增量更新部门得分汇总"""
+    previous = None if created else getattr(instance, '_loaded_values', None)
+    current = instance._loaded_values = (instance.employee_id, instance.period, instance.final_score)
+    if not created and previous is None:
+        # 读取时未包含得分等字段，无法计算差值，重新汇总该周期
+        schedule_period_stats_refresh(instance.period)
+        return
+    if previous == current:
+        return
+    key = stats_key(*current[:2])
+    changes = final_score_changes(*current, 1, key=key)
+    if previous is not None:
+        # 只改得分时员工和周期不变，汇总行相同
+        changes += final_score_changes(*previous, -1, key=key if previous[:2] == current[:2] else None)
+    apply_period_stats_changes(changes)
+
+
+@receiver(post_delete, sender=FinalScore)
+def remove_final_score_stats(sender, instance, **kwargs):
+    apply_period_stats_changes(final_score_changes(instance.employee_id, instance.period, instance.final_score, -1))
+
+
+def relation_role_changes(employee_id, date, role, sign):
+    """人员关系角色计入 (sign=1) 或移出 (sign=-1) 时，该员工当月的最终得分在角色汇总行与无关系汇总行间移动"""
+    row = FinalScore.objects.filter(employee_id=employee_id, period=date).values_list(
+        'final_score', 'employee__department_id'
+    ).first()
+    if row is None:
+        return []
+    score, department_id = row
+    return [(date, department_id, role, score, sign), (date, department_id, '', score, -sign)]
+
+
+@receiver(post_save, sender=EmployeeRelation)
+def update_relation_stats(sender, instance, created, **kwargs):
+    """部门得分汇总按人员关系角色分组，角色变化时将该员工的最终得分移到新角色的汇总行"""
+    previous = None if created else getattr(instance, '_loaded_values', None)
+    current = instance._loaded_values = (instance.employee_id, instance.date, instance.role)
+    if not created and previous is None:
+        schedule_period_stats_refresh(instance.date)
+        return
+    if previous == current:
+        return
+    changes = relation_role_changes(*current, 1)
+    if previous is not None:
+        changes += relation_role_changes(*previous, -1)
+    apply_period_stats_changes(changes)
+
+
+@receiver(post_delete, sender=EmployeeRelation)
+def remove_relation_stats(sender, instance, **kwargs):
+    apply_period_stats_changes(relation_role_changes(instance.employee_id, instance.date, instance.role, -1))
+
+
+@receiver(relations_changed)
+def refresh_bulk_relation_stats(sender, date, **kwargs):
+    schedule_period_stats_refresh(date)
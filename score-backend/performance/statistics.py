@@ -0,0 +1,352 @@
+"""统计分析
+
+统计数据在数据库中分组汇总后再整理为接口需要的格式，不逐条读取明细；
+百分位数数据库间不通用，只取出得分一列用 numpy 计算。
+最终得分按 (周期, 部门, 人员角色) 汇总到 PeriodDepartmentStats，跨月趋势只读汇总表；
+单条最终得分写入、删除或人员角色变化时按新旧值的差值增量更新对应的汇总行，
+整批计算最终得分、批量写入人员关系后在事务提交时重新汇总对应周期，历史周期不受影响。
+"""
+import re
+from bisect import bisect_right
+
+import numpy as np
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Avg, Case, Count, F, IntegerField, Max, Min, OuterRef, StdDev, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Coalesce
+
+from .models import Assessment, Employee, EmployeeRelation, FinalScore, PeriodDepartmentStats
+from .transactions import on_commit_once
+
+PERIOD_PATTERN = re.compile(r'^\d{4}(0[1-9]|1[0-2])$')
+RELATION_ROLES = [value for value, _ in EmployeeRelation.ROLE_CHOICES]
+
+
+# 得分分布的默认分段，与前端 statistics.worker.js 一致：<40, 40-50, ..., 90+
+SCORE_BUCKETS = (40, 50, 60, 70, 80, 90)
+SCORE_PERCENTILES = (25, 50, 75, 90)
+
+# 统计的得分来源：最终得分，或已完成考核的总分
+SCORE_SOURCES = {
+    'final': (FinalScore, 'final_score'),
+    'assessment': (Assessment, 'total_score'),
+}
+
+
+def is_period(value):
+    """是否为 YYYYMM 格式的月份"""
+    return bool(value and PERIOD_PATTERN.match(value))
+
+
+def shift_period(period, months):
+    """月份加减，shift_period('202501', -1) == '202412'"""
+    index = int(period[:4]) * 12 + int(period[4:]) - 1 + months
+    return f"{index // 12:04d}{index % 12 + 1:02d}"
+
+
+def month_range(start, end):
+    """生成 start 到 end（含）之间的所有月份"""
+    year, month = int(start[:4]), int(start[4:])
+    months = []
+    while f"{year:04d}{month:02d}" <= end:
+        months.append(f"{year:04d}{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def relation_statistics(dates):
+    """按月份统计各角色人数及人员属性分布
+
+    一次按 (日期, 角色, 属性组合) 分组计数，属性组合数量有限，再在内存中展开；
+    属性组合为 attribute_key 列，分组可直接使用 (date, role, attribute_key) 索引。
+    """
+    series = {
+        date: {
+            "date": date,
+            **{f"{role}_count": 0 for role in RELATION_ROLES},
+            "total_count": 0,
+            "attribute_distribution": {},
+        }
+        for date in dates
+    }
+
+    rows = EmployeeRelation.objects.filter(date__in=dates).values(
+        'date', 'role', 'attribute_key'
+    ).annotate(count=Count('id')).order_by()
+
+    for row in rows:
+        item = series[row['date']]
+        key = f"{row['role']}_count"
+        if key in item:
+            item[key] += row['count']
+        item["total_count"] += row['count']
+        distribution = item["attribute_distribution"]
+        for attribute in filter(None, row['attribute_key'].split(',')):
+            distribution[attribute] = distribution.get(attribute, 0) + row['count']
+
+    return [series[date] for date in dates]
+
+
+def bucket_labels(edges):
+    """分段名称，与 statistics.worker.js 一致：below40, 40to50, ..., above90"""
+    labels = [f"below{edges[0]}"]
+    labels += [f"{low}to{high}" for low, high in zip(edges, edges[1:])]
+    labels.append(f"above{edges[-1]}")
+    return labels
+
+
+def bucket_case(field, edges):
+    """得分所在分段的序号：小于 edges[0] 为 0，不小于 edges[-1] 为 len(edges)"""
+    return Case(
+        *[When(**{f"{field}__lt": edge}, then=Value(index)) for index, edge in enumerate(edges)],
+        default=Value(len(edges)),
+        output_field=IntegerField(),
+    )
+
+
+def score_queryset(period, source='final', department=None):
+    """某考核周期参与统计的得分记录及得分字段"""
+    model, field = SCORE_SOURCES[source]
+    queryset = model.objects.filter(period=period)
+    if model is Assessment:
+        queryset = queryset.filter(status='completed')
+    if department:
+        queryset = queryset.filter(employee__department_id=department)
+    return queryset.order_by(), field
+
+
+def rounded(value, digits=2):
+    return None if value is None else round(float(value), digits)
+
+
+def score_statistics(period, source='final', edges=SCORE_BUCKETS, percentiles=SCORE_PERCENTILES,
+                     top_n=10, department=None):
+    """考核周期的得分统计：分布、百分位数、各部门均值/标准差及前后 N 名
+
+    分布与部门汇总在数据库中分组计算，查询数固定，与人数无关。
+    """
+    queryset, field = score_queryset(period, source, department)
+    labels = bucket_labels(edges)
+
+    # 按 (部门, 分段) 分组计数，总体分布由各部门相加
+    histogram = dict.fromkeys(labels, 0)
+    department_histograms = {}
+    for row in queryset.values(
+        department_id=F('employee__department_id'), bucket=bucket_case(field, edges)
+    ).annotate(count=Count('id')):
+        label = labels[row['bucket']]
+        histogram[label] += row['count']
+        department_histograms.setdefault(row['department_id'], dict.fromkeys(labels, 0))[label] = row['count']
+
+    departments = [
+        {
+            "department": row['employee__department_id'],
+            "department_name": row['employee__department__name'],
+            "count": row['count'],
+            "mean": rounded(row['mean']),
+            "stddev": rounded(row['stddev']),
+            "min": rounded(row['min']),
+            "max": rounded(row['max']),
+            "histogram": department_histograms.get(row['employee__department_id'], dict.fromkeys(labels, 0)),
+        }
+        for row in queryset.values('employee__department_id', 'employee__department__name').annotate(
+            count=Count('id'), mean=Avg(field), stddev=StdDev(field), min=Min(field), max=Max(field),
+        ).order_by('employee__department__name')
+    ]
+
+    scores = np.fromiter(queryset.values_list(field, flat=True), dtype=float)
+    summary = {"count": int(scores.size), "mean": None, "stddev": None, "min": None, "max": None}
+    percentile_values = dict.fromkeys((f"p{p}" for p in percentiles))
+    if scores.size:
+        summary.update(
+            mean=rounded(scores.mean()), stddev=rounded(scores.std()),
+            min=rounded(scores.min()), max=rounded(scores.max()),
+        )
+        percentile_values = {
+            f"p{p}": rounded(value) for p, value in zip(percentiles, np.percentile(scores, percentiles))
+        }
+
+    def ranked(ordering):
+        return [
+            {
+                "employee": row['employee_id'],
+                "employee_name": row['employee__name'],
+                "department_name": row['employee__department__name'],
+                "score": rounded(row[field]),
+            }
+            for row in queryset.order_by(ordering, 'employee__name').values(
+                'employee_id', 'employee__name', 'employee__department__name', field
+            )[:top_n]
+        ]
+
+    return {
+        "period": period,
+        "source": source,
+        **summary,
+        "percentiles": percentile_values,
+        "histogram": [
+            {"bucket": label, "min": low, "max": high, "count": histogram[label]}
+            for label, low, high in zip(labels, (None,) + tuple(edges), tuple(edges) + (None,))
+        ],
+        "departments": departments,
+        "top": ranked(f"-{field}") if top_n else [],
+        "bottom": ranked(field) if top_n else [],
+    }
+
+
+def refresh_period_stats(periods, batch_size=1000):
+    """按 (周期, 部门, 人员角色, 分段) 一次分组汇总最终得分，重写这些周期的汇总行
+
+    返回写入的汇总行数。
+    """
+    relation_role = EmployeeRelation.objects.filter(
+        employee_id=OuterRef('employee_id'), date=OuterRef('period')
+    ).order_by().values('role')[:1]
+    rows = FinalScore.objects.filter(period__in=periods).values(
+        'period',
+        department_id=F('employee__department_id'),
+        role=Coalesce(Subquery(relation_role), Value('')),
+        bucket=bucket_case('final_score', SCORE_BUCKETS),
+    ).annotate(
+        count=Count('id'),
+        score_sum=Sum('final_score'),
+        score_sumsq=Sum(F('final_score') * F('final_score')),
+    ).order_by()
+
+    stats = {}
+    for row in rows:
+        key = (row['period'], row['department_id'], row['role'])
+        item = stats.get(key)
+        if item is None:
+            item = stats[key] = PeriodDepartmentStats(
+                period=row['period'], department_id=row['department_id'], role=row['role'],
+                buckets=[0] * (len(SCORE_BUCKETS) + 1),
+            )
+        item.count += row['count']
+        item.score_sum += row['score_sum']
+        item.score_sumsq += row['score_sumsq']
+        item.buckets[row['bucket']] += row['count']
+
+    PeriodDepartmentStats.objects.filter(period__in=periods).delete()
+    PeriodDepartmentStats.objects.bulk_create(stats.values(), batch_size=batch_size)
+    return len(stats)
+
+
+def stats_key(employee_id, period):
+    """员工某周期的得分所在汇总行 (部门ID, 人员角色)，员工不存在时返回 None"""
+    relation_role = EmployeeRelation.objects.filter(
+        employee_id=employee_id, date=period
+    ).order_by().values('role')[:1]
+    return Employee.objects.filter(id=employee_id).order_by().values_list(
+        'department_id', Coalesce(Subquery(relation_role), Value(''))
+    ).first()
+
+
+def apply_period_stats_changes(changes):
+    """按单条最终得分的变化增量更新部门得分汇总行
+
+    changes 为 [(周期, 部门ID, 人员角色, 得分, 1 或 -1)]，涉及的汇总行加锁读出、合并全部变化后写回，
+    人数减为 0 的汇总行删除。返回写入的汇总行数。
+    行锁只能锁定已存在的汇总行：并发事务同时新建同一汇总行时后提交的一方违反唯一约束，
+    此时回滚到保存点重试一次，重试时该行已存在并被加锁读出。
+    """
+    if not changes:
+        return 0
+    try:
+        with transaction.atomic():
+            return _apply_period_stats_changes(changes)
+    except IntegrityError:
+        with transaction.atomic():
+            return _apply_period_stats_changes(changes)
+
+
+def _apply_period_stats_changes(changes):
+    keys = {(period, department_id, role) for period, department_id, role, _, _ in changes}
+    rows = {
+        (row.period, row.department_id, row.role): row
+        for row in PeriodDepartmentStats.objects.select_for_update().filter(
+            period__in={key[0] for key in keys}, department_id__in={key[1] for key in keys}
+        ).order_by()
+        if (row.period, row.department_id, row.role) in keys
+    }
+    for period, department_id, role, score, sign in changes:
+        row = rows.get((period, department_id, role))
+        if row is None:
+            row = rows[period, department_id, role] = PeriodDepartmentStats(
+                period=period, department_id=department_id, role=role,
+                buckets=[0] * (len(SCORE_BUCKETS) + 1),
+            )
+        row.count += sign
+        row.score_sum += sign * score
+        row.score_sumsq += sign * score * score
+        row.buckets[bisect_right(SCORE_BUCKETS, score)] += sign
+
+    written = 0
+    for row in rows.values():
+        if row.count > 0:
+            row.save()
+            written += 1
+        elif row.pk:
+            row.delete()
+    return written
+
+
+def schedule_period_stats_refresh(period):
+    """事务提交后重新汇总该周期的最终得分，同一事务内多次写入只汇总一次"""
+    on_commit_once(('period_stats', period), lambda: refresh_period_stats([period]))
+
+
+def combine_stats(count, score_sum, score_sumsq, buckets):
+    """由人数、得分合计、平方和及分段人数计算均值、标准差（总体）及分布"""
+    mean = stddev = None
+    if count:
+        mean = score_sum / count
+        stddev = max(score_sumsq / count - mean * mean, 0) ** 0.5
+    return {
+        "count": count,
+        "mean": rounded(mean),
+        "stddev": rounded(stddev),
+        "histogram": dict(zip(bucket_labels(SCORE_BUCKETS), buckets)),
+    }
+
+
+def period_summary(periods, department=None):
+    """按月份读取得分汇总，返回各月份的总体及各部门统计序列，读取行数为 月份数 × 部门数 × 角色数"""
+    rows = PeriodDepartmentStats.objects.filter(period__in=periods).select_related('department')
+    if department:
+        rows = rows.filter(department_id=department)
+
+    width = len(SCORE_BUCKETS) + 1
+    totals = {period: [0, 0.0, 0.0, [0] * width] for period in periods}
+    departments = {period: {} for period in periods}
+    for row in rows:
+        for total in (
+            totals[row.period],
+            departments[row.period].setdefault(row.department, [0, 0.0, 0.0, [0] * width, {}]),
+        ):
+            total[0] += row.count
+            total[1] += row.score_sum
+            total[2] += row.score_sumsq
+            total[3] = [a + b for a, b in zip(total[3], row.buckets)]
+        departments[row.period][row.department][4][row.role] = {
+            "count": row.count,
+            "mean": rounded(row.score_sum / row.count) if row.count else None,
+        }
+
+    return [
+        {
+            "period": period,
+            **combine_stats(*totals[period]),
+            "departments": [
+                {
+                    "department": department.id,
+                    "department_name": department.name,
+                    **combine_stats(*values[:4]),
+                    "roles": values[4],
+                }
+                for department, values in sorted(departments[period].items(), key=lambda item: item[0].name)
+            ],
+        }
+        for period in periods
+    ]
@@ -1,3 +1,1738 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import re
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from importlib import import_module
+from importlib.util import find_spec
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache, RedisSerializer
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import Count, Q
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from score_system.mysql_pool.pool import ConnectionPool
+
+from . import statistics
+from .assessments import assign_assessments
+from .cache import CACHE_ALIAS, CachedNamespace
+from .importers import iter_chunks
+from .instrumentation import reset_request_metrics
+from .alerts import evaluate_alerts
+from .models import (
+    Assessment, Department, Employee, EmployeeRelation, FinalScore, Indicator, PerformanceAlert,
+    PeriodDepartmentStats, RelationLeader, ReportJob
+)
+from .relations import change_roles, relation_snapshots, remove_leaders, sync_leaders
+from .reports import claim_next_job, data_version, requeue_stale_jobs
+from .scoring import (
+    build_final_score, compute_final_scores, indicator_cache, score_assessments, score_period, update_ranks
+)
+from .statistics import refresh_period_stats
+from .transactions import on_commit_merge, on_commit_once, pending_on_commit
+from .visibility import refresh_visibility
+
+
+def create_departments(*names):
+    return [Department.objects.create(name=name) for name in names]
+
+
+def create_employee(name, department, role="project_member"):
+    """测试用员工，姓名、部门及角色以外的字段取固定值"""
+    return Employee.objects.create(
+        name=name, department=department, ip_address="192.168.1.1",
+        job_type="开发", position="工程师", role=role,
+    )
+
+
+def create_employees(count, departments, name="员工{}"):
+    """按序号依次分配到各部门的一组员工，name 为带序号占位的姓名格式"""
+    return [create_employee(name.format(i), departments[i % len(departments)]) for i in range(count)]
+
+
+def indicator(dept, seq, kind="0", **fields):
+    """未保存的考核指标，由测试批量写入"""
+    fields = {"title": "项点", "cot": f"项点{seq}", "cotdtl": "", **fields}
+    return Indicator(dept=dept, kind=kind, seq=seq, **fields)
+
+
+class QueryBudgetTests(TestCase):
+    """列表接口查询数预算：查询数不随返回行数增长"""
+
+    @classmethod
+    def setUpTestData(cls):
+        departments = create_departments("部门0", "部门1", "部门2")
+        cls.employees = create_employees(30, departments, name="员工{:02d}")
+        leader = cls.employees[0]
+        EmployeeRelation.objects.bulk_create([
+            EmployeeRelation(
+                date="202501",
+                employee=employee,
+                leaders=leader.name,
+                leader_count=1,
+                role="project_member",
+                attributes=["tech_dev"],
+                attribute_key="tech_dev",
+            )
+            for employee in cls.employees
+        ])
+        cls.relation = EmployeeRelation.objects.first()
+
+    def assertQueryBudget(self, url, budget):
+        with self.assertNumQueries(budget):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_employee_list(self):
+        # 分页计数 + 列表（含部门）
+        response = self.assertQueryBudget("/api/employees/", 2)
+        self.assertTrue(response.json()["results"][0]["department_name"])
+
+    def test_employee_detail(self):
+        self.assertQueryBudget(f"/api/employees/{self.employees[0].pk}/", 1)
+
+    def test_relation_list(self):
+        # 分页计数 + 列表（含员工姓名）
+        response = self.assertQueryBudget("/api/relations/?date=202501", 2)
+        self.assertTrue(response.json()["results"][0]["employee_name"])
+
+    def test_relation_list_search(self):
+        self.assertQueryBudget("/api/relations/?search=员工&ordering=employee__name", 2)
+
+    def test_relation_list_cursor(self):
+        # 游标分页不做 COUNT，后续页同样只有一次查询
+        response = self.assertQueryBudget("/api/relations/?date=202501&pagination=cursor&page_size=12", 1)
+        ids = [row["employee"] for row in response.json()["results"]]
+        while response.json()["next"]:
+            response = self.assertQueryBudget(response.json()["next"], 1)
+            ids += [row["employee"] for row in response.json()["results"]]
+        self.assertEqual(ids, sorted(employee.pk for employee in self.employees))
+
+    def test_employee_list_cursor(self):
+        response = self.assertQueryBudget("/api/employees/?pagination=cursor&page_size=7", 1)
+        ids = [row["id"] for row in response.json()["results"]]
+        while response.json()["next"]:
+            response = self.assertQueryBudget(response.json()["next"], 1)
+            ids += [row["id"] for row in response.json()["results"]]
+        self.assertEqual(sorted(ids), sorted(employee.pk for employee in self.employees))
+
+    def test_relation_detail(self):
+        self.assertQueryBudget(f"/api/relations/{self.relation.pk}/", 1)
+
+    def test_relation_statistics(self):
+        response = self.assertQueryBudget("/api/relations/statistics/?start=202401&end=202512", 1)
+        month = next(item for item in response.json()["series"] if item["date"] == "202501")
+        self.assertEqual((month["total_count"], month["attribute_distribution"]), (30, {"tech_dev": 30}))
+
+
+class RelationImportTests(TestCase):
+    """人员关系批量导入：整批写入，逐行的错误信息汇总返回，同一员工只导入一次"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = create_departments("研发部")[0]
+        for name in ("张三", "李四", "王五"):
+            create_employee(name, department)
+
+    def setUp(self):
+        caches[CACHE_ALIAS].clear()
+
+    def test_row_errors(self):
+        response = self.client.post("/api/relations/import/", {
+            "date": "202501",
+            "relations": [
+                {"employee_name": "张三", "leader_names": ["王五"], "role": "project_member",
+                 "attributes": ["tech_dev"]},
+                # 没有项目负责人的组员导入为自由人
+                {"employee_name": "李四", "role": "project_member"},
+                {"employee_name": "赵六"},
+                {"employee_name": "张三"},
+                {"employee_name": "王五", "role": "boss"},
+                {"employee_name": "王五", "leader_names": "李四"},
+                "王五",
+                {"employee_name": "王五", "leader_names": ["王五"], "role": "project_leader"},
+            ],
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data["created_count"], data["deleted_count"]), (3, 0))
+        self.assertEqual(data["errors"], [
+            "员工 赵六 不存在",
+            "员工 张三 重复导入",
+            "员工 王五 的人员角色 boss 无效",
+            "员工 王五 的项目负责人格式错误",
+            "数据格式错误: 王五",
+        ])
+        self.assertEqual(
+            set(EmployeeRelation.objects.values_list("employee__name", "role", "leader_count")),
+            {("张三", "project_member", 1), ("李四", "free_person", 0), ("王五", "project_leader", 1)},
+        )
+        self.assertEqual(
+            set(RelationLeader.objects.values_list("relation__employee__name", "leader__name")),
+            {("张三", "王五"), ("王五", "王五")},
+        )
+
+    def test_replace(self):
+        payload = {"date": "202501", "relations": [{"employee_name": "张三"}, {"employee_name": "李四"}]}
+        self.client.post("/api/relations/import/", payload, content_type="application/json")
+        payload["relations"] = [{"employee_name": "王五"}]
+        data = self.client.post("/api/relations/import/", payload, content_type="application/json").json()
+        self.assertEqual((data["created_count"], data["deleted_count"]), (1, 2))
+        self.assertEqual(list(EmployeeRelation.objects.values_list("employee__name", flat=True)), ["王五"])
+
+    def test_diff(self):
+        self.client.post("/api/relations/import/", {"date": "202501", "relations": [
+            {"employee_name": "张三", "leader_names": ["王五"], "role": "project_member"},
+            {"employee_name": "李四"},
+            {"employee_name": "王五", "leader_names": ["王五"], "role": "project_leader"},
+        ]}, content_type="application/json")
+        ids = dict(EmployeeRelation.objects.values_list("employee__name", "id"))
+        link = RelationLeader.objects.get(relation_id=ids["张三"]).id
+        create_employee("孙七", Department.objects.get())
+
+        response = self.client.post("/api/relations/import/", {"date": "202501", "mode": "diff", "relations": [
+            {"employee_name": "张三", "leader_names": ["王五"], "role": "project_member"},
+            {"employee_name": "李四", "attributes": ["test"]},
+            {"employee_name": "孙七"},
+        ]}, content_type="application/json")
+        data = response.json()
+        self.assertEqual(
+            (data["created_count"], data["updated_count"], data["unchanged_count"], data["deleted_count"]),
+            (1, 1, 1, 1),
+        )
+        # 未变化及更新的记录保留原有主键，负责人关联不重建
+        relations = dict(EmployeeRelation.objects.values_list("employee__name", "id"))
+        self.assertEqual(relations.keys(), {"张三", "李四", "孙七"})
+        self.assertEqual((relations["张三"], relations["李四"]), (ids["张三"], ids["李四"]))
+        self.assertEqual(RelationLeader.objects.get(relation_id=ids["张三"]).id, link)
+        self.assertEqual(
+            EmployeeRelation.objects.filter(id=ids["李四"]).values_list("attributes", "attribute_key").get(),
+            (["test"], "test"),
+        )
+
+    def test_missing_params(self):
+        response = self.client.post(
+            "/api/relations/import/", {"date": "202501", "relations": [{"employee_name": "张三"}], "mode": "merge"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            self.client.post("/api/relations/import/", {"date": "202501"}, content_type="application/json").status_code,
+            400,
+        )
+
+
+class RelationUploadImportTests(TestCase):
+    """上传文件流式导入：逐行解析、分块写入，每块输出一行进度，最后一行为导入结果"""
+
+    # 外部系统导出的中文表头及角色、属性名称
+    ROWS = [
+        ["组员姓名", "项目负责人", "人员角色", "人员属性"],
+        ["张三", "王五", "项目组员", "技术开发、测试"],
+        ["李四", "", "自由人", ""],
+        ["赵六", "", "", ""],
+        ["张三", "", "", ""],
+        ["王五", "王五", "项目负责人", ""],
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        department = create_departments("研发部")[0]
+        for name in ("张三", "李四", "王五"):
+            create_employee(name, department)
+
+    def setUp(self):
+        caches[CACHE_ALIAS].clear()
+
+    def upload(self, name, content, **data):
+        response = self.client.post("/api/relations/import/upload/", {
+            "date": "202501", "chunk_size": 2, "file": SimpleUploadedFile(name, content), **data,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        return [json.loads(line) for line in b"".join(response.streaming_content).decode("utf-8").splitlines()]
+
+    def assertImported(self, lines):
+        self.assertEqual(lines[:-1], [
+            {"processed_count": 2, "created_count": 2, "updated_count": 0, "errors": []},
+            {"processed_count": 4, "created_count": 2, "updated_count": 0,
+             "errors": ["员工 赵六 不存在", "员工 张三 重复导入"]},
+            {"processed_count": 5, "created_count": 3, "updated_count": 0, "errors": []},
+        ])
+        self.assertEqual(lines[-1], {
+            "success": True, "processed_count": 5, "created_count": 3, "updated_count": 0,
+            "unchanged_count": 0, "deleted_count": 0, "error_count": 2,
+        })
+        self.assertEqual(
+            set(EmployeeRelation.objects.values_list("employee__name", "role", "leaders")),
+            {("张三", "project_member", "王五"), ("李四", "free_person", ""), ("王五", "project_leader", "王五")},
+        )
+        self.assertEqual(EmployeeRelation.objects.get(employee__name="张三").attributes, ["tech_dev", "test"])
+
+    def test_csv(self):
+        output = io.StringIO()
+        csv.writer(output).writerows(self.ROWS)
+        self.assertImported(self.upload("relations.csv", ("\ufeff" + output.getvalue()).encode("utf-8")))
+
+    async def test_asgi_stream(self):
+        output = io.StringIO()
+        csv.writer(output).writerows(self.ROWS)
+        response = await self.async_client.post("/api/relations/import/upload/", {
+            "date": "202501", "chunk_size": 2, "file": SimpleUploadedFile("relations.csv", output.getvalue().encode()),
+        })
+        self.assertTrue(response.is_async)
+        # 跨多块的导入事务在同一线程中执行并提交
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        await sync_to_async(self.assertImported)([json.loads(line) for line in content.decode("utf-8").splitlines()])
+
+    def test_failure_keeps_committed_chunks(self):
+        def rows(upload, fmt):
+            yield {"employee_name": "张三", "role": "free_person"}
+            yield {"employee_name": "李四", "role": "free_person"}
+            raise ValueError("第 3 行格式错误")
+
+        # 每块单独提交：第二块读取失败时第一块已写入，结果行给出已处理的数量
+        with mock.patch("performance.views.iter_upload_rows", rows):
+            lines = self.upload("relations.csv", b"")
+        self.assertEqual(lines[0]["processed_count"], 2)
+        self.assertEqual(lines[-1], {
+            "success": False, "error": "第 3 行格式错误", "processed_count": 2,
+            "created_count": 2, "updated_count": 0, "unchanged_count": 0, "deleted_count": 0,
+        })
+        self.assertEqual(EmployeeRelation.objects.filter(date="202501").count(), 2)
+
+    def test_xlsx(self):
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        for row in self.ROWS:
+            workbook.active.append([value or None for value in row])
+        output = io.BytesIO()
+        workbook.save(output)
+        self.assertImported(self.upload("relations.xlsx", output.getvalue()))
+
+    def test_ndjson(self):
+        lines = [
+            {"employee_name": "张三", "leader_names": ["王五"], "role": "project_member"},
+            "{",
+            {"employee_name": "李四"},
+        ]
+        content = "\n".join(line if isinstance(line, str) else json.dumps(line) for line in lines)
+        result = self.upload("relations.txt", content.encode("utf-8"), format="ndjson")
+        self.assertEqual(result[0]["errors"], ["数据格式错误: 第 2 行不是合法的JSON"])
+        self.assertEqual((result[-1]["created_count"], result[-1]["error_count"]), (2, 1))
+
+    def test_invalid_params(self):
+        response = self.client.post("/api/relations/import/upload/", {
+            "date": "202501", "file": SimpleUploadedFile("relations.pdf", b"%PDF"),
+        })
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post("/api/relations/import/upload/", {
+            "date": "202501", "chunk_size": "0", "file": SimpleUploadedFile("relations.csv", b""),
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_iter_chunks(self):
+        self.assertEqual(list(iter_chunks(iter(range(5)), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(iter_chunks([], 2)), [])
+
+
+class RelationLeaderTests(TestCase):
+    """项目负责人关联表与 leaders 字段同步：只删除和新增有差异的关联"""
+
+    @classmethod
+    def setUpTestData(cls):
+        departments = create_departments("研发部", "市场部")
+        cls.leaders = {name: create_employee(name, departments[0], "project_leader") for name in ("甲", "乙", "丙")}
+        # 重名的负责人取部门名称排序后的第一个
+        cls.namesake = create_employee("甲", departments[1], "project_leader")
+        cls.member = create_employee("组员", departments[0])
+
+    def links(self, relation):
+        return dict(RelationLeader.objects.filter(relation=relation).values_list("leader_id", "id"))
+
+    def test_sync_leaders(self):
+        # bulk_create 不经过 save()，关联由 sync_leaders 生成
+        relation = EmployeeRelation.objects.bulk_create([
+            EmployeeRelation(date="202501", employee=self.member, role="project_member", leaders="乙,丙,不存在")
+        ])[0]
+        sync_leaders([relation])
+        links = self.links(relation)
+        self.assertEqual(links.keys(), {self.leaders["乙"].id, self.leaders["丙"].id})
+
+        # 负责人姓名 + 现有关联 + 删除 + 新增
+        relation.leaders = "乙,甲"
+        with self.assertNumQueries(4):
+            sync_leaders([relation])
+        updated = self.links(relation)
+        self.assertEqual(updated.keys(), {self.leaders["乙"].id, self.namesake.id})
+        self.assertEqual(updated[self.leaders["乙"].id], links[self.leaders["乙"].id])
+
+        # 没有变化时不写入
+        with self.assertNumQueries(2):
+            sync_leaders([relation])
+        self.assertEqual(self.links(relation), updated)
+
+        relation.leaders = ""
+        sync_leaders([relation])
+        self.assertEqual(self.links(relation), {})
+
+    def test_populate_migration(self):
+        migration = import_module("performance.migrations.0005_relationleader")
+        relations = EmployeeRelation.objects.bulk_create([
+            EmployeeRelation(date="202501", employee=self.member, role="project_member", leaders="甲,乙,不存在"),
+            EmployeeRelation(date="202501", employee=self.leaders["丙"], role="free_person"),
+            EmployeeRelation(date="202502", employee=self.member, role="project_member", leaders="丙"),
+        ])
+        migration.populate_relation_leaders(apps, None)
+        self.assertEqual(
+            set(RelationLeader.objects.values_list("relation_id", "leader_id")),
+            {
+                (relations[0].id, self.namesake.id), (relations[0].id, self.leaders["乙"].id),
+                (relations[2].id, self.leaders["丙"].id),
+            },
+        )
+
+
+class RelationRoleChangeTests(TestCase):
+    """批量变更人员角色：全部校验通过才写入，降级的项目负责人从组员关系中级联移除"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = create_departments("研发部")[0]
+        cls.relations = {}
+        for name, role, leaders in (
+            ("甲", "project_leader", "甲"), ("乙", "project_leader", "乙"),
+            ("组员1", "project_member", "甲"), ("组员2", "project_member", "甲,乙"),
+            ("组员3", "project_member", "乙"), ("自由人", "free_person", ""),
+        ):
+            cls.relations[name] = EmployeeRelation.objects.create(
+                date="202501", employee=create_employee(name, department, role), role=role, leaders=leaders,
+            )
+
+    def setUp(self):
+        caches[CACHE_ALIAS].clear()
+
+    def state(self):
+        return {
+            relation.employee.name: (relation.role, relation.leaders, relation.leader_count)
+            for relation in EmployeeRelation.objects.select_related("employee")
+        }
+
+    def post(self, changes):
+        return self.client.post("/api/relations/roles/", {"changes": changes}, content_type="application/json")
+
+    def test_batch_update(self):
+        response = self.post([
+            {"id": self.relations["甲"].id, "role": "free_person"},
+            # 角色未变化的不计入
+            {"id": self.relations["组员3"].id, "role": "project_member"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"success": True, "updated_count": 1, "cascaded_count": 2})
+        self.assertEqual(self.state(), {
+            "甲": ("free_person", "", 0), "乙": ("project_leader", "乙", 1),
+            "组员1": ("free_person", "", 0), "组员2": ("project_member", "乙", 1),
+            "组员3": ("project_member", "乙", 1), "自由人": ("free_person", "", 0),
+        })
+        self.assertFalse(RelationLeader.objects.filter(leader__name="甲").exists())
+
+    def test_invalid_ids_reject_batch(self):
+        before = self.state()
+        response = self.post([
+            {"id": self.relations["甲"].id, "role": "project_member"},
+            {"id": 0, "role": "free_person"},
+            {"id": self.relations["自由人"].id, "role": "project_leader"},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"], [
+            "人员关系 0 不存在", f"人员关系 {self.relations['自由人'].id} 角色只能由高向低变更",
+        ])
+        self.assertEqual(self.state(), before)
+        self.assertEqual(self.post([{"id": self.relations["甲"].id, "role": "boss"}]).status_code, 400)
+        self.assertEqual(self.post([]).status_code, 400)
+
+    def test_change_roles(self):
+        relations = EmployeeRelation.objects.in_bulk([self.relations["甲"].id, self.relations["乙"].id])
+        # 同一日期降级的负责人合并为一次级联更新，负责人不从自己的关系中移除
+        self.assertEqual(change_roles([(relation, "project_member") for relation in relations.values()]), (2, 3))
+        state = self.state()
+        self.assertEqual((state["甲"], state["乙"]), (("project_member", "甲", 1), ("project_member", "乙", 1)))
+        self.assertEqual(
+            {state[name] for name in ("组员1", "组员2", "组员3")}, {("free_person", "", 0)}
+        )
+        self.assertEqual(change_roles([(relations[self.relations["甲"].id], "project_member")]), (0, 0))
+
+    def test_remove_leaders(self):
+        self.assertEqual(remove_leaders("202501", [self.relations["乙"].employee_id]), 2)
+        state = self.state()
+        self.assertEqual((state["组员2"], state["组员3"]), (("project_member", "甲", 1), ("free_person", "", 0)))
+        # 没有以其为负责人的关系
+        self.assertEqual(remove_leaders("202501", [self.relations["乙"].employee_id]), 0)
+        self.assertEqual(remove_leaders("202502", [self.relations["甲"].employee_id]), 0)
+
+
+class QueryPlanTests(TestCase):
+    """按月份查询的执行计划应走索引而不是全表扫描"""
+
+    @classmethod
+    def setUpTestData(cls):
+        departments = create_departments("研发部")
+        Indicator.objects.bulk_create([
+            indicator(name, seq) for name in ("研发部", "测试部", "运维部") for seq in range(1, 8)
+        ])
+        employees = create_employees(60, departments, name="员工{:03d}")
+        cls.leader = employees[0]
+        periods = [f"2024{month:02d}" for month in range(1, 13)]
+        EmployeeRelation.objects.bulk_create([
+            EmployeeRelation(date=period, employee=employee, role="project_member")
+            for period in periods
+            for employee in employees
+        ])
+        Assessment.objects.bulk_create([
+            Assessment(employee=employee, evaluator=evaluator, period=period)
+            for period in periods
+            for employee in employees
+            for evaluator in (employee, cls.leader)
+            if evaluator != employee or employee != cls.leader
+        ])
+        FinalScore.objects.bulk_create([
+            FinalScore(employee=employee, period=period, final_score=i)
+            for period in periods
+            for i, employee in enumerate(employees)
+        ])
+        with connection.cursor() as cursor:
+            for model in (Indicator, EmployeeRelation, Assessment, FinalScore):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+    def explain(self, queryset):
+        if connection.vendor == "mysql":
+            return queryset.explain(format="json")
+        if connection.vendor == "sqlite":
+            return queryset.explain()
+        self.skipTest(f"不支持检查 {connection.vendor} 的执行计划")
+
+    def assertUsesIndex(self, queryset, table, index_name=None):
+        plan = self.explain(queryset)
+        if connection.vendor == "mysql":
+            full_scan = re.search(rf'"table_name": "{table}",\s*"access_type": "ALL"', plan)
+        else:
+            full_scan = re.search(rf"\bSCAN {table}\b(?! USING)", plan)
+        self.assertIsNone(full_scan, plan)
+        if index_name:
+            self.assertIn(index_name, plan)
+
+    def test_relations_by_date(self):
+        # 以 date 开头的两个索引均可使用，由优化器选择
+        self.assertUsesIndex(
+            EmployeeRelation.objects.filter(date="202406").order_by(), "performance_employeerelation",
+        )
+
+    def test_relations_by_date_and_role(self):
+        self.assertUsesIndex(
+            EmployeeRelation.objects.filter(date="202406", role="project_leader").order_by(),
+            "performance_employeerelation", "relation_date_role_idx",
+        )
+
+    def test_relation_cursor_page(self):
+        # 游标分页的排序和定位由 (date, employee) 索引支持，不需要额外排序
+        relation = EmployeeRelation.objects.filter(date="202406").order_by("employee_id")[10]
+        plan = self.explain(
+            EmployeeRelation.objects.filter(date="202406").filter(
+                Q(employee_id__gt=relation.employee_id) | Q(employee_id=relation.employee_id, id__gt=relation.id)
+            ).order_by("date", "employee_id", "id")[:100]
+        )
+        self.assertIn("relation_date_emp_idx", plan)
+
+    def test_assessments_by_evaluator(self):
+        self.assertUsesIndex(
+            Assessment.objects.filter(period="202406", evaluator=self.leader).order_by(),
+            "performance_assessment", "assessment_period_eval_idx",
+        )
+
+    def test_assessments_by_period(self):
+        self.assertUsesIndex(
+            Assessment.objects.filter(period="202406").order_by("employee"),
+            "performance_assessment", "assessment_period_emp_idx",
+        )
+
+    def test_final_score_ranking(self):
+        self.assertUsesIndex(
+            FinalScore.objects.filter(period="202406").order_by("-final_score"),
+            "performance_finalscore", "finalscore_period_score_idx",
+        )
+
+    def test_relation_statistics(self):
+        # 按属性组合分组计数由 (date, role, attribute_key) 索引支持，不读取 JSON 列
+        self.assertUsesIndex(
+            EmployeeRelation.objects.filter(date__in=["202405", "202406"]).values(
+                "date", "role", "attribute_key"
+            ).annotate(count=Count("id")).order_by(),
+            "performance_employeerelation", "relation_date_role_idx",
+        )
+
+    def test_indicators_by_department(self):
+        # 由 (dept, seq) 唯一索引支持
+        self.assertUsesIndex(Indicator.objects.filter(dept="研发部"), "performance_indicator")
+
+
+class ReadThroughCacheTests(TestCase):
+    """读穿透缓存：命中时不查询数据库，数据变更后失效"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # 夹具数据视为已提交，执行其失效回调
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.department = create_departments("研发部")[0]
+            Indicator.objects.bulk_create([indicator("研发部", 1), indicator("研发部", 2, kind="2")])
+            cls.employee = create_employee("张三", cls.department)
+
+    def setUp(self):
+        caches[CACHE_ALIAS].clear()
+
+    def test_indicator_cache_hit(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(indicator_cache.get(self.department.id), {'1': 1, '2': -1})
+        with self.assertNumQueries(0):
+            self.assertEqual(indicator_cache.get(self.department.id), {'1': 1, '2': -1})
+
+    def test_indicator_change_invalidates(self):
+        indicator_cache.get(self.department.id)
+        indicator("研发部", 3, kind="1").save()
+        self.assertEqual(indicator_cache.get(self.department.id), {'1': 1, '2': -1, '3': 1})
+
+    def test_relation_snapshot_invalidates(self):
+        self.assertEqual(relation_snapshots.get("202501"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            EmployeeRelation.objects.create(date="202501", employee=self.employee, role="free_person")
+        # 提交后的回调（可见人员索引刷新）已重新加载快照
+        snapshot = relation_snapshots.get("202501")
+        self.assertEqual([relation['employee_name'] for relation in snapshot], ["张三"])
+        with self.assertNumQueries(0):
+            relation_snapshots.get("202501")
+
+    def test_uncommitted_data_not_cached(self):
+        relation_snapshots.get("202501")
+        try:
+            with transaction.atomic():
+                EmployeeRelation.objects.create(date="202501", employee=self.employee, role="free_person")
+                # 事务中读到未提交的数据，不写回缓存
+                self.assertEqual(len(relation_snapshots.get("202501")), 1)
+                with self.assertNumQueries(1):
+                    relation_snapshots.get("202501")
+                # 未失效的键照常缓存
+                relation_snapshots.get("202502")
+                raise ValueError
+        except ValueError:
+            pass
+        # 回滚后缓存中没有回滚掉的数据
+        self.assertEqual(relation_snapshots.get("202501"), [])
+        with self.assertNumQueries(0):
+            relation_snapshots.get("202502")
+
+
+class FakeRedisClient:
+    """Redis 替身：与 RedisCacheClient 接口相同，值经 RedisSerializer 序列化后保存在进程内共享的字典中"""
+    data = {}
+
+    def __init__(self, servers, **options):
+        self._serializer = RedisSerializer()
+
+    def add(self, key, value, timeout):
+        if key in self.data:
+            return False
+        self.set(key, value, timeout)
+        return True
+
+    def get(self, key, default):
+        value = self.data.get(key)
+        return default if value is None else self._serializer.loads(value)
+
+    def set(self, key, value, timeout):
+        self.data[key] = self._serializer.dumps(value)
+
+    def delete(self, key):
+        return self.data.pop(key, None) is not None
+
+    def get_many(self, keys):
+        return {key: self._serializer.loads(self.data[key]) for key in keys if key in self.data}
+
+    def set_many(self, data, timeout):
+        for key, value in data.items():
+            self.set(key, value, timeout)
+
+    def clear(self):
+        self.data.clear()
+
+
+class FakeRedisCache(RedisCache):
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        self._class = FakeRedisClient
+
+
+@override_settings(CACHES={
+    **settings.CACHES,
+    CACHE_ALIAS: {
+        'BACKEND': 'performance.tests.FakeRedisCache', 'LOCATION': 'redis://stand-in', 'KEY_PREFIX': 'performance',
+    },
+})
+class RedisReadThroughCacheTests(ReadThroughCacheTests):
+    """读穿透缓存在 Redis 后端上的行为：缓存值经序列化保存，多个缓存实例（进程）共享版本号"""
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(FakeRedisClient.data.clear)
+
+    def test_shared_between_instances(self):
+        self.assertIsInstance(caches[CACHE_ALIAS], FakeRedisCache)
+        indicator_cache.get(self.department.id)
+        self.assertIn(f"performance:1:indicators:{self.department.id}", FakeRedisClient.data)
+
+        # 另一个进程的缓存实例读到同一份缓存
+        other = FakeRedisCache('redis://stand-in', {'KEY_PREFIX': 'performance'})
+        with mock.patch.object(CachedNamespace, 'cache', other), self.assertNumQueries(0):
+            self.assertEqual(indicator_cache.get(self.department.id), {'1': 1, '2': -1})
+
+        # 整体失效更换共享的版本号
+        with self.captureOnCommitCallbacks(execute=True):
+            indicator_cache.invalidate()
+        with mock.patch.object(CachedNamespace, 'cache', other), self.assertNumQueries(2):
+            indicator_cache.get(self.department.id)
+
+
+class ScorePeriodTests(TestCase):
+    """整批重新计分：按部门的项点计分符号计算总分，查询数与考核数量无关"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # 夹具数据视为已提交：执行其失效回调，此后读取的考核指标可以写入缓存
+        with cls.captureOnCommitCallbacks(execute=True):
+            departments = create_departments("研发部", "市场部")
+        Indicator.objects.bulk_create([
+            indicator("研发部", 1), indicator("研发部", 2, kind="1"), indicator("研发部", 3, kind="2"),
+            indicator("市场部", 1), indicator("市场部", 4, kind="2"),
+        ])
+        employees = create_employees(10, departments)
+        # bulk_create 不经过 save()，总分保持为 0
+        Assessment.objects.bulk_create([
+            Assessment(employee=employee, evaluator=evaluator, period=period,
+                       scores={"1": 50, "2": 10, "3": 5, "4": 3})
+            for period, evaluators in (("202501", employees[:1]), ("202502", employees[:4]))
+            for employee in employees
+            for evaluator in evaluators
+        ])
+
+    def setUp(self):
+        caches[CACHE_ALIAS].clear()
+
+    def totals(self, period):
+        return set(Assessment.objects.filter(period=period).values_list(
+            "employee__department__name", "total_score"
+        ))
+
+    def test_score_period(self):
+        # 考核及员工部门 + 部门名称 + 考核指标 + 批量写回，与考核数量无关
+        for period, count in (("202501", 10), ("202502", 40)):
+            caches[CACHE_ALIAS].clear()
+            with self.assertNumQueries(4):
+                self.assertEqual(score_period(period), count)
+            # 研发部 50 + 10 - 5，市场部 50 - 3，未配置的项点不计分
+            self.assertEqual(self.totals(period), {("研发部", 55), ("市场部", 47)})
+
+        # 总分未变化时不写回
+        with self.assertNumQueries(1):
+            self.assertEqual(score_period("202501"), 0)
+
+    def test_score_assessments_without_employees(self):
+        # 未加载员工时一次补查员工部门
+        with self.assertNumQueries(5):
+            self.assertEqual(score_assessments(Assessment.objects.filter(period="202501")), 10)
+        self.assertEqual(self.totals("202501"), {("研发部", 55), ("市场部", 47)})
+        self.assertEqual(score_assessments([]), 0)
+
+
+class BuildFinalScoreTests(SimpleTestCase):
+    """最终得分计分规则：按人员角色加权，缺少评分来源时按角色回退"""
+
+    def final_score(self, role, totals, leader_count=0, department_leader_count=None):
+        return build_final_score(1, "202501", role, leader_count, totals, department_leader_count).final_score
+
+    def test_weights(self):
+        # 项目负责人：部门负责人 85 * 60% + 自评计入项目负责人打分 70 * 40%
+        self.assertEqual(self.final_score("project_leader", {"dept": (170, 2), "self": (70, 1)}), 79)
+        # 项目组员：部门负责人 70 * 40% + 项目负责人 90 * 40% + 自评 100 * 20%
+        totals = {"dept": (140, 2), "project": (90, 1), "self": (100, 1)}
+        self.assertEqual(self.final_score("project_member", totals, leader_count=1), 84)
+        # 自由人：部门负责人 70 * 80% + 自评 50 * 20%
+        self.assertEqual(self.final_score("free_person", {"dept": (70, 1), "self": (50, 1)}), 66)
+
+    def test_missing_project_leader_score(self):
+        # 两名项目负责人只有一人打分，按负责人数量平均，缺少的计 0 分
+        totals = {"dept": (140, 2), "project": (90, 1), "self": (100, 1)}
+        self.assertEqual(self.final_score("project_member", totals, leader_count=2), 66)
+        # 没有项目负责人的组员按自由人计分
+        self.assertEqual(self.final_score("project_member", {"dept": (140, 2), "self": (100, 1)}), 76)
+
+    def test_missing_department_leader_score(self):
+        score = build_final_score(1, "202501", "free_person", 0, {"self": (90, 1)})
+        self.assertEqual((score.department_leader_score, score.self_score, score.final_score), (0, 90, 18))
+
+    def test_department_leader_count(self):
+        # 按固定的部门负责人人数平均，未打分的部门负责人计 0 分
+        totals = {"dept": (70, 1), "self": (50, 1)}
+        self.assertEqual(self.final_score("free_person", totals, department_leader_count=2), 38)
+
+
+class ComputeFinalScoreTests(TestCase):
+    """整批计算最终得分：按人员关系确定角色，重复计算更新已有记录"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = create_departments("研发部")[0]
+        heads = [create_employee(f"部长{i}", department, "department_leader") for i in range(2)]
+        leader = create_employee("负责人", department, "project_leader")
+        member = create_employee("组员", department)
+        free = create_employee("自由人", department)
+        EmployeeRelation.objects.create(date="202501", employee=leader, role="project_leader")
+        EmployeeRelation.objects.create(date="202501", employee=member, role="project_member", leaders="负责人")
+        EmployeeRelation.objects.create(date="202501", employee=free, role="free_person")
+        # bulk_create 不经过 save()，直接指定总分
+        Assessment.objects.bulk_create([
+            Assessment(employee=employee, evaluator=evaluator, period="202501", total_score=score, status="completed")
+            for employee, evaluator, score in (
+                (leader, heads[0], 80), (leader, heads[1], 90), (leader, leader, 70),
+                (member, heads[0], 60), (member, heads[1], 80), (member, leader, 90), (member, member, 100),
+                # 只有一名部门负责人为自由人打分
+                (free, heads[0], 70), (free, free, 50),
+            )
+        ])
+
+    def setUp(self):
+        caches[CACHE_ALIAS].clear()
+
+    def final_scores(self):
+        return dict(FinalScore.objects.filter(period="202501").values_list("employee__name", "final_score"))
+
+    def test_compute(self):
+        self.assertEqual(compute_final_scores("202501"), 3)
+        # 部门负责人本身不参与考核；研发部有 2 名部门负责人，只有一人为自由人打分时 X 仍为 2
+        self.assertEqual(self.final_scores(), {"负责人": 79, "组员": 84, "自由人": 38})
+
+    @override_settings(SCORE_DEPARTMENT_LEADER_COUNT=1)
+    def test_department_leader_count(self):
+        compute_final_scores("202501")
+        self.assertEqual(self.final_scores(), {"负责人": 130, "组员": 112, "自由人": 66})
+
+    def test_department_leader_count_per_department(self):
+        # 市场部只有 1 名部门负责人，X 按员工所在部门计算，不受研发部的部门负责人人数影响
+        department = create_departments("市场部")[0]
+        head = create_employee("市场部长", department, "department_leader")
+        other = create_employee("市场专员", department)
+        Assessment.objects.bulk_create([
+            Assessment(employee=other, evaluator=head, period="202501", total_score=70, status="completed"),
+            Assessment(employee=other, evaluator=other, period="202501", total_score=50, status="completed"),
+        ])
+        compute_final_scores("202501")
+        self.assertEqual(self.final_scores()["市场专员"], 66)
+        self.assertEqual(self.final_scores()["自由人"], 38)
+
+    def test_stale_final_scores_removed(self):
+        compute_final_scores("202501")
+        free = Employee.objects.get(name="自由人")
+        Assessment.objects.filter(employee=free).delete()
+        EmployeeRelation.objects.filter(employee=free).delete()
+        caches[CACHE_ALIAS].clear()
+
+        self.assertEqual(compute_final_scores("202501"), 2)
+        self.assertEqual(set(self.final_scores()), {"负责人", "组员"})
+
+    def test_recompute_updates(self):
+        compute_final_scores("202501")
+        ids = set(FinalScore.objects.values_list("id", flat=True))
+        Assessment.objects.filter(employee__name="自由人", evaluator__name="自由人").update(total_score=100)
+
+        self.assertEqual(compute_final_scores("202501"), 3)
+        self.assertEqual(set(FinalScore.objects.values_list("id", flat=True)), ids)
+        self.assertEqual(self.final_scores()["自由人"], 48)
+
+    def test_pending_assessments_ignored(self):
+        compute_final_scores("202501")
+        expected = self.final_scores()
+        # 生成待评价任务后重新计算，总分为 0 的待评价任务不拉低平均分
+        self.assertGreater(assign_assessments("202501")[1], 0)
+        compute_final_scores("202501")
+        self.assertEqual(self.final_scores(), expected)
+
+
+class UpdateRanksTests(TestCase):
+    """排名：并列名次的两种排名方式，不支持窗口函数的数据库在内存中排名，结果一致"""
+
+    @classmethod
+    def setUpTestData(cls):
+        departments = create_departments("研发部", "市场部")
+        FinalScore.objects.bulk_create([
+            FinalScore(employee=create_employee(name, departments[index]), period="202501", final_score=score)
+            for name, index, score in (
+                ("甲", 0, 90), ("乙", 0, 90), ("丙", 0, 80), ("丁", 0, 70), ("戊", 1, 85), ("己", 1, 60),
+            )
+        ])
+
+    def ranks(self):
+        return {
+            name: (rank, company_rank)
+            for name, rank, company_rank in FinalScore.objects.values_list("employee__name", "rank", "company_rank")
+        }
+
+    def assertRanks(self, expected, **options):
+        """窗口函数及内存排名两种实现分别从未排名开始计算"""
+        for window in (True, False):
+            with self.subTest(window=window), mock.patch.object(connection.features, "supports_over_clause", window):
+                FinalScore.objects.update(rank=0, company_rank=0)
+                self.assertEqual(update_ranks("202501", **options), len(expected))
+                self.assertEqual(self.ranks(), expected)
+                # 名次未变化时不写回
+                self.assertEqual(update_ranks("202501", **options), 0)
+
+    def test_competition(self):
+        self.assertRanks({
+            "甲": (1, 0), "乙": (1, 0), "丙": (3, 0), "丁": (4, 0), "戊": (1, 0), "己": (2, 0),
+        })
+
+    def test_dense(self):
+        self.assertRanks({
+            "甲": (1, 0), "乙": (1, 0), "丙": (2, 0), "丁": (3, 0), "戊": (1, 0), "己": (2, 0),
+        }, mode="dense")
+
+    def test_company_wide(self):
+        self.assertRanks({
+            "甲": (1, 1), "乙": (1, 1), "丙": (3, 4), "丁": (4, 5), "戊": (1, 3), "己": (2, 6),
+        }, company_wide=True)
+        self.assertRanks({
+            "甲": (1, 1), "乙": (1, 1), "丙": (2, 3), "丁": (3, 4), "戊": (1, 2), "己": (2, 5),
+        }, mode="dense", company_wide=True)
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            update_ranks("202501", mode="ordinal")
+
+
+class AssessmentBatchSubmitTests(TestCase):
+    """批量提交评分表：查询数与评分表数量无关，重复提交覆盖更新"""
+
+    @classmethod
+    def setUpTestData(cls):
+        departments = create_departments("部门0", "部门1", "部门2")
+        Indicator.objects.bulk_create([
+            indicator(department.name, seq, kind=kind, max_score=max_score)
+            for department in departments
+            for seq, kind, max_score in ((1, "0", 60), (2, "1", 20), (3, "2", 20))
+        ])
+        cls.employees = create_employees(50, departments, name="员工{:02d}")
+        cls.evaluator = cls.employees[0]
+
+    def submit(self, sheets):
+        return self.client.post("/api/assessments/", {
+            "evaluator": self.evaluator.pk,
+            "period": "202501",
+            "assessments": sheets,
+        }, content_type="application/json")
+
+    def test_batch_submit(self):
+        sheets = [
+            {"employee": employee.pk, "scores": {"1": 50, "2": 10, "3": 5}, "comment": "良好"}
+            for employee in self.employees
+        ]
+        # 事务保存点 + 员工 + 考核指标 + 批量写入
+        with self.assertNumQueries(5):
+            response = self.submit(sheets)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["saved_count"], 50)
+        self.assertEqual(set(Assessment.objects.values_list("total_score", flat=True)), {55})
+
+        sheets[0]["scores"] = {"1": 60}
+        with self.assertNumQueries(5):
+            self.submit(sheets[:1])
+        self.assertEqual(Assessment.objects.count(), 50)
+        self.assertEqual(Assessment.objects.get(employee=self.employees[0]).total_score, 60)
+
+    def test_out_of_range_rejects_batch(self):
+        response = self.submit([
+            {"employee": self.employees[1].pk, "scores": {"1": 50}},
+            {"employee": self.employees[2].pk, "scores": {"1": 61, "9": 1}},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.json()["errors"]), 2)
+        self.assertFalse(Assessment.objects.exists())
+
+
+class AssignAssessmentTests(TestCase):
+    """按人员关系生成考核任务及评价人可见人员索引：部门负责人评价所有人员，项目负责人评价组员及自己，所有人员自评"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = create_departments("研发部")[0]
+        cls.head = create_employee("部长", department, "department_leader")
+        cls.leader = create_employee("负责人", department, "project_leader")
+        cls.member = create_employee("组员", department)
+        cls.free = create_employee("自由人", department)
+        # 执行关系变更后的提交回调，与实际请求一致
+        with cls.captureOnCommitCallbacks(execute=True):
+            EmployeeRelation.objects.create(date="202501", employee=cls.leader, role="project_leader")
+            EmployeeRelation.objects.create(
+                date="202501", employee=cls.member, role="project_member", leaders="负责人", leader_count=1
+            )
+            EmployeeRelation.objects.create(date="202501", employee=cls.free, role="free_person")
+
+    def setUp(self):
+        caches[CACHE_ALIAS].clear()
+
+    def assign(self):
+        response = self.client.post(
+            "/api/assessments/assign/", {"period": "202501"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_task_graph(self):
+        self.assertEqual(self.assign()["created_count"], 7)
+        pairs = set(Assessment.objects.values_list("evaluator__name", "employee__name"))
+        self.assertEqual(pairs, {
+            ("部长", "负责人"), ("部长", "组员"), ("部长", "自由人"),
+            ("负责人", "负责人"), ("负责人", "组员"),
+            ("组员", "组员"), ("自由人", "自由人"),
+        })
+        self.assertEqual(set(Assessment.objects.values_list("status", flat=True)), {"pending"})
+
+    def test_idempotent(self):
+        self.assign()
+        Assessment.objects.filter(evaluator=self.head, employee=self.member).update(status="completed")
+        new = create_employee("新人", self.head.department)
+        EmployeeRelation.objects.create(date="202501", employee=new, role="free_person")
+
+        result = self.assign()
+        self.assertEqual((result["task_count"], result["created_count"]), (9, 2))
+        self.assertEqual(Assessment.objects.get(evaluator=self.head, employee=self.member).status, "completed")
+
+    def inbox(self, evaluator):
+        response = self.client.get(f"/api/assessments/inbox/?period=202501&evaluator={evaluator.pk}")
+        self.assertEqual(response.status_code, 200)
+        return [(row["employee_name"], row["role"], row["status"]) for row in response.json()["employees"]]
+
+    def test_inbox(self):
+        self.assign()
+        Assessment.objects.filter(evaluator=self.leader, employee=self.member).update(status="completed")
+        # 可见人员索引 + 人员姓名及考核状态
+        with self.assertNumQueries(2):
+            inbox = self.inbox(self.leader)
+        self.assertEqual(inbox, [("组员", "project_member", "completed"), ("负责人", "project_leader", "pending")])
+        self.assertEqual([row[0] for row in self.inbox(self.head)], ["组员", "自由人", "负责人"])
+        self.assertEqual(self.inbox(self.free), [("自由人", "free_person", "pending")])
+
+    def test_inbox_refreshed_on_relation_change(self):
+        self.assign()
+        relation = EmployeeRelation.objects.get(employee=self.free)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f"/api/relations/{relation.pk}/",
+                {"role": "free_person", "leaders": "负责人"},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        # 自由人保存时清空项目负责人，负责人可见人员不变
+        self.assertEqual(len(self.inbox(self.leader)), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            relation = EmployeeRelation.objects.get(employee=self.member)
+            relation.delete()
+        self.assertEqual([row[0] for row in self.inbox(self.leader)], ["负责人"])
+        self.assertEqual([row[0] for row in self.inbox(self.head)], ["自由人", "负责人"])
+
+    def test_incremental_refresh(self):
+        self.assign()
+        new = create_employee("新人", self.head.department)
+        with self.captureOnCommitCallbacks(execute=True):
+            EmployeeRelation.objects.create(
+                date="202501", employee=new, role="project_member", leaders="负责人"
+            )
+            relation = EmployeeRelation.objects.get(employee=self.member)
+            relation.leaders = ""
+            relation.save()
+        self.assertEqual([row[0] for row in self.inbox(self.leader)], ["新人", "负责人"])
+        self.assertEqual(self.inbox(self.member), [("组员", "project_member", "pending")])
+        with self.captureOnCommitCallbacks() as callbacks:
+            relation.leaders = "负责人"
+            relation.save()
+        refresh = next(
+            callback for callback in callbacks if getattr(callback, "commit_key", None) == ("visibility", "202501")
+        )
+        # 提交时先执行关系快照的失效（与本测试事务中更早登记的失效合并为同一回调），刷新时读取的快照才写入缓存
+        pending_on_commit(("cache", "relations"))()
+        # 已有索引 + 关系快照 + 该员工的项目负责人 + 部门负责人 + 写回负责人一行
+        with self.assertNumQueries(5):
+            refresh()
+        self.assertEqual([row[0] for row in self.inbox(self.leader)], ["新人", "组员", "负责人"])
+        # 逐条刷新的结果与整体计算一致
+        self.assertEqual(refresh_visibility("202501"), (0, 0, 0))
+
+    def test_department_leader_change(self):
+        self.assign()
+        member = Employee.objects.get(pk=self.member.pk)
+        # 角色未变化时保存不额外查询
+        with self.assertNumQueries(1):
+            member.position = "高级工程师"
+            member.save()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            member.role = "department_leader"
+            member.save()
+        # 部门负责人可见所有人员，本身不再出现在其他评价人的索引中
+        self.assertEqual([row[0] for row in self.inbox(member)], ["自由人", "负责人"])
+        self.assertEqual([row[0] for row in self.inbox(self.leader)], ["负责人"])
+        self.assertEqual(refresh_visibility("202501"), (0, 0, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            member.role = "project_member"
+            member.save()
+        self.assertEqual(self.inbox(member), [("组员", "project_member", "pending")])
+        self.assertEqual(refresh_visibility("202501"), (0, 0, 0))
+
+
+class ScoreStatisticsTests(TestCase):
+    """得分统计：分布、百分位数及部门汇总在服务端计算，查询数与人数无关"""
+
+    @classmethod
+    def setUpTestData(cls):
+        employees = create_employees(20, create_departments("部门0", "部门1"), name="员工{:02d}")
+        # 得分 5, 10, ..., 100
+        FinalScore.objects.bulk_create([
+            FinalScore(employee=employee, period="202501", final_score=(i + 1) * 5)
+            for i, employee in enumerate(employees)
+        ])
+
+    def test_statistics(self):
+        # 分布 + 部门汇总 + 百分位数得分 + 前 N 名 + 后 N 名
+        with self.assertNumQueries(5):
+            response = self.client.get("/api/statistics/?period=202501&top=3")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["count"], 20)
+        self.assertEqual(data["mean"], 52.5)
+        self.assertEqual(data["percentiles"]["p50"], 52.5)
+        self.assertEqual(
+            {item["bucket"]: item["count"] for item in data["histogram"]},
+            {"below40": 7, "40to50": 2, "50to60": 2, "60to70": 2, "70to80": 2, "80to90": 2, "above90": 3},
+        )
+        self.assertEqual([item["count"] for item in data["departments"]], [10, 10])
+        self.assertEqual(data["departments"][0]["mean"], 50)
+        self.assertEqual([item["score"] for item in data["top"]], [100, 95, 90])
+        self.assertEqual([item["score"] for item in data["bottom"]], [5, 10, 15])
+
+    def test_custom_buckets(self):
+        response = self.client.get("/api/statistics/?period=202501&buckets=60&percentiles=90&top=0")
+        data = response.json()
+        self.assertEqual([item["count"] for item in data["histogram"]], [11, 9])
+        self.assertEqual(list(data["percentiles"]), ["p90"])
+        self.assertEqual(data["top"], [])
+
+    def test_invalid_params(self):
+        for query in ("period=2025", "period=202501&buckets=60,50", "period=202501&source=x",
+                      "period=202501&percentiles=nan"):
+            self.assertEqual(self.client.get(f"/api/statistics/?{query}").status_code, 400)
+
+    def test_period_summary(self):
+        self.assertEqual(refresh_period_stats(["202501"]), 2)
+        # 24 个月的趋势只读取汇总表
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/statistics/summary/?start=202302&end=202501")
+        series = response.json()["series"]
+        self.assertEqual(len(series), 24)
+        self.assertEqual(series[0]["count"], 0)
+        month = series[-1]
+        detail = self.client.get("/api/statistics/?period=202501").json()
+        self.assertEqual((month["count"], month["mean"], month["stddev"]), (20, 52.5, detail["stddev"]))
+        self.assertEqual(
+            list(month["histogram"].values()), [item["count"] for item in detail["histogram"]]
+        )
+        self.assertEqual([item["mean"] for item in month["departments"]], [50, 55])
+
+    def test_summary_refreshed_on_final_score_write(self):
+        refresh_period_stats(["202501"])
+        score = FinalScore.objects.get(final_score=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            score.final_score = 95
+            score.save()
+        stats = PeriodDepartmentStats.objects.get(period="202501", department=score.employee.department)
+        self.assertEqual((stats.count, stats.score_sum), (10, 590))
+        self.assertEqual(stats.buckets, [3, 1, 1, 1, 1, 1, 2])
+
+    def summary_rows(self):
+        return sorted(PeriodDepartmentStats.objects.values_list(
+            'period', 'department', 'role', 'count', 'score_sum', 'score_sumsq', 'buckets'
+        ))
+
+    def test_summary_deltas_match_refresh(self):
+        refresh_period_stats(["202501"])
+        score = FinalScore.objects.get(final_score=5)
+        # 单条写入：保存 + 查汇总行所在部门及角色 + 锁定并更新该汇总行（含保存点），不再重新汇总整个周期
+        with self.assertNumQueries(6):
+            score.final_score = 45
+            score.save()
+        EmployeeRelation.objects.create(employee=score.employee, date="202501", role="free_person")
+        relation = EmployeeRelation.objects.create(
+            employee=FinalScore.objects.get(final_score=100).employee, date="202501", role="free_person"
+        )
+        relation.role = "project_member"
+        relation.save()
+        FinalScore.objects.get(final_score=10).delete()
+        FinalScore.objects.create(employee=score.employee, period="202502", final_score=70)
+        incremental = self.summary_rows()
+
+        refresh_period_stats(["202501", "202502"])
+        self.assertEqual(incremental, self.summary_rows())
+        self.assertEqual(
+            PeriodDepartmentStats.objects.filter(period="202501", role="free_person").get().count, 1
+        )
+
+        relation.delete()
+        self.assertFalse(PeriodDepartmentStats.objects.filter(role="project_member").exists())
+
+    def test_summary_follows_department_change(self):
+        refresh_period_stats(["202501"])
+        employee = FinalScore.objects.get(final_score=5).employee
+        other = Department.objects.exclude(pk=employee.department_id).get()
+        with self.captureOnCommitCallbacks(execute=True):
+            employee.department = other
+            employee.save()
+        incremental = self.summary_rows()
+        self.assertEqual(
+            PeriodDepartmentStats.objects.get(period="202501", department=other).count, 11
+        )
+        refresh_period_stats(["202501"])
+        self.assertEqual(incremental, self.summary_rows())
+
+    def test_summary_insert_conflict_retried(self):
+        refresh_period_stats(["202501"])
+        score = FinalScore.objects.get(final_score=5)
+        apply = statistics._apply_period_stats_changes
+        attempts = []
+
+        def conflicting_apply(changes):
+            # 首次写入后模拟并发事务抢先新建同一汇总行，本次写入随保存点回滚
+            attempts.append(changes)
+            written = apply(changes)
+            if len(attempts) == 1:
+                raise IntegrityError("Duplicate entry")
+            return written
+
+        with mock.patch.object(statistics, "_apply_period_stats_changes", conflicting_apply):
+            score.final_score = 45
+            score.save()
+        self.assertEqual(len(attempts), 2)
+        incremental = self.summary_rows()
+        refresh_period_stats(["202501"])
+        self.assertEqual(incremental, self.summary_rows())
+
+
+class TrendTests(TestCase):
+    """绩效趋势：一次查询取出多个月份得分，移动平均、环比及排名变化整体计算"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = create_departments("研发部")[0]
+        cls.a, cls.b = create_employee("甲", department), create_employee("乙", department)
+        FinalScore.objects.bulk_create([
+            FinalScore(employee=cls.a, period="202501", final_score=80),
+            FinalScore(employee=cls.a, period="202502", final_score=70),
+            FinalScore(employee=cls.a, period="202503", final_score=90),
+            FinalScore(employee=cls.b, period="202501", final_score=60),
+            FinalScore(employee=cls.b, period="202503", final_score=95),
+        ])
+
+    def test_trend(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/statistics/trend/?start=202501&end=202503&window=2")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["periods"], ["202501", "202502", "202503"])
+        self.assertEqual(data["summary"]["mean"], [70, 70, 92.5])
+        b, a = data["employees"]
+        self.assertEqual(a["employee_name"], "甲")
+        self.assertEqual(a["moving_average"], [80, 75, 80])
+        self.assertEqual(a["delta"], [None, -10, 20])
+        self.assertEqual(a["rank"], [1, 1, 2])
+        self.assertEqual(a["rank_change"], [None, 0, -1])
+        self.assertEqual(b["scores"], [60, None, 95])
+        self.assertEqual(b["rank"], [2, None, 1])
+
+    def test_filter_employees(self):
+        data = self.client.get(f"/api/statistics/trend/?start=202501&end=202503&employees={self.b.pk}").json()
+        self.assertEqual([item["employee"] for item in data["employees"]], [self.b.pk])
+        self.assertEqual(data["employees"][0]["rank"], [1, None, 1])
+
+
+class AlertTests(TestCase):
+    """绩效预警：整个周期批量评估，重复执行不产生重复预警"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employees = create_employees(6, create_departments("研发部"))
+        # 前三个月均为 85 分，本月：员工0 55 分，员工1 68 分，其余 80 分以上
+        FinalScore.objects.bulk_create([
+            FinalScore(employee=employee, period=period, final_score=85)
+            for employee in cls.employees
+            for period in ("202410", "202411", "202412")
+        ] + [
+            FinalScore(employee=employee, period="202501", final_score=score)
+            for employee, score in zip(cls.employees, (55, 68, 80, 82, 84, 86))
+        ])
+
+    def alerts(self):
+        return set(PerformanceAlert.objects.values_list("employee__name", "rule"))
+
+    def test_rules(self):
+        # 最终得分 + 写入预警 + 查询已有预警
+        with self.assertNumQueries(3):
+            counts = evaluate_alerts("202501")
+        self.assertEqual(counts, {"threshold": 1, "rolling_drop": 2, "bottom_percentile": 1})
+        self.assertEqual(self.alerts(), {
+            ("员工0", "threshold"), ("员工0", "rolling_drop"), ("员工1", "rolling_drop"),
+            ("员工0", "bottom_percentile"),
+        })
+        alert = PerformanceAlert.objects.get(employee=self.employees[1])
+        self.assertEqual((alert.score, alert.reference), (68, 85))
+
+    def test_rerun_dedupes(self):
+        evaluate_alerts("202501")
+        PerformanceAlert.objects.filter(rule="threshold").update(acknowledged=True)
+        evaluate_alerts("202501")
+        self.assertEqual(PerformanceAlert.objects.count(), 4)
+        self.assertTrue(PerformanceAlert.objects.get(rule="threshold").acknowledged)
+
+        # 重新计算后员工1不再触发预警
+        FinalScore.objects.filter(employee=self.employees[1], period="202501").update(final_score=80)
+        evaluate_alerts("202501")
+        self.assertNotIn(("员工1", "rolling_drop"), self.alerts())
+
+    def test_alert_list(self):
+        evaluate_alerts("202501")
+        response = self.client.get("/api/alerts/?period=202501&rule=rolling_drop")
+        self.assertEqual(response.json()["count"], 2)
+
+
+class ReportJobTests(TestCase):
+    """绩效报告：接口只登记任务，后台进程生成，得分未变化时复用已生成的报告"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.departments = create_departments("研发部", "市场部")
+        FinalScore.objects.bulk_create([
+            FinalScore(employee=employee, period="202501", final_score=70 + i, rank=i // 2 + 1)
+            for i, employee in enumerate(create_employees(6, cls.departments))
+        ])
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def submit(self, **data):
+        return self.client.post("/api/reports/", {"period": "202501", "format": "xlsx", **data})
+
+    def test_company_report(self):
+        response = self.submit()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.json()["status"], response.json()["cached"]), ("pending", False))
+
+        call_command("run_report_worker", "--once", "--processes", "2", stdout=io.StringIO())
+        job = self.client.get(f"/api/reports/{response.json()['id']}/").json()
+        self.assertEqual(job["status"], "completed")
+
+        download = self.client.get(job["download_url"])
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(download.streaming_content)))
+        self.assertEqual(
+            sorted(archive.namelist()),
+            ["202501_全公司.xlsx", "202501_市场部.xlsx", "202501_研发部.xlsx"]
+        )
+
+    def test_department_report_reused(self):
+        scope = str(self.departments[0].pk)
+        job_id = self.submit(scope=scope).json()["id"]
+        self.assertEqual(self.client.get(f"/api/reports/{job_id}/download/").status_code, 409)
+        call_command("run_report_worker", "--once", "--processes", "1", stdout=io.StringIO())
+
+        response = self.submit(scope=scope)
+        self.assertEqual((response.status_code, response.json()["id"], response.json()["cached"]), (200, job_id, True))
+        download = self.client.get(response.json()["download_url"])
+        self.assertTrue(b"".join(download.streaming_content).startswith(b"PK"))
+
+        # 得分重新计算后生成新的报告
+        FinalScore.objects.filter(employee__department=self.departments[0]).first().save()
+        self.assertFalse(self.submit(scope=scope).json()["cached"])
+
+    def test_invalid_scope(self):
+        self.assertEqual(self.submit(scope="0").status_code, 400)
+        self.assertEqual(self.submit(format="txt").status_code, 400)
+
+    def test_version_changes_with_ranks(self):
+        version = data_version("202501")
+        self.assertEqual(update_ranks("202501", company_wide=True), 6)
+        self.assertNotEqual(data_version("202501"), version)
+
+    def test_stale_running_job_requeued(self):
+        job_id = self.submit().json()["id"]
+        job = claim_next_job()
+        self.assertEqual((job.id, job.status), (job_id, "running"))
+        self.assertIsNone(claim_next_job())
+
+        # 后台进程退出后任务一直处于生成中，超时后重新排队并被再次领取
+        ReportJob.objects.filter(id=job_id).update(started_at=timezone.now() - timedelta(hours=1))
+        with override_settings(REPORT_JOB_TIMEOUT=600):
+            job = claim_next_job()
+        self.assertEqual((job.id, job.status), (job_id, "running"))
+        self.assertEqual(requeue_stale_jobs(timeout=600), 0)
+
+    def test_worker_survives_database_error(self):
+        self.submit()
+        command = "performance.management.commands.run_report_worker"
+        # 数据库连接断开时记录错误并继续轮询，不退出进程
+        with mock.patch(f"{command}.claim_next_job", side_effect=OperationalError("gone away")), \
+                mock.patch(f"{command}.close_old_connections") as close, \
+                self.assertLogs("performance.reports", "ERROR"):
+            call_command("run_report_worker", "--once", stdout=io.StringIO())
+        close.assert_called_once_with()
+
+        call_command("run_report_worker", "--once", "--processes", "1", stdout=io.StringIO())
+        self.assertEqual(ReportJob.objects.get().status, "completed")
+
+    def test_worker_survives_save_error(self):
+        first, second = self.submit().json()["id"], self.submit(scope=str(self.departments[0].pk)).json()["id"]
+        save = ReportJob.save
+
+        def failing_save(job, *args, **kwargs):
+            # 第一个任务保存报告文件时数据库连接断开
+            if job.id == first and "file" in kwargs.get("update_fields", ()):
+                raise OperationalError("gone away")
+            return save(job, *args, **kwargs)
+
+        with mock.patch.object(ReportJob, "save", failing_save), self.assertLogs("performance.reports", "ERROR"):
+            call_command("run_report_worker", "--once", "--processes", "1",
+                         stdout=io.StringIO(), stderr=io.StringIO())
+        job = ReportJob.objects.get(id=first)
+        self.assertEqual((job.status, job.error), ("failed", "gone away"))
+        self.assertEqual(ReportJob.objects.get(id=second).status, "completed")
+
+
+class PeriodExportTests(TestCase):
+    """考核周期数据导出：按主键分批读取，评分表按项点序号展开"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.departments = create_departments("研发部", "市场部")
+        Indicator.objects.bulk_create([
+            indicator(dept, seq) for dept, seq in (("研发部", 1), ("研发部", 2), ("市场部", 3))
+        ])
+        employees = create_employees(5, cls.departments)
+        Assessment.objects.bulk_create([
+            Assessment(
+                employee=employee, evaluator=employees[0], period="202501", status="completed",
+                scores={"1": 80, "2": 90} if employee.department == cls.departments[0] else {"3": 70},
+            )
+            for employee in employees
+        ])
+
+    def content(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_csv(self):
+        # 考核指标 1 次 + 5 行分 3 批读取
+        with self.assertNumQueries(4):
+            response = self.client.get("/api/exports/assessments/?period=202501&chunk_size=2")
+            rows = list(csv.reader(io.StringIO(self.content(response).decode("utf-8-sig"))))
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="assessments_202501.csv"')
+        self.assertEqual(rows[0][-3:], ["项点1", "项点2", "项点3"])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1][2], "员工0")
+        self.assertEqual(rows[1][-3:], ["80", "90", ""])
+        self.assertEqual(rows[2][-3:], ["", "", "70"])
+
+    def test_ndjson_department(self):
+        response = self.client.get(
+            f"/api/exports/assessments/?period=202501&file_format=ndjson&department={self.departments[1].pk}"
+        )
+        rows = [json.loads(line) for line in self.content(response).decode("utf-8").splitlines()]
+        self.assertEqual([row["employee__name"] for row in rows], ["员工1", "员工3"])
+        self.assertEqual(rows[0]["score_3"], 70)
+        self.assertNotIn("score_1", rows[0])
+
+    def test_xlsx_final_scores(self):
+        from openpyxl import load_workbook
+
+        FinalScore.objects.create(employee=Employee.objects.get(name="员工0"), period="202501", final_score=88)
+        response = self.client.get("/api/exports/final-scores/?period=202501&file_format=xlsx")
+        rows = list(load_workbook(io.BytesIO(self.content(response))).active.iter_rows(values_only=True))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][2], "员工0")
+        self.assertEqual(rows[1][7], 88)
+
+    async def test_asgi_stream(self):
+        # ASGI 下改用异步迭代器逐块输出，内容与 WSGI 相同
+        url = "/api/exports/assessments/?period=202501&chunk_size=2"
+        response = await self.async_client.get(url)
+        self.assertTrue(response.is_async)
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        expected = await sync_to_async(lambda: self.content(self.client.get(url)))()
+        self.assertEqual(content, expected)
+
+    def test_invalid_params(self):
+        self.assertEqual(self.client.get("/api/exports/assessments/?period=2025").status_code, 400)
+        self.assertEqual(self.client.get("/api/exports/assessments/?period=202501&file_format=pdf").status_code, 400)
+
+
+class AsyncReadTests(TransactionTestCase):
+    """异步只读接口与同步接口返回相同的数据；首页汇总的各项查询在线程池中使用独立连接执行，需要已提交的数据"""
+
+    def setUp(self):
+        caches[CACHE_ALIAS].clear()
+        self.department = create_departments("研发部")[0]
+        self.head = create_employee("部长", self.department, "department_leader")
+        leader = create_employee("负责人", self.department, "project_leader")
+        member = create_employee("组员", self.department)
+        EmployeeRelation.objects.create(date="202501", employee=leader, role="project_leader")
+        EmployeeRelation.objects.create(
+            date="202501", employee=member, role="project_member", leaders="负责人", leader_count=1
+        )
+        FinalScore.objects.bulk_create([
+            FinalScore(employee=leader, period="202501", final_score=82),
+            FinalScore(employee=member, period="202501", final_score=55),
+        ])
+        evaluate_alerts("202501")
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_same_as_sync(self):
+        for path in (
+            "relations/?date=202501",
+            "statistics/?period=202501&top=1",
+            f"assessments/inbox/?period=202501&evaluator={self.head.pk}",
+        ):
+            self.assertEqual(self.get(f"/api/async/{path}"), self.get(f"/api/{path}"), path)
+
+    def test_relation_pages(self):
+        data = self.get("/api/async/relations/?date=202501&page_size=1")
+        self.assertEqual((data["count"], data["results"][0]["employee_name"]), (2, "组员"))
+        data = self.get(data["next"])
+        self.assertEqual((data["next"], data["results"][0]["employee_name"]), (None, "负责人"))
+        self.assertNotIn("page=", data["previous"])
+        self.assertEqual(self.client.get("/api/async/relations/?page=3&page_size=1").status_code, 404)
+
+    def test_dashboard(self):
+        data = self.get(f"/api/async/dashboard/?period=202501&department={self.department.pk}&evaluator={self.head.pk}")
+        self.assertEqual(data["statistics"]["count"], 2)
+        self.assertEqual(data["relations"]["total_count"], 2)
+        self.assertEqual(data["inbox"]["pending_count"], 2)
+        self.assertEqual({alert["rule"] for alert in data["alerts"]}, {"threshold"})
+
+    def test_invalid_params(self):
+        self.assertEqual(self.client.get("/api/async/statistics/?period=2025").status_code, 400)
+        self.assertEqual(self.client.get("/api/async/dashboard/?period=202501&evaluator=x").status_code, 400)
+
+
+class OnCommitMergeTests(TestCase):
+    """事务提交后刷新：同一事务内相同 key 合并为一次，回滚的登记不影响之后的登记"""
+
+    def test_merge(self):
+        calls = []
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            on_commit_merge("key", calls.append, {"employee_ids": [1]})
+            on_commit_merge("key", calls.append, {"employee_ids": [2]})
+            on_commit_once("other", lambda: calls.append("other"))
+        self.assertEqual(len(callbacks), 2)
+        self.assertEqual(calls, [{"employee_ids": {1, 2}}, "other"])
+
+        # 已执行的登记不再合并
+        with self.captureOnCommitCallbacks(execute=True):
+            on_commit_merge("key", calls.append, {"employee_ids": [3]})
+            on_commit_merge("key", calls.append)
+        self.assertEqual(calls[-1], None)
+
+    def test_rolled_back_registration(self):
+        calls = []
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    on_commit_merge("key", calls.append, {"employee_ids": [1]})
+                    raise ValueError
+            except ValueError:
+                pass
+            on_commit_merge("key", calls.append, {"employee_ids": [2]})
+        self.assertEqual(calls, [{"employee_ids": {2}}])
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """连接池：复用归还的连接，超过空闲时间或数量上限的连接关闭"""
+
+    class Connection:
+        def __init__(self):
+            self.closed = False
+            self.rollbacks = 0
+            self.alive = True
+
+        def rollback(self):
+            self.rollbacks += 1
+
+        def ping(self):
+            if not self.alive:
+                raise OperationalError("MySQL server has gone away")
+
+        def close(self):
+            self.closed = True
+
+    def test_reuse(self):
+        pool = ConnectionPool(size=1)
+        first = pool.acquire(self.Connection)
+        second = pool.acquire(self.Connection)
+        pool.release(first)
+        pool.release(second)
+        # 空闲连接已达上限，第二个连接关闭
+        self.assertEqual((first.closed, second.closed, first.rollbacks), (False, True, 1))
+        self.assertIs(pool.acquire(self.Connection), first)
+        self.assertEqual(pool.stats(), {"idle": 0, "created": 2, "reused": 1})
+
+    def test_recycle(self):
+        pool = ConnectionPool(size=2, recycle=0)
+        connection = pool.acquire(self.Connection)
+        pool.release(connection)
+        self.assertIsNot(pool.acquire(self.Connection), connection)
+        self.assertTrue(connection.closed)
+
+    def test_ping_on_checkout(self):
+        pool = ConnectionPool(size=2)
+        first, second = pool.acquire(self.Connection), pool.acquire(self.Connection)
+        pool.release(first)
+        pool.release(second)
+        # 空闲期间被服务端断开的连接取出时丢弃，继续取下一个空闲连接
+        second.alive = False
+        self.assertIs(pool.acquire(self.Connection), first)
+        self.assertTrue(second.closed)
+        self.assertEqual(pool.stats(), {"idle": 0, "created": 2, "reused": 1})
+
+        pool = ConnectionPool(ping=False)
+        pool.release(second)
+        self.assertIs(pool.acquire(self.Connection), second)
+
+
+@skipUnless(find_spec("MySQLdb"), "需要安装 mysqlclient")
+class PoolDatabaseWrapperTests(SimpleTestCase):
+    """连接池数据库后端：关闭连接时归还连接池，事务中途关闭或出错的连接直接关闭"""
+
+    def setUp(self):
+        from score_system.mysql_pool import base
+
+        self.base = base
+        self.wrapper = base.DatabaseWrapper({
+            **connection.settings_dict, 'ENGINE': 'score_system.mysql_pool', 'POOL': {'size': 2}
+        }, alias='pool_test')
+        self.addCleanup(base._pools.pop, 'pool_test', None)
+        connect = mock.patch.object(
+            base.base.DatabaseWrapper, 'get_new_connection',
+            side_effect=lambda params: ConnectionPoolTests.Connection(),
+        )
+        connect.start()
+        self.addCleanup(connect.stop)
+
+    def open(self):
+        self.wrapper.connection = self.wrapper.get_new_connection({})
+        return self.wrapper.connection
+
+    def test_close_releases(self):
+        first = self.open()
+        self.wrapper._close()
+        self.assertEqual((first.closed, first.rollbacks), (False, 1))
+        self.assertEqual(self.wrapper.pool.stats()["idle"], 1)
+        self.assertIs(self.open(), first)
+        self.assertEqual(self.wrapper.pool.stats(), {"idle": 0, "created": 1, "reused": 1})
+
+    def test_close_discards_broken(self):
+        for state in ('in_atomic_block', 'errors_occurred'):
+            with self.subTest(state):
+                conn = self.open()
+                setattr(self.wrapper, state, True)
+                self.wrapper._close()
+                setattr(self.wrapper, state, False)
+                self.assertTrue(conn.closed)
+                self.assertEqual(self.wrapper.pool.stats()["idle"], 0)
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=1)
+class RequestMetricsTests(TestCase):
+    """请求耗时统计：Server-Timing 响应头、每个请求一行 JSON 日志及按视图汇总的耗时分布"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_employees(3, create_departments("研发部"))
+
+    def setUp(self):
+        reset_request_metrics()
+
+    def test_metrics(self):
+        with self.assertLogs("performance.requests") as logs:
+            response = self.client.get("/api/employees/")
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "EmployeeListCreateView")
+        self.assertEqual(record["size"], len(response.content))
+        self.assertEqual(record["queries"], 2)
+        self.assertIn('db;dur=', response["Server-Timing"])
+        self.assertIn('desc="2 queries"', response["Server-Timing"])
+
+        self.client.get("/api/employees/")
+        view = self.client.get("/api/metrics/requests/").json()["views"]["EmployeeListCreateView"]
+        self.assertEqual((view["count"], view["queries_mean"]), (2, 2))
+        self.assertEqual(sum(view["histogram"].values()), 2)
+        self.assertGreater(view["serialize_mean_ms"], 0)
+
+    def test_api_view_serialize_timing(self):
+        # 返回普通字典的 APIView：响应渲染计入序列化耗时
+        response = self.client.get("/api/statistics/?period=202501")
+        self.assertEqual(response.status_code, 200)
+        serialize = re.search(r"serialize;dur=([\d.]+)", response["Server-Timing"])
+        self.assertGreater(float(serialize.group(1)), 0)
+        view = self.client.get("/api/metrics/requests/").json()["views"]["StatisticsView"]
+        self.assertGreater(view["serialize_mean_ms"], 0)
+
+    def test_write_serializer_not_timed(self):
+        # 传入 data 的序列化器在校验前不读取 .data，创建及修改照常执行
+        department = Department.objects.get()
+        response = self.client.post("/api/employees/", {
+            "name": "新员工", "department": department.pk, "ip_address": "10.0.0.1",
+            "job_type": "开发", "position": "工程师", "role": "project_member",
+        })
+        self.assertEqual(response.status_code, 201)
+        response = self.client.patch(
+            f"/api/employees/{response.json()['id']}/", {"position": "架构师"}, content_type="application/json"
+        )
+        self.assertEqual(response.json()["position"], "架构师")
+        self.assertIn("serialize;dur=", response["Server-Timing"])
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_sampling_disabled(self):
+        response = self.client.get("/api/employees/")
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(self.client.get("/api/metrics/requests/").json()["views"], {})
@@ -0,0 +1,66 @@
+"""事务提交后执行的汇总刷新
+
+人员关系、最终得分变更后需要刷新的派生数据（可见人员索引、统计汇总）在事务提交后统一刷新，
+同一事务内对同一对象的多次变更只刷新一次。
+"""
+from weakref import WeakValueDictionary
+
+from django.db import transaction
+
+
+class MergedCallback:
+    """on_commit_merge 登记的回调，执行前合并同一事务内多次登记的变更范围"""
+
+    def __init__(self, pending, key, func, items):
+        self.pending = pending
+        self.commit_key = key
+        self.func = func
+        self.items = None if items is None else {name: set(values) for name, values in items.items()}
+
+    def merge(self, items):
+        if items is None:
+            self.items = None
+        elif self.items is not None:
+            for name, values in items.items():
+                self.items.setdefault(name, set()).update(values)
+
+    def __call__(self):
+        if self.pending.get(self.commit_key) is self:
+            del self.pending[self.commit_key]
+        self.func(self.items)
+
+
+def on_commit_merge(key, func, items=None):
+    """事务提交后执行 func(items)，同一事务内相同 key 只登记一次；不在事务中时立即执行
+
+    items 为 {名称: 变更对象ID}，同一事务内多次登记时按名称合并为集合，用于只刷新变更涉及的部分；
+    任意一次登记为 None（不限定范围）时以 None 执行。
+    待执行的回调按 key 记在连接上，只保存弱引用：事务或保存点回滚时 Django 丢弃回调，登记随之失效，
+    之后的登记重新调用 transaction.on_commit。
+    """
+    connection = transaction.get_connection()
+    pending = getattr(connection, 'pending_commit_callbacks', None)
+    if pending is None:
+        pending = connection.pending_commit_callbacks = WeakValueDictionary()
+
+    callback = pending.get(key) if connection.in_atomic_block else None
+    if callback is not None:
+        callback.merge(items)
+        return
+
+    callback = MergedCallback(pending, key, func, items)
+    pending[key] = callback
+    transaction.on_commit(callback)
+
+
+def pending_on_commit(key):
+    """当前事务中登记了 key、尚未执行的回调，没有时返回 None"""
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        return None
+    return getattr(connection, 'pending_commit_callbacks', {}).get(key)
+
+
+def on_commit_once(key, func):
+    """事务提交后执行 func()，同一事务内相同 key 只登记一次；不在事务中时立即执行"""
+    on_commit_merge(key, lambda items: func())
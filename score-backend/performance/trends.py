@@ -0,0 +1,110 @@
+"""绩效趋势分析
+
+一次查询取出所选人员在各月份的最终得分，整理为 人员 × 月份 的矩阵后用 pandas/numpy 整体计算
+移动平均、环比变化及排名变化，不逐人逐月循环。
+"""
+import numpy as np
+import pandas as pd
+
+from .models import FinalScore
+
+TREND_COLUMNS = ['employee_id', 'employee_name', 'department_id', 'department_name', 'period', 'final_score']
+
+
+def to_lists(matrix, digits=2):
+    """矩阵整体转为 JSON 列表，缺失值为 None，digits 为 0 时转为整数"""
+    matrix = np.asarray(matrix, dtype=float)
+    missing = np.isnan(matrix)
+    values = np.round(np.where(missing, 0, matrix), digits)
+    if digits == 0:
+        values = values.astype(int)
+    return np.where(missing, None, values.astype(object)).tolist()
+
+
+def moving_average(matrix, window):
+    """按行计算 window 个月的移动平均，窗口内缺考的月份不计入，本月缺考时为 NaN"""
+    missing = np.isnan(matrix)
+    totals = np.cumsum(np.where(missing, 0, matrix), axis=1)
+    counts = np.cumsum(~missing, axis=1)
+    totals[:, window:] -= totals[:, :-window].copy()
+    counts[:, window:] -= counts[:, :-window].copy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        averages = totals / counts
+    averages[missing] = np.nan
+    return averages
+
+
+def load_score_matrix(periods, employee_ids=None, department=None):
+    """一次查询取出各月份最终得分，返回 (人员 × 月份 得分矩阵, 人员信息)，按部门、姓名排序
+
+    得分矩阵以员工ID为行、月份为列，缺考的月份为 NaN；人员信息包含姓名、部门ID及部门名称。
+    """
+    queryset = FinalScore.objects.filter(period__in=periods)
+    if employee_ids:
+        queryset = queryset.filter(employee_id__in=employee_ids)
+    if department:
+        queryset = queryset.filter(employee__department_id=department)
+    rows = queryset.order_by().values_list(
+        'employee_id', 'employee__name', 'employee__department_id', 'employee__department__name',
+        'period', 'final_score'
+    )
+
+    frame = pd.DataFrame.from_records(list(rows), columns=TREND_COLUMNS)
+    scores = frame.pivot_table(
+        index='employee_id', columns='period', values='final_score', aggfunc='last'
+    ).reindex(columns=periods)
+    info = frame.drop_duplicates('employee_id').set_index('employee_id').loc[scores.index]
+    order = np.lexsort((info['employee_name'].to_numpy(), info['department_name'].to_numpy()))
+    return scores.iloc[order], info.iloc[order]
+
+
+def score_trend(periods, employee_ids=None, department=None, window=3):
+    """所选人员在各月份的得分趋势
+
+    返回各月份的平均分及其移动平均，以及每人的得分、移动平均（window 个月）、环比变化、
+    排名（所选人员中按得分从高到低，并列占位）及排名变化（正数为上升）。缺考的月份为 None。
+    """
+    scores, info = load_score_matrix(periods, employee_ids=employee_ids, department=department)
+    if scores.empty:
+        return {
+            "periods": periods,
+            "window": window,
+            "summary": {"mean": [None] * len(periods), "moving_average": [None] * len(periods)},
+            "employees": [],
+        }
+
+    matrix = scores.to_numpy()
+    averages = moving_average(matrix, window)
+    delta = np.diff(matrix, axis=1, prepend=np.nan)
+    ranks = scores.rank(axis=0, ascending=False, method='min').to_numpy()
+    rank_change = -np.diff(ranks, axis=1, prepend=np.nan)
+
+    # 各月份平均分，没有得分的月份为 NaN
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nansum(matrix, axis=0, keepdims=True) / (~np.isnan(matrix)).sum(axis=0, keepdims=True)
+    return {
+        "periods": periods,
+        "window": window,
+        "summary": {
+            "mean": to_lists(mean)[0],
+            "moving_average": to_lists(moving_average(mean, window))[0],
+        },
+        "employees": [
+            {
+                "employee": employee_id,
+                "employee_name": employee_name,
+                "department_name": department_name,
+                "scores": score_row,
+                "moving_average": average_row,
+                "delta": delta_row,
+                "rank": rank_row,
+                "rank_change": change_row,
+            }
+            for employee_id, employee_name, department_name, score_row, average_row, delta_row, rank_row, change_row
+            in zip(
+                scores.index.tolist(), info['employee_name'].tolist(), info['department_name'].tolist(),
+                to_lists(matrix), to_lists(averages), to_lists(delta),
+                to_lists(ranks, 0), to_lists(rank_change, 0),
+            )
+        ],
+    }
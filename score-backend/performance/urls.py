@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     # 员工管理
@@ -9,15 +9,40 @@ urlpatterns = [
     # 人员关系管理
     path('relations/', views.RelationListCreateView.as_view(), name='relation-list'),
     path('relations/<int:pk>/', views.RelationDetailView.as_view(), name='relation-detail'),
+    path('relations/roles/', views.RelationRoleBatchUpdateView.as_view(), name='relation-role-batch-update'),
     path('relations/import/', views.RelationBulkImportView.as_view(), name='relation-import'),
+    path('relations/import/upload/', views.RelationUploadImportView.as_view(), name='relation-import-upload'),
     path('relations/statistics/', views.RelationStatisticsView.as_view(), name='relation-statistics'),
     
     # 考核流程管理
     path('assessments/', views.AssessmentListCreateView.as_view(), name='assessment-list-create'),
     path('assessments/<int:pk>/', views.AssessmentDetailView.as_view(), name='assessment-detail'),
     path('assessments/assign/', views.AssignAssessmentView.as_view(), name='assessment-assign'),
+    path('assessments/inbox/', views.EvaluatorInboxView.as_view(), name='assessment-inbox'),
     
     # 绩效结果查询和统计
     path('statistics/', views.StatisticsView.as_view(), name='statistics'),
+    path('statistics/summary/', views.StatisticsSummaryView.as_view(), name='statistics-summary'),
+    path('statistics/trend/', views.TrendView.as_view(), name='statistics-trend'),
     path('reports/', views.ReportGenerationView.as_view(), name='report-generation'),
+    path('reports/<int:pk>/', views.ReportJobDetailView.as_view(), name='report-detail'),
+    path('reports/<int:pk>/download/', views.ReportDownloadView.as_view(), name='report-download'),
+    
+    # 绩效预警
+    path('alerts/', views.AlertListView.as_view(), name='alert-list'),
+    path('alerts/<int:pk>/', views.AlertDetailView.as_view(), name='alert-detail'),
+    
+    # 数据导出
+    path('exports/assessments/', views.PeriodExportView.as_view(export='assessments'), name='export-assessments'),
+    path('exports/final-scores/', views.PeriodExportView.as_view(export='final_scores'), name='export-final-scores'),
+    
+    # 异步只读接口（ASGI）
+    path('async/relations/', async_views.AsyncRelationListView.as_view(), name='async-relation-list'),
+    path('async/statistics/', async_views.AsyncStatisticsView.as_view(), name='async-statistics'),
+    path('async/assessments/inbox/', async_views.AsyncEvaluatorInboxView.as_view(), name='async-assessment-inbox'),
+    path('async/dashboard/', async_views.DashboardView.as_view(), name='async-dashboard'),
+    
+    # 运维
+    path('cache/stats/', views.CacheStatsView.as_view(), name='cache-stats'),
+    path('metrics/requests/', views.RequestMetricsView.as_view(), name='request-metrics'),
 ]
\ No newline at end of file
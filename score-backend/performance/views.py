@@ -1,57 +1,111 @@
+import json
+import math
+import os
 from rest_framework import generics, views, viewsets, filters
 from rest_framework.response import Response
 from rest_framework import status
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from django.http import FileResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.db import transaction
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import *
+from .cache import cache_stats
+from .instrumentation import SerializerTimingMixin, request_metrics, reset_request_metrics, serialized
+from .pagination import OptionalKeysetPagination
+from .statistics import (
+    SCORE_BUCKETS, SCORE_PERCENTILES, SCORE_SOURCES,
+    is_period, month_range, period_summary, relation_statistics, score_statistics
+)
+from .relations import ROLE_LEVELS, change_roles, remove_leaders
+from .trends import score_trend
+from .assessments import assign_assessments, submit_assessments
+from .visibility import inbox_summary
+from .exporters import EXPORT_FORMATS, EXPORTS, stream_export
+from .reports import COMPANY_SCOPE, submit_report
+from .renderers import REPORT_FORMATS
+from .importers import IMPORT_MODES, RelationImporter, detect_upload_format, iter_chunks, iter_upload_rows
 from .serializers import (
     DepartmentSerializer, EmployeeSerializer, ProjectSerializer,
-    EmployeeRelationSerializer, EmployeeRelationUpdateSerializer
+    EmployeeRelationSerializer, EmployeeRelationUpdateSerializer, RelationRoleChangeSerializer,
+    AssessmentSerializer, AssessmentBatchSerializer, PerformanceAlertSerializer, ReportJobSerializer
 )
 
+def iterate_in_thread(iterator):
+    """将同步迭代器转为异步迭代器，每块内容在请求的同步线程中生成
+
+    生成器内的数据库操作（包括跨多块的事务）始终使用同一线程的数据库连接，提前结束时同样在该线程中关闭。
+    """
+    async def chunks():
+        try:
+            while True:
+                chunk = await sync_to_async(next, thread_sensitive=True)(iterator, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            if hasattr(iterator, 'close'):
+                await sync_to_async(iterator.close, thread_sensitive=True)()
+    return chunks()
+
+
+def streaming_response(request, content, **kwargs):
+    """流式响应：ASGI 下同步迭代器会被整体读入内存后才输出，因此改用异步迭代器逐块输出"""
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        content = iterate_in_thread(iter(content))
+    return StreamingHttpResponse(content, **kwargs)
+
+
 # 员工信息管理
-class EmployeeListCreateView(generics.ListCreateAPIView):
+class EmployeeListCreateView(SerializerTimingMixin, generics.ListCreateAPIView):
     """员工列表和创建视图"""
-    queryset = Employee.objects.all()
+    queryset = Employee.objects.select_related('department')
     serializer_class = EmployeeSerializer
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = ('department_id', 'name', 'id')
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['department', 'role']
     search_fields = ['name', 'job_type', 'position']
     ordering_fields = ['name', 'department', 'created_at']
 
-class EmployeeDetailView(generics.RetrieveUpdateDestroyAPIView):
+class EmployeeDetailView(SerializerTimingMixin, generics.RetrieveUpdateDestroyAPIView):
     """员工详情、更新和删除视图"""
-    queryset = Employee.objects.all()
+    queryset = Employee.objects.select_related('department')
     serializer_class = EmployeeSerializer
 
 # 考核指标管理
-class IndicatorListCreateView(generics.ListCreateAPIView):
+class IndicatorListCreateView(SerializerTimingMixin, generics.ListCreateAPIView):
     """考核指标列表和创建视图"""
     # 待实现
     pass
 
-class IndicatorDetailView(generics.RetrieveUpdateDestroyAPIView):
+class IndicatorDetailView(SerializerTimingMixin, generics.RetrieveUpdateDestroyAPIView):
     """考核指标详情、更新和删除视图"""
     # 待实现
     pass
 
-class IndicatorTemplateListCreateView(generics.ListCreateAPIView):
+class IndicatorTemplateListCreateView(SerializerTimingMixin, generics.ListCreateAPIView):
     """指标模板列表和创建视图"""
     # 待实现
     pass
 
-class IndicatorTemplateDetailView(generics.RetrieveUpdateDestroyAPIView):
+class IndicatorTemplateDetailView(SerializerTimingMixin, generics.RetrieveUpdateDestroyAPIView):
     """指标模板详情、更新和删除视图"""
     # 待实现
     pass
 
 # 项目建设人员关系管理
-class RelationListCreateView(generics.ListCreateAPIView):
+class RelationListCreateView(SerializerTimingMixin, generics.ListCreateAPIView):
     """人员关系列表和创建视图"""
-    queryset = EmployeeRelation.objects.all()
+    # 员工姓名随关系一起查询，避免逐行查询员工
+    queryset = EmployeeRelation.objects.select_related('employee')
     serializer_class = EmployeeRelationSerializer
+    pagination_class = OptionalKeysetPagination
+    # 游标分页按 (date, employee) 索引的顺序排列；按员工姓名排序无法走索引，只用于页码分页
+    keyset_ordering = ('date', 'employee_id', 'id')
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['date', 'employee', 'role']
     search_fields = ['employee__name', 'leaders', 'project_names']
@@ -64,9 +118,9 @@ class RelationListCreateView(generics.ListCreateAPIView):
             queryset = queryset.filter(date=date)
         return queryset
 
-class RelationDetailView(generics.RetrieveUpdateDestroyAPIView):
+class RelationDetailView(SerializerTimingMixin, generics.RetrieveUpdateDestroyAPIView):
     """人员关系详情、更新和删除视图"""
-    queryset = EmployeeRelation.objects.all()
+    queryset = EmployeeRelation.objects.select_related('employee')
     serializer_class = EmployeeRelationSerializer
     
     def get_serializer_class(self):
@@ -90,46 +144,66 @@ class RelationDetailView(generics.RetrieveUpdateDestroyAPIView):
         new_role = serializer.validated_data.get('role', original_role)
         new_leaders = serializer.validated_data.get('leaders', original_leaders)
         
-        # 更新当前实例
+        # 更新当前实例，变为自由人时 save() 会清空项目负责人
         self.perform_update(serializer)
         
-        # 如果角色发生变化，需要处理相关数据
-        if original_role != new_role:
-            employee_name = instance.employee.name
-            
-            # 如果从项目负责人变为其他角色，需要处理其他员工的关系
-            if original_role == 'project_leader':
-                # 获取所有以该员工为项目负责人的关系
-                affected_relations = EmployeeRelation.objects.filter(
-                    date=instance.date,
-                    leaders__contains=employee_name
-                ).exclude(employee=instance.employee)
-                
-                # 更新这些关系
-                for relation in affected_relations:
-                    # 从 leaders 字段中移除该员工姓名
-                    leader_names = relation.leaders.split(',')
-                    if employee_name in leader_names:
-                        leader_names.remove(employee_name)
-                    
-                    relation.leaders = ','.join(leader_names)
-                    
-                    # 如果移除后没有项目负责人，则将角色设置为自由人
-                    if not relation.leaders and relation.role != 'free_person':
-                        relation.role = 'free_person'
-                    
-                    relation.save()
-            
-            # 如果变为自由人，清空项目负责人
-            if new_role == 'free_person':
-                instance.leaders = ""
-                instance.leader_count = 0
-                instance.save(update_fields=['leaders', 'leader_count'])
+        # 如果从项目负责人变为其他角色，批量更新以该员工为项目负责人的其他关系
+        if original_role == 'project_leader' and new_role != original_role:
+            remove_leaders(instance.date, [instance.employee_id])
         
-        return Response(EmployeeRelationSerializer(instance).data)
+        return Response(serialized(EmployeeRelationSerializer(instance)))
+
+class RelationRoleBatchUpdateView(SerializerTimingMixin, views.APIView):
+    """批量变更人员角色
 
-class RelationBulkImportView(views.APIView):
-    """批量导入人员关系数据"""
+    请求格式：{"changes": [{"id": 1, "role": "project_member"}, ...]}，
+    全部校验通过后一次写回，并批量级联更新降级负责人的组员关系。
+    """
+    
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        changes = request.data.get('changes') if isinstance(request.data, dict) else None
+        serializer = RelationRoleChangeSerializer(data=changes, many=True)
+        serializer.is_valid(raise_exception=True)
+        changes = serializer.validated_data
+        
+        if not changes:
+            return Response(
+                {"error": "缺少必要参数"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        relations = EmployeeRelation.objects.select_for_update().in_bulk(
+            [change['id'] for change in changes]
+        )
+        
+        errors = []
+        pairs = []
+        for change in changes:
+            relation = relations.get(change['id'])
+            if relation is None:
+                errors.append(f"人员关系 {change['id']} 不存在")
+            elif ROLE_LEVELS[change['role']] > ROLE_LEVELS.get(relation.role, 0):
+                errors.append(f"人员关系 {change['id']} 角色只能由高向低变更")
+            else:
+                pairs.append((relation, change['role']))
+        
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+        
+        updated_count, cascaded_count = change_roles(pairs)
+        
+        return Response({
+            "success": True,
+            "updated_count": updated_count,
+            "cascaded_count": cascaded_count
+        })
+
+class RelationBulkImportView(SerializerTimingMixin, views.APIView):
+    """批量导入人员关系数据
+
+    mode=replace（默认）清除该日期的数据后重新导入；mode=diff 只写入有变化的记录。
+    """
     
     @transaction.atomic
     def post(self, request, *args, **kwargs):
@@ -143,108 +217,488 @@ class RelationBulkImportView(views.APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # 清除该日期的现有数据
-        EmployeeRelation.objects.filter(date=date).delete()
-        
-        created_relations = []
-        errors = []
+        mode = data.get('mode', 'replace')
+        if mode not in IMPORT_MODES:
+            return Response(
+                {"error": "不支持的导入模式"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        for relation_data in relations:
-            try:
-                # 获取员工
-                employee_name = relation_data.get('employee_name')
-                employee = Employee.objects.filter(name=employee_name).first()
-                if not employee:
-                    # 如果员工不存在，返回错误
-                    errors.append(f"员工 {employee_name} 不存在")
-                    continue
-                
-                # 获取项目负责人姓名列表
-                leader_names = relation_data.get('leader_names', [])
-                leaders_str = ','.join(leader_names) if leader_names else ""
-                
-                # 确定角色
-                role = relation_data.get('role', 'free_person')
-                if not leader_names and role != 'free_person':
-                    role = 'free_person'
-                
-                # 创建关系
-                relation = EmployeeRelation.objects.create(
-                    date=date,
-                    employee=employee,
-                    leaders=leaders_str,
-                    project_names=relation_data.get('project_names', []),
-                    role=role,
-                    attributes=relation_data.get('attributes', [])
-                )
-                
-                created_relations.append(relation)
-            
-            except Exception as e:
-                errors.append(str(e))
+        importer = RelationImporter(date, mode=mode)
+        importer.start()
+        importer.import_rows(relations)
+        importer.finish()
         
         return Response({
             "success": True,
-            "created_count": len(created_relations),
-            "errors": errors
+            **importer.summary(),
+            "errors": importer.errors
         })
 
-class RelationStatisticsView(views.APIView):
-    """人员关系统计视图"""
+class RelationUploadImportView(SerializerTimingMixin, views.APIView):
+    """上传文件流式导入人员关系数据（CSV/XLSX/NDJSON）
+
+    文件逐行解析、分块校验写入，每处理完一块输出一行NDJSON进度信息，最后一行为导入结果。
+    每块在各自的事务中写入并提交后才输出进度，客户端读取缓慢时不会一直持有行锁；
+    因此导入不是整体原子的：中途失败时之前的块已经写入（replace 模式的清除同样已提交），可重新上传覆盖。
+    """
+    parser_classes = [MultiPartParser]
+    max_chunk_size = 5000
+    
+    def post(self, request, *args, **kwargs):
+        date = request.data.get('date')
+        upload = request.FILES.get('file')
+        
+        if not date or not upload:
+            return Response(
+                {"error": "缺少必要参数"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        fmt = detect_upload_format(upload, request.data.get('format'))
+        if not fmt:
+            return Response(
+                {"error": "不支持的文件格式，仅支持 CSV、XLSX、NDJSON"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        mode = request.data.get('mode', 'replace')
+        if mode not in IMPORT_MODES:
+            return Response(
+                {"error": "不支持的导入模式"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            chunk_size = min(int(request.data.get('chunk_size', 1000)), self.max_chunk_size)
+        except ValueError:
+            chunk_size = 0
+        if chunk_size <= 0:
+            return Response(
+                {"error": "chunk_size 参数无效"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return streaming_response(
+            request,
+            self.stream_import(date, upload, fmt, mode, chunk_size),
+            content_type='application/x-ndjson'
+        )
+    
+    def stream_import(self, date, upload, fmt, mode, chunk_size):
+        importer = RelationImporter(date, mode=mode, batch_size=chunk_size)
+        processed = 0
+        
+        try:
+            with transaction.atomic():
+                importer.start()
+            
+            for chunk in iter_chunks(iter_upload_rows(upload, fmt), chunk_size):
+                with transaction.atomic():
+                    importer.import_rows(chunk)
+                processed += len(chunk)
+                # 已输出的错误信息不再保留，内存占用与文件大小无关
+                yield json.dumps({
+                    "processed_count": processed,
+                    "created_count": importer.created_count,
+                    "updated_count": importer.updated_count,
+                    "errors": importer.take_errors()
+                }, ensure_ascii=False) + "\n"
+            
+            with transaction.atomic():
+                importer.finish()
+        except Exception as e:
+            importer.abort()
+            yield json.dumps({
+                "success": False,
+                "error": str(e),
+                "processed_count": processed,
+                **importer.summary()
+            }, ensure_ascii=False) + "\n"
+            return
+        
+        yield json.dumps({
+            "success": True,
+            "processed_count": processed,
+            **importer.summary(),
+            "error_count": importer.error_count
+        }, ensure_ascii=False) + "\n"
+
+class RelationStatisticsView(SerializerTimingMixin, views.APIView):
+    """人员关系统计视图
+
+    date=YYYYMM 返回单月统计；dates=YYYYMM,YYYYMM 或 start=YYYYMM&end=YYYYMM 返回按月的统计序列。
+    """
+    max_months = 120
     
     def get(self, request, *args, **kwargs):
         date = request.query_params.get('date')
+        dates = request.query_params.get('dates')
+        start = request.query_params.get('start')
+        end = request.query_params.get('end')
         
-        if not date:
+        if date:
+            months = [date]
+        elif dates:
+            months = sorted({item.strip() for item in dates.split(',') if item.strip()})
+            if not months:
+                return Response(
+                    {"error": "缺少日期参数"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        elif start and end and is_period(start) and is_period(end):
+            months = month_range(start, end)
+        else:
             return Response(
                 {"error": "缺少日期参数"},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # 获取统计数据
-        project_leader_count = EmployeeRelation.objects.filter(
-            date=date, role='project_leader'
-        ).count()
+        if not date and not all(is_period(month) for month in months):
+            return Response(
+                {"error": "日期格式应为 YYYYMM"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(months) > self.max_months:
+            return Response(
+                {"error": f"最多统计 {self.max_months} 个月"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        project_member_count = EmployeeRelation.objects.filter(
-            date=date, role='project_member'
-        ).count()
+        series = relation_statistics(months)
+        if date:
+            return Response(series[0])
+        return Response({"series": series})
+
+# 考核流程管理
+class AssessmentListCreateView(SerializerTimingMixin, generics.ListCreateAPIView):
+    """考核列表和创建视图
+
+    POST 单条考核数据创建一条考核；
+    POST {"evaluator": 1, "period": "YYYYMM", "assessments": [{"employee", "scores", "comment"}, ...]}
+    批量提交同一评价人的评分表，全部校验通过后一次写入，已提交过的评分表覆盖更新。
+    """
+    queryset = Assessment.objects.select_related('employee', 'evaluator')
+    serializer_class = AssessmentSerializer
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = ('-period', 'id')
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['period', 'employee', 'evaluator', 'status']
+    search_fields = ['employee__name', 'evaluator__name']
+    ordering_fields = ['period', 'employee__name', 'total_score']
+    
+    def create(self, request, *args, **kwargs):
+        if isinstance(request.data, dict) and 'assessments' in request.data:
+            return self.create_batch(request)
+        return super().create(request, *args, **kwargs)
+    
+    @transaction.atomic
+    def create_batch(self, request):
+        serializer = AssessmentBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
         
-        free_person_count = EmployeeRelation.objects.filter(
-            date=date, role='free_person'
-        ).count()
+        assessments, errors = submit_assessments(data['evaluator'], data['period'], data['assessments'])
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
-            "date": date,
-            "project_leader_count": project_leader_count,
-            "project_member_count": project_member_count,
-            "free_person_count": free_person_count,
-            "total_count": project_leader_count + project_member_count + free_person_count
-        })
-
-# 考核流程管理
-class AssessmentListCreateView(generics.ListCreateAPIView):
-    """考核列表和创建视图"""
-    # 待实现
-    pass
+            "success": True,
+            "saved_count": len(assessments),
+            "total_scores": {
+                assessment.employee_id: assessment.total_score for assessment in assessments
+            }
+        }, status=status.HTTP_201_CREATED)
 
-class AssessmentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class AssessmentDetailView(SerializerTimingMixin, generics.RetrieveUpdateDestroyAPIView):
     """考核详情、更新和删除视图"""
-    # 待实现
-    pass
+    queryset = Assessment.objects.select_related('employee__department', 'evaluator')
+    serializer_class = AssessmentSerializer
 
-class AssignAssessmentView(views.APIView):
-    """考核任务分配视图"""
-    # 待实现
-    pass
+class AssignAssessmentView(SerializerTimingMixin, views.APIView):
+    """考核任务分配视图
+
+    按考核周期的人员关系批量生成待评价的考核任务，可重复执行，只补充缺少的任务。
+    """
+    
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        period = request.data.get('period')
+        if not period or not is_period(period):
+            return Response(
+                {"error": "考核周期格式应为 YYYYMM"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        task_count, created_count = assign_assessments(period)
+        
+        return Response({
+            "success": True,
+            "task_count": task_count,
+            "created_count": created_count
+        })
+
+class EvaluatorInboxView(SerializerTimingMixin, views.APIView):
+    """评价人待办列表视图
+
+    period=YYYYMM&evaluator=员工ID，返回评价人可见（需要打分）的人员、人员角色及考核状态，
+    由预先计算的可见人员索引读取；该周期尚未建立索引时先整体计算一次。
+    """
+    
+    def get(self, request, *args, **kwargs):
+        period = request.query_params.get('period')
+        evaluator = request.query_params.get('evaluator')
+        if not period or not is_period(period) or not evaluator or not evaluator.isdigit():
+            return Response(
+                {"error": "缺少必要参数"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(inbox_summary(period, int(evaluator)))
 
 # 绩效结果查询和统计
-class StatisticsView(views.APIView):
-    """统计分析视图"""
-    # 待实现
-    pass
+class StatisticsView(SerializerTimingMixin, views.APIView):
+    """统计分析视图
 
-class ReportGenerationView(views.APIView):
-    """报告生成视图"""
-    # 待实现
-    pass
+    period=YYYYMM 返回该周期的得分分布、百分位数、各部门均值/标准差及前后 N 名，在服务端汇总，
+    不再把全部人员下发到前端统计。可选参数：source=final|assessment，department=部门ID，
+    buckets=40,50,60,70,80,90（分段边界），percentiles=25,50,75,90，top=10。
+    """
+    max_buckets = 20
+    max_top = 100
+    
+    def get(self, request, *args, **kwargs):
+        options, error = self.parse_params(request.query_params)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(score_statistics(**options))
+    
+    @classmethod
+    def parse_params(cls, params):
+        """解析并校验查询参数，返回 (score_statistics 的参数, 错误信息)"""
+        period = params.get('period')
+        source = params.get('source', 'final')
+        if not is_period(period):
+            return None, "考核周期格式应为 YYYYMM"
+        if source not in SCORE_SOURCES:
+            return None, "不支持的得分来源"
+        
+        try:
+            edges = cls.parse_numbers(params.get('buckets'), SCORE_BUCKETS)
+            percentiles = cls.parse_numbers(params.get('percentiles'), SCORE_PERCENTILES)
+            top_n = int(params.get('top', 10))
+            department = int(params['department']) if params.get('department') else None
+        except ValueError:
+            return None, "参数格式错误"
+        
+        if (not edges or len(edges) > cls.max_buckets
+                or any(low >= high for low, high in zip(edges, edges[1:]))):
+            return None, f"分段边界应递增且不超过 {cls.max_buckets} 个"
+        if not all(0 <= p <= 100 for p in percentiles) or not 0 <= top_n <= cls.max_top:
+            return None, f"百分位数应在 0~100 之间，前后名次数不超过 {cls.max_top}"
+        
+        return {
+            "period": period, "source": source, "edges": edges, "percentiles": percentiles,
+            "top_n": top_n, "department": department,
+        }, None
+    
+    @staticmethod
+    def parse_numbers(value, default):
+        """解析逗号分隔的数字列表，整数保持为整数"""
+        if not value:
+            return list(default)
+        numbers = [float(item) for item in value.split(',') if item.strip()]
+        if not all(math.isfinite(number) for number in numbers):
+            raise ValueError(value)
+        return [int(number) if number.is_integer() else number for number in numbers]
+
+class StatisticsSummaryView(SerializerTimingMixin, views.APIView):
+    """按月份的得分汇总序列视图
+
+    start=YYYYMM&end=YYYYMM（可选 department=部门ID）返回各月份总体及各部门的人数、均值、标准差、
+    得分分布及各角色人数，由部门得分汇总表读取，不扫描最终得分明细。
+    """
+    max_months = 120
+    
+    def get(self, request, *args, **kwargs):
+        start = request.query_params.get('start')
+        end = request.query_params.get('end')
+        department = request.query_params.get('department')
+        if not is_period(start) or not is_period(end) or (department and not department.isdigit()):
+            return Response(
+                {"error": "缺少日期参数"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        months = month_range(start, end)
+        if len(months) > self.max_months:
+            return Response(
+                {"error": f"最多统计 {self.max_months} 个月"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response({"series": period_summary(months, department=department and int(department))})
+
+class TrendView(SerializerTimingMixin, views.APIView):
+    """绩效趋势视图
+
+    start=YYYYMM&end=YYYYMM 返回各月份平均分，以及每人的得分、移动平均、环比变化和排名变化。
+    可选参数：employees=员工ID,员工ID，department=部门ID，window=移动平均月数（默认3）。
+    """
+    max_months = 36
+    max_window = 12
+    
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        start = params.get('start')
+        end = params.get('end')
+        if not is_period(start) or not is_period(end):
+            return Response(
+                {"error": "缺少日期参数"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        months = month_range(start, end)
+        if not months or len(months) > self.max_months:
+            return Response(
+                {"error": f"最多分析 {self.max_months} 个月"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            window = int(params.get('window', 3))
+            employee_ids = [int(item) for item in params.get('employees', '').split(',') if item.strip()]
+            department = int(params['department']) if params.get('department') else None
+        except ValueError:
+            return Response(
+                {"error": "参数格式错误"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 1 <= window <= self.max_window:
+            return Response(
+                {"error": f"移动平均月数应在 1~{self.max_window} 之间"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(score_trend(months, employee_ids=employee_ids, department=department, window=window))
+
+class AlertListView(SerializerTimingMixin, generics.ListAPIView):
+    """绩效预警列表视图，预警在计算最终得分后自动生成"""
+    queryset = PerformanceAlert.objects.select_related('employee__department')
+    serializer_class = PerformanceAlertSerializer
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = ('-period', 'id')
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['period', 'rule', 'employee', 'employee__department', 'acknowledged']
+    search_fields = ['employee__name']
+    ordering_fields = ['period', 'score', 'employee__name']
+
+class AlertDetailView(SerializerTimingMixin, generics.RetrieveUpdateAPIView):
+    """绩效预警详情视图，可标记为已处理"""
+    queryset = PerformanceAlert.objects.select_related('employee__department')
+    serializer_class = PerformanceAlertSerializer
+
+class ReportGenerationView(SerializerTimingMixin, views.APIView):
+    """报告生成视图
+
+    POST {period, scope, format} 登记报告生成任务后立即返回（202），报告由后台进程生成；
+    相同周期、范围、格式且得分未变化时直接返回已有任务（cached 为 true）。GET 返回最近的任务。
+    """
+    
+    def get(self, request, *args, **kwargs):
+        queryset = ReportJob.objects.all()
+        period = request.query_params.get('period')
+        if period:
+            queryset = queryset.filter(period=period)
+        return Response(serialized(ReportJobSerializer(queryset[:50], many=True)))
+    
+    def post(self, request, *args, **kwargs):
+        serializer = ReportJobSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job, cached = submit_report(
+            serializer.validated_data['period'],
+            serializer.validated_data.get('scope', COMPANY_SCOPE),
+            serializer.validated_data['format'],
+        )
+        return Response(
+            {**serialized(ReportJobSerializer(job)), "cached": cached},
+            status=status.HTTP_200_OK if job.status == 'completed' else status.HTTP_202_ACCEPTED
+        )
+
+class ReportJobDetailView(SerializerTimingMixin, generics.RetrieveAPIView):
+    """报告生成任务状态视图"""
+    queryset = ReportJob.objects.all()
+    serializer_class = ReportJobSerializer
+
+class ReportDownloadView(SerializerTimingMixin, views.APIView):
+    """报告下载视图"""
+    
+    def get(self, request, pk, *args, **kwargs):
+        job = get_object_or_404(ReportJob, pk=pk)
+        if job.status != 'completed' or not job.file:
+            return Response(
+                {"error": f"报告尚未生成（{job.get_status_display()}）"},
+                status=status.HTTP_409_CONFLICT
+            )
+        name = os.path.basename(job.file.name)
+        content_type = 'application/zip' if name.endswith('.zip') else REPORT_FORMATS[job.format]
+        return FileResponse(job.file.open('rb'), as_attachment=True, filename=name, content_type=content_type)
+
+# 数据导出
+class PeriodExportView(SerializerTimingMixin, views.APIView):
+    """考核周期数据流式导出视图
+
+    period=YYYYMM（可选 department=部门ID，file_format=csv/xlsx/ndjson，默认 csv），
+    数据分批读取边读边输出，评分表的 scores 按项点序号展开为独立的列。
+    format 参数已被 DRF 用于选择响应格式，这里使用 file_format。
+    """
+    export = None
+    max_chunk_size = 10000
+    
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        period = params.get('period')
+        department = params.get('department')
+        fmt = params.get('file_format', 'csv')
+        if not is_period(period) or (department and not department.isdigit()):
+            return Response(
+                {"error": "考核周期格式应为 YYYYMM"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if fmt not in EXPORT_FORMATS:
+            return Response(
+                {"error": "不支持的导出格式，仅支持 CSV、XLSX、NDJSON"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            chunk_size = min(int(params.get('chunk_size', 2000)), self.max_chunk_size)
+        except ValueError:
+            chunk_size = 0
+        if chunk_size <= 0:
+            return Response(
+                {"error": "chunk_size 参数无效"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        export = EXPORTS[self.export](period, department=department and int(department), chunk_size=chunk_size)
+        response = streaming_response(request, stream_export(export, fmt), content_type=EXPORT_FORMATS[fmt])
+        response['Content-Disposition'] = f'attachment; filename="{export.filename(fmt)}"'
+        return response
+
+# 运维
+class CacheStatsView(SerializerTimingMixin, views.APIView):
+    """读穿透缓存命中统计视图"""
+    
+    def get(self, request, *args, **kwargs):
+        return Response(cache_stats())
+
+class RequestMetricsView(SerializerTimingMixin, views.APIView):
+    """请求耗时统计视图：按视图汇总的耗时分布、平均 SQL 条数及耗时、序列化耗时和响应大小，DELETE 清空"""
+    
+    def get(self, request, *args, **kwargs):
+        return Response(request_metrics())
+    
+    def delete(self, request, *args, **kwargs):
+        reset_request_metrics()
+        return Response(status=status.HTTP_204_NO_CONTENT)
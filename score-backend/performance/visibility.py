@@ -0,0 +1,192 @@
+"""评价人可见人员索引
+
+部门负责人可见所有人员，项目负责人可见自己及项目组员，组员只可见自己，
+可见人员即评价人需要打分的人员。按考核周期预先计算每个评价人的可见人员，
+以 [[员工ID, 人员角色], ...] 紧凑保存在 VisibilityIndex 中，打开评分页面时按 (period, evaluator) 读取一行。
+考核任务分配、关系导入时整体计算；单条人员关系或部门负责人变更后在事务提交时
+只重新计算涉及的 (评价人, 被考核员工) 组合，只写回发生变化的行。
+"""
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.utils import timezone
+
+from .models import Assessment, Employee, RelationLeader, VisibilityIndex
+from .relations import relation_snapshots
+from .transactions import on_commit_merge
+
+
+def evaluation_pairs(period, employee_ids=None, evaluator_ids=None):
+    """按人员关系展开考核周期内的 (评价人ID, 被考核员工ID)
+
+    部门负责人评价所有人员，项目负责人评价组员及自己，所有人员自评；部门负责人本身不参与考核。
+    指定 employee_ids / evaluator_ids 时只返回涉及这些被考核员工或评价人的组合。
+    """
+    partial = employee_ids is not None or evaluator_ids is not None
+    employee_ids = set(employee_ids or ())
+    evaluator_ids = set(evaluator_ids or ())
+
+    employees = [
+        relation['employee_id'] for relation in relation_snapshots.get(period)
+        if relation['employee_role'] != 'department_leader'
+    ]
+    affected = employees
+    if partial:
+        affected = [employee_id for employee_id in employees if employee_id in employee_ids]
+    pairs = {
+        (employee_id, employee_id) for employee_id in employees
+        if not partial or employee_id in employee_ids or employee_id in evaluator_ids
+    }
+
+    links = RelationLeader.objects.filter(relation__date=period).exclude(
+        relation__employee__role='department_leader'
+    )
+    if partial:
+        links = links.filter(Q(relation__employee_id__in=employee_ids) | Q(leader_id__in=evaluator_ids))
+    pairs.update(links.values_list('leader_id', 'relation__employee_id'))
+
+    for leader_id in Employee.objects.filter(role='department_leader').values_list('id', flat=True):
+        targets = employees if leader_id in evaluator_ids else affected
+        pairs.update((leader_id, employee_id) for employee_id in targets)
+    return pairs
+
+
+def visibility_entries(period, pairs=None, kept=None):
+    """计算考核周期内每个评价人的可见人员，返回 {评价人ID: [[员工ID, 人员角色], ...]}，按员工姓名排序
+
+    kept 为保留不变的已有可见人员，与 pairs 合并。
+    """
+    if pairs is None:
+        pairs = evaluation_pairs(period)
+    # 关系快照已按员工姓名排序，角色用于前端区分项目负责人、项目组员及自由人
+    order = {}
+    roles = {}
+    for position, relation in enumerate(relation_snapshots.get(period)):
+        order[relation['employee_id']] = position
+        roles[relation['employee_id']] = relation['role']
+
+    entries = {evaluator_id: list(employees) for evaluator_id, employees in (kept or {}).items() if employees}
+    for evaluator_id, employee_id in pairs:
+        entries.setdefault(evaluator_id, []).append([employee_id, roles[employee_id]])
+    for employees in entries.values():
+        employees.sort(key=lambda entry: order.get(entry[0], len(order)))
+    return entries
+
+
+def refresh_visibility(period, pairs=None, employee_ids=None, evaluator_ids=None, batch_size=1000):
+    """刷新考核周期的可见人员索引，只写回发生变化的行
+
+    默认按人员关系整体计算；指定 employee_ids / evaluator_ids 时只重新计算涉及这些被考核员工或评价人的组合
+    （pairs 为这些组合，不传时计算），其余可见人员保持不变；该周期尚未建立索引时仍整体计算。
+    返回 (新增行数, 更新行数, 删除行数)。
+    """
+    partial = employee_ids is not None or evaluator_ids is not None
+    employee_ids = set(employee_ids or ())
+    evaluator_ids = set(evaluator_ids or ())
+
+    rows = VisibilityIndex.objects.filter(period=period)
+    if partial and not employee_ids:
+        # 只涉及评价人时只读取这些评价人的行，被考核员工变化时所有评价人的行都可能包含该员工
+        rows = rows.filter(evaluator_id__in=evaluator_ids)
+    existing = {row.evaluator_id: row for row in rows}
+    if partial and not existing and not VisibilityIndex.objects.filter(period=period).exists():
+        partial = False
+        pairs = None
+
+    kept = None
+    if partial:
+        if pairs is None:
+            pairs = evaluation_pairs(period, employee_ids, evaluator_ids)
+        kept = {
+            evaluator_id: [
+                entry for entry in row.employees
+                if evaluator_id not in evaluator_ids and entry[0] not in employee_ids
+            ]
+            for evaluator_id, row in existing.items()
+        }
+    entries = visibility_entries(period, pairs, kept)
+
+    now = timezone.now()
+    created = []
+    changed = []
+    for evaluator_id, employees in entries.items():
+        row = existing.pop(evaluator_id, None)
+        if row is None:
+            created.append(VisibilityIndex(period=period, evaluator_id=evaluator_id, employees=employees))
+        elif row.employees != employees:
+            row.employees = employees
+            row.updated_at = now
+            changed.append(row)
+
+    VisibilityIndex.objects.bulk_create(created, batch_size=batch_size)
+    VisibilityIndex.objects.bulk_update(changed, ['employees', 'updated_at'], batch_size=batch_size)
+    stale = [row.id for row in existing.values()]
+    if stale:
+        VisibilityIndex.objects.filter(id__in=stale).delete()
+    return len(created), len(changed), len(stale)
+
+
+def schedule_visibility_refresh(period, employee_ids=None, evaluator_ids=None):
+    """事务提交后刷新可见人员索引，同一事务内多次变更同一周期合并后只刷新一次
+
+    employee_ids / evaluator_ids 为变更涉及的被考核员工、评价人，只重新计算涉及的组合；都不指定时整体刷新。
+    """
+    items = None
+    if employee_ids is not None or evaluator_ids is not None:
+        items = {'employee_ids': employee_ids or (), 'evaluator_ids': evaluator_ids or ()}
+    on_commit_merge(
+        ('visibility', period), lambda items: refresh_visibility(period, **(items or {})), items
+    )
+
+
+def evaluator_inbox(period, evaluator_id):
+    """评价人待办列表：一次读取可见人员索引，一次读取人员姓名及考核状态
+
+    索引不存在时返回 None。
+    """
+    employees = VisibilityIndex.objects.filter(
+        period=period, evaluator_id=evaluator_id
+    ).values_list('employees', flat=True).first()
+    if employees is None:
+        return None
+
+    assessments = Assessment.objects.filter(
+        period=period, evaluator_id=evaluator_id, employee_id=OuterRef('pk')
+    )
+    details = {
+        row['id']: row
+        for row in Employee.objects.filter(id__in=[employee_id for employee_id, _ in employees]).values(
+            'id', 'name',
+            status=Subquery(assessments.values('status')[:1]),
+            total_score=Subquery(assessments.values('total_score')[:1]),
+        )
+    }
+
+    inbox = []
+    for employee_id, role in employees:
+        detail = details.get(employee_id)
+        if detail is None:
+            continue
+        inbox.append({
+            "employee": employee_id,
+            "employee_name": detail['name'],
+            "role": role,
+            "status": detail['status'] or 'pending',
+            "total_score": detail['total_score'],
+        })
+    return inbox
+
+
+def inbox_summary(period, evaluator_id):
+    """评价人待办列表及待评价人数，该周期尚未建立索引时先整体计算一次"""
+    inbox = evaluator_inbox(period, evaluator_id)
+    if inbox is None and not VisibilityIndex.objects.filter(period=period).exists():
+        with transaction.atomic():
+            refresh_visibility(period)
+        inbox = evaluator_inbox(period, evaluator_id)
+    inbox = inbox or []
+    return {
+        "period": period,
+        "evaluator": evaluator_id,
+        "pending_count": sum(1 for item in inbox if item["status"] != 'completed'),
+        "employees": inbox,
+    }
@@ -0,0 +1,85 @@
+"""数据库连接池
+
+进程内共享的空闲连接池，与具体数据库驱动无关：连接对象只需提供 rollback()、close() 及 ping()
+（MySQLdb 的连接对象均已提供）。
+"""
+import queue
+import threading
+import time
+
+
+class ConnectionPool:
+    """空闲连接池
+
+    acquire() 优先复用最近归还的空闲连接，空闲超过 recycle 秒的连接关闭后重新建立，
+    避免使用已被数据库服务端（wait_timeout）断开的连接；ping 为真时取出前再 ping() 一次，
+    数据库重启、网络中断等空闲期间断开的连接同样丢弃。release() 回滚未提交的事务后放回，
+    空闲连接已达 size 个时直接关闭。
+    """
+
+    def __init__(self, size=10, recycle=300, ping=True):
+        self.size = size
+        self.recycle = recycle
+        self.ping = ping
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, connect):
+        """取出一个连接，没有可用的空闲连接时调用 connect() 新建"""
+        while True:
+            try:
+                connection, released_at = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if time.monotonic() - released_at < self.recycle and self.alive(connection):
+                with self._lock:
+                    self.reused += 1
+                return connection
+            self.discard(connection)
+
+        connection = connect()
+        with self._lock:
+            self.created += 1
+        return connection
+
+    def release(self, connection):
+        """归还连接"""
+        try:
+            connection.rollback()
+        except Exception:
+            self.discard(connection)
+            return
+        if self._idle.qsize() >= self.size:
+            self.discard(connection)
+            return
+        self._idle.put((connection, time.monotonic()))
+
+    def alive(self, connection):
+        if not self.ping:
+            return True
+        try:
+            connection.ping()
+        except Exception:
+            return False
+        return True
+
+    @staticmethod
+    def discard(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def clear(self):
+        """关闭全部空闲连接"""
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self.discard(connection)
+
+    def stats(self):
+        return {"idle": self._idle.qsize(), "created": self.created, "reused": self.reused}
@@ -30,6 +30,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'performance.instrumentation.RequestMetricsMiddleware',  # 请求耗时统计，放在最前面
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS中间件
@@ -69,20 +70,51 @@ TEMPLATES = [
 WSGI_APPLICATION = 'score_system.wsgi.application'
 
 # Database
+# 连接复用：DB_CONN_MAX_AGE 为连接保持时间（秒，0 为每个请求新建连接），
+# DB_CONN_HEALTH_CHECKS 开启时复用前先检查连接是否可用，数据库重启或连接超时断开后自动重连。
+# ASGI 部署时持久连接按线程保存无法复用，应设置 DB_POOL_SIZE 使用连接池（此时 CONN_MAX_AGE 固定为 0），
+# 空闲超过 DB_POOL_RECYCLE 秒的连接重新建立，应小于 MySQL 的 wait_timeout；
+# DB_POOL_PING 开启时取出空闲连接前先 ping 一次，已断开的连接重新建立。
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 0))
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'score_system.mysql_pool' if DB_POOL_SIZE else 'django.db.backends.mysql',
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('DB_USER'),
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
         'PORT': os.getenv('DB_PORT'),
+        'CONN_MAX_AGE': 0 if DB_POOL_SIZE else int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'true').lower() in ('true', '1', 'yes'),
+        'POOL': {
+            'size': DB_POOL_SIZE,
+            'recycle': int(os.getenv('DB_POOL_RECYCLE', 300)),
+            'ping': os.getenv('DB_POOL_PING', 'true').lower() in ('true', '1', 'yes'),
+        },
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 10)),
         },
     }
 }
 
+# Cache
+# 配置 REDIS_URL 时使用 Redis，多进程部署共享缓存；否则使用进程内缓存
+REDIS_URL = os.getenv('REDIS_URL')
+CACHE_BACKEND = {
+    'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+    'LOCATION': REDIS_URL,
+} if REDIS_URL else {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}
+CACHES = {
+    'default': CACHE_BACKEND,
+    # 考核指标、人员关系快照等读穿透缓存（performance.cache）
+    'performance': {**CACHE_BACKEND, 'KEY_PREFIX': 'performance'},
+}
+# 读穿透缓存过期时间（秒），数据变更时会主动失效
+PERFORMANCE_CACHE_TIMEOUT = int(os.getenv('PERFORMANCE_CACHE_TIMEOUT', 86400))
+
 # REST Framework 配置
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
@@ -96,6 +128,20 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
 }
 
+# 考核计分配置
+# 部门负责人打分人数X，未配置时按员工所在部门的部门负责人人数计算
+SCORE_DEPARTMENT_LEADER_COUNT = int(os.getenv('SCORE_DEPARTMENT_LEADER_COUNT', 0)) or None
+
+# 绩效预警规则配置，每次计算最终得分后批量评估
+# 最终得分低于该分数时预警
+SCORE_ALERT_THRESHOLD = float(os.getenv('SCORE_ALERT_THRESHOLD', 60))
+# 最终得分比个人前 N 个月平均分低出该分数时预警
+SCORE_ALERT_DROP = float(os.getenv('SCORE_ALERT_DROP', 15))
+SCORE_ALERT_WINDOW = int(os.getenv('SCORE_ALERT_WINDOW', 3))
+# 最终得分处于部门后百分之几时预警，人数少于 SCORE_ALERT_MIN_GROUP 的部门不评估
+SCORE_ALERT_BOTTOM_PERCENT = float(os.getenv('SCORE_ALERT_BOTTOM_PERCENT', 10))
+SCORE_ALERT_MIN_GROUP = int(os.getenv('SCORE_ALERT_MIN_GROUP', 5))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -122,6 +168,19 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
+# 上传及生成的文件（绩效报告）
+MEDIA_URL = 'media/'
+MEDIA_ROOT = os.getenv('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+
+# 绩效报告生成：各部门并行渲染的进程数，后台进程轮询任务的间隔（秒），
+# 生成中的任务超过该时间（秒）未完成时视为后台进程已退出，重新排队
+REPORT_PROCESSES = int(os.getenv('REPORT_PROCESSES', os.cpu_count() or 1))
+REPORT_POLL_INTERVAL = float(os.getenv('REPORT_POLL_INTERVAL', 2))
+REPORT_JOB_TIMEOUT = int(os.getenv('REPORT_JOB_TIMEOUT', 1800))
+
+# 请求耗时统计（performance.instrumentation）的抽样比例，0 为关闭，1 为记录全部请求
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv('REQUEST_METRICS_SAMPLE_RATE', 0.1))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -138,6 +197,10 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'message': {
+            'format': '{message}',
+            'style': '{',
+        },
     },
     'handlers': {
         'file': {
@@ -151,6 +214,13 @@ LOGGING = {
             'class': 'logging.StreamHandler',
             'formatter': 'simple',
         },
+        # 请求耗时统计，每行一个 JSON
+        'requests': {
+            'level': 'INFO',
+            'class': 'logging.FileHandler',
+            'filename': os.path.join(BASE_DIR, 'logs/requests.log'),
+            'formatter': 'message',
+        },
     },
     'loggers': {
         'django': {
@@ -158,6 +228,16 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        'performance': {
+            'handlers': ['file', 'console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'performance.requests': {
+            'handlers': ['requests'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
@@ -0,0 +1,16 @@
+import axios from 'axios';
+
+// 设置API基础URL
+const API_URL = 'http://localhost:8000/api';
+
+export const alertApi = {
+  // 获取绩效预警列表，params 可包含 period、rule、employee、employee__department、acknowledged
+  getAlerts(params) {
+    return axios.get(`${API_URL}/alerts/`, { params });
+  },
+  
+  // 标记预警为已处理
+  acknowledgeAlert(id) {
+    return axios.patch(`${API_URL}/alerts/${id}/`, { acknowledged: true });
+  }
+};
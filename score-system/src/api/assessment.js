@@ -0,0 +1,37 @@
+import axios from 'axios';
+
+// 设置API基础URL
+const API_URL = 'http://localhost:8000/api';
+
+export const assessmentApi = {
+  // 获取考核列表，params 可包含 period、evaluator、employee、status
+  getAssessments(params) {
+    return axios.get(`${API_URL}/assessments/`, { params });
+  },
+  
+  // 按人员关系生成考核周期的待评价任务，可重复执行，只补充缺少的任务
+  assignAssessments(period) {
+    return axios.post(`${API_URL}/assessments/assign/`, { period });
+  },
+  
+  // 获取评价人的待办列表：可见人员、人员角色及考核状态
+  getInbox(period, evaluator) {
+    return axios.get(`${API_URL}/assessments/inbox/`, {
+      params: { period, evaluator }
+    });
+  },
+  
+  // 批量提交评分表：sheets 为 [{ employee, scores, comment }]，一次请求保存同一评价人的全部评分
+  submitAssessments(evaluator, period, sheets) {
+    return axios.post(`${API_URL}/assessments/`, {
+      evaluator,
+      period,
+      assessments: sheets
+    });
+  },
+  
+  // 修改单条考核评分
+  updateAssessment(id, data) {
+    return axios.patch(`${API_URL}/assessments/${id}/`, data);
+  }
+};
@@ -0,0 +1,26 @@
+import axios from 'axios';
+
+// 设置API基础URL
+const API_URL = 'http://localhost:8000/api';
+
+// 导出文件较大时可直接用 exportUrl 生成的地址下载，浏览器边接收边保存
+export const exportApi = {
+  // 导出地址，dataset 为 assessments 或 final-scores，fileFormat 为 csv、xlsx、ndjson
+  exportUrl(dataset, period, fileFormat = 'csv', department) {
+    const params = new URLSearchParams({ period, file_format: fileFormat });
+    if (department) {
+      params.append('department', department);
+    }
+    return `${API_URL}/exports/${dataset}/?${params}`;
+  },
+  
+  // 导出考核评分表，scores 按项点序号展开为独立的列
+  exportAssessments(period, fileFormat = 'csv', department) {
+    return axios.get(this.exportUrl('assessments', period, fileFormat, department), { responseType: 'blob' });
+  },
+  
+  // 导出最终得分
+  exportFinalScores(period, fileFormat = 'csv', department) {
+    return axios.get(this.exportUrl('final-scores', period, fileFormat, department), { responseType: 'blob' });
+  }
+};
@@ -11,16 +11,32 @@ export const relationApi = {
     });
   },
   
-  // 导入人员关系数据
+  // 导入人员关系数据，data.mode 为 'diff' 时只写入有变化的记录
   importRelations(data) {
     return axios.post(`${API_URL}/relations/import/`, data);
   },
   
+  // 上传文件导入人员关系数据（CSV/XLSX/NDJSON），返回逐块的导入进度
+  uploadRelations(date, file, chunkSize) {
+    const formData = new FormData();
+    formData.append('date', date);
+    formData.append('file', file);
+    if (chunkSize) {
+      formData.append('chunk_size', chunkSize);
+    }
+    return axios.post(`${API_URL}/relations/import/upload/`, formData);
+  },
+  
   // 修改人员角色和属性
   updateRelation(id, data) {
     return axios.patch(`${API_URL}/relations/${id}/`, data);
   },
   
+  // 批量修改人员角色，changes 格式为 [{ id, role }]
+  updateRoles(changes) {
+    return axios.post(`${API_URL}/relations/roles/`, { changes });
+  },
+  
   // 获取统计数据
   getStatistics(date) {
     return axios.get(`${API_URL}/relations/statistics/`, {
@@ -28,6 +44,11 @@ export const relationApi = {
     });
   },
   
+  // 获取多个月份的统计序列，params 为 { dates: 'YYYYMM,YYYYMM' } 或 { start, end }
+  getStatisticsSeries(params) {
+    return axios.get(`${API_URL}/relations/statistics/`, { params });
+  },
+  
   // 保存关系数据
   saveRelations(date, relations) {
     return axios.post(`${API_URL}/relations/save/`, {
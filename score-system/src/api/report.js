@@ -0,0 +1,27 @@
+import axios from 'axios';
+
+// 设置API基础URL
+const API_URL = 'http://localhost:8000/api';
+
+export const reportApi = {
+  // 提交报告生成任务，scope 为 company（全公司）或部门ID，format 为 pdf、docx、xlsx
+  // 报告由后台生成，返回任务信息；相同报告已生成时 cached 为 true
+  generateReport(period, format, scope = 'company') {
+    return axios.post(`${API_URL}/reports/`, { period, scope, format });
+  },
+  
+  // 获取最近的报告任务
+  getReports(params) {
+    return axios.get(`${API_URL}/reports/`, { params });
+  },
+  
+  // 查询报告任务状态
+  getReport(id) {
+    return axios.get(`${API_URL}/reports/${id}/`);
+  },
+  
+  // 下载已生成的报告
+  downloadReport(id) {
+    return axios.get(`${API_URL}/reports/${id}/download/`, { responseType: 'blob' });
+  }
+};
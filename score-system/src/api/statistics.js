@@ -0,0 +1,36 @@
+import axios from 'axios';
+
+// 设置API基础URL
+const API_URL = 'http://localhost:8000/api';
+
+export const statisticsApi = {
+  // 获取考核周期的得分统计（分布、百分位数、部门汇总、前后 N 名），在服务端汇总
+  // params 可包含 source、department、buckets、percentiles、top
+  getScoreStatistics(period, params = {}) {
+    return axios.get(`${API_URL}/statistics/`, {
+      params: { period, ...params }
+    });
+  },
+  
+  // 获取绩效趋势：各月份平均分及每人的得分、移动平均、环比变化、排名变化
+  // params 可包含 employees（逗号分隔的员工ID）、department、window
+  getTrend(start, end, params = {}) {
+    return axios.get(`${API_URL}/statistics/trend/`, {
+      params: { start, end, ...params }
+    });
+  },
+  
+  // 获取按月份的得分汇总序列（人数、均值、标准差、分布），可按部门筛选
+  getStatisticsSummary(start, end, department) {
+    return axios.get(`${API_URL}/statistics/summary/`, {
+      params: { start, end, department }
+    });
+  },
+  
+  // 首页汇总：得分统计、人员关系统计、未处理预警及评价人待办列表，服务端并发查询后一次返回
+  getDashboard(period, department, evaluator) {
+    return axios.get(`${API_URL}/async/dashboard/`, {
+      params: { period, department, evaluator }
+    });
+  }
+};